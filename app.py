@@ -15,9 +15,14 @@ import numpy as np
 from datetime import datetime
 import plotly.graph_objects as go
 from models.delay_predictor import DelayPredictor
+from models.compact_trees import load_compact_model
+from models.registry import ModelRegistry, ModelHandle
+from prediction.service import PredictionClient
+from models.conformal import ConformalIntervals
+from models.explanations import ExplanationGrid
 import time
 import logging
-import joblib
+import os
 from pathlib import Path
 
 # ============================================
@@ -49,43 +54,82 @@ stations = load_stations()
 # ============================================
 # MODEL LOADING (OPTIMIZED - SINGLE MODEL)
 # ============================================
-@st.cache_resource
-def load_model():
+def build_predictor(version_dir=None):
     """
     Load only the best model (Random Forest) for fastest loading.
     This avoids loading all 3 models and retraining data.
+    Prefers the compact array export (memory-mapped, shared via page cache).
+    
+    Args:
+        version_dir: Registry version directory (None = legacy models/saved)
     """
     start = time.time()
+    model_dir = Path(version_dir) if version_dir else Path("models/saved")
     
     # Create predictor without loading data
     predictor = DelayPredictor(load_data=False)
     
     # Load only Random Forest (R²=0.509)
-    rf_path = "models/saved/rf_model.pkl"
-    if Path(rf_path).exists():
-        predictor.models['rf'] = joblib.load(rf_path)
+    rf_path = model_dir / "rf_model.pkl"
+    compact_rf = load_compact_model('rf', model_dir / "compact")
+    if compact_rf is not None:
+        predictor.models['rf'] = compact_rf
+        predictor.weights = {'rf': 1.0}
+        print(f"✅ Memory-mapped compact RF in {(time.time()-start)*1000:.1f} ms")
+    elif rf_path.exists():
+        predictor.models['rf'] = predictor.load_pickled_member(rf_path)
         predictor.weights = {'rf': 1.0}
         print(f"✅ Loaded best model (RF) in {time.time()-start:.2f}s")
         print(f"   R²=0.509, MAE=2.75 min")
     else:
         # Fallback to Gaussian if RF not found
         print("⚠️ RF model not found, using Gaussian")
-        predictor.models['gaussian'] = joblib.load("models/saved/gaussian_model.pkl")
+        predictor.models['gaussian'] = predictor.load_pickled_member(model_dir / "gaussian_model.pkl")
         predictor.weights = {'gaussian': 1.0}
     
+    # Conformal residual quantiles stored with the model (intervals are a table lookup)
+    predictor.conformal = ConformalIntervals.load(model_dir)
+    
+    # Explanations for every sidebar input combination, cached per registry version
+    start = time.time()
+    predictor.explanations = ExplanationGrid.for_version(predictor, Path(version_dir).name if version_dir else None)
+    print(f"✅ Explanations ready in {(time.time()-start)*1000:.1f} ms")
+    
     return predictor
 
-predictor = load_model()
+@st.cache_resource
+def load_model():
+    """
+    Watch the model registry and hot-swap newly promoted versions.
+    Reloading happens on a background thread, never on the request path.
+    """
+    return ModelHandle(ModelRegistry(), build_predictor)
+
+@st.cache_resource
+def get_prediction_client():
+    """Shared micro-batching prediction service, if configured (METRODORF_PREDICTION_URL)"""
+    url = os.getenv("METRODORF_PREDICTION_URL")
+    return PredictionClient(url) if url else None
+
+prediction_client = get_prediction_client()
+# With the shared service configured this process holds no model of its own
+model_handle = load_model() if prediction_client is None else None
+
+def served_model_version():
+    """Registry version behind the predictions (from the service when one is configured)"""
+    if prediction_client is None:
+        return model_handle.version
+    try:
+        return prediction_client.health().get('model_version')
+    except (OSError, RuntimeError) as e:
+        logger.warning(f"Prediction service unavailable: {e}")
+        return None
 
 # ============================================
 # PREDICTION FUNCTION
 # ============================================
-def get_real_prediction(station, hour, day, is_peak, is_cologne):
-    """
-    Get delay prediction from the loaded model
-    Uses simplified distance estimation based on station names
-    """
-    # Estimate distance (simplified - can be improved with real data)
+def estimate_distance(station):
+    """Simplified distance estimation based on station names (can be improved with real data)"""
     distance = 50  # default
     
     if "Cologne" in station and "Düsseldorf" in station:
@@ -94,17 +138,43 @@ def get_real_prediction(station, hour, day, is_peak, is_cologne):
         distance = 70
     elif "Essen" in station and "Bochum" in station:
         distance = 15
+    return distance
+
+def get_real_prediction(station, hour, day, is_peak, is_cologne, confidence_level=0.68):
+    """
+    Get delay prediction, conformal interval and explanation from one model
+    Uses simplified distance estimation based on station names
     
-    # Get prediction from model
-    delay = predictor.predict_delay(
+    Returns:
+        (delay, lower, upper, explanation) – bounds are None for models without calibration
+    """
+    distance = estimate_distance(station)
+    
+    # Shared service: prediction and explanation come back from the same ensemble in one request
+    if prediction_client is not None:
+        result = prediction_client.predict_journey(
+            distance, hour, day, is_peak, is_cologne, confidence_level=confidence_level, explain=True
+        )
+        return round(result['prediction'], 1), result['lower'], result['upper'], result['explanation']
+    
+    # Currently promoted local model, one snapshot for the prediction and its explanation
+    model = model_handle.predictor
+    explanation = model.explain_delay(distance, hour, day, is_peak, is_cologne)
+    if getattr(model, 'conformal', None) is None:
+        delay = model.predict_delay(distance, hour, day, is_peak, is_cologne)
+        return round(delay, 1), None, None, explanation
+    
+    delay, lower, upper = model.predict_delay_with_ci(
         distance=distance,
         time_of_day=hour,
         day_of_week=day,
         is_peak=is_peak,
-        is_cologne=is_cologne
+        is_cologne=is_cologne,
+        confidence_level=confidence_level
     )
-    
-    return round(delay, 1)
+    if lower is None:
+        return round(delay, 1), None, None, explanation
+    return round(delay, 1), lower, upper, explanation
 
 # Title
 st.title("🚆 Metrodorf - Rhine-Ruhr Delay Prediction")
@@ -160,18 +230,18 @@ with col1:
         collector = RealTimeCollector()
     
         all_departures = []
+        frames = []
     
-        for station_name in stations[:3]:  # First 3 stations
+        # Up to 3 stations the poll scheduler considers due (Dortmund Hbf, busy and volatile first)
+        scheduler = collector.scheduler
+        for station_name in scheduler.due(limit=3) or [scheduler.next_due()[0]]:
             try:
                 deps = collector.get_departures(station_name, limit=3)
             
-                if deps:  # Got real data
-                   for dep in deps:
-                       parsed = collector.parse_departure(dep, station_name)
-                       if parsed:
-                          parsed['station_name'] = station_name
-                          all_departures.append(parsed)
-                          time.sleep(2)
+                if deps:  # Got real data: one vectorized parse + bulk DB insert per station
+                   parsed = collector.parse_departures(deps, station_name)
+                   frames.append(parsed.assign(station_name=station_name))
+                   time.sleep(2)
                 else:
                     # No real data - generate synthetic
                     logger.info(f"⚠️ No real data for {station_name}, using synthetic")
@@ -188,7 +258,8 @@ with col1:
                     synthetic['station_name'] = station_name
                     all_departures.append(synthetic)
     
-        df = pd.DataFrame(all_departures)
+        frames = [f for f in frames + [pd.DataFrame(all_departures)] if len(f)]
+        df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
         logger.info(f"✅ Collected {len(df)} departures")
         return df 
         """
@@ -243,16 +314,20 @@ with col1:
 with col2:
     st.subheader("🔮 Prediction Result")
     
-    if predict_btn:
+    if predict_btn and prediction_client is None and model_handle.predictor is None:
+        st.error("No model loaded yet (see the logs), retrying in the background")
+    elif predict_btn:
         # Get prediction
-        delay = get_real_prediction(station, hour, day, is_peak, is_cologne)
+        delay, lower, upper, explanation = get_real_prediction(station, hour, day, is_peak, is_cologne)
         
         # Display metric
         st.metric("Predicted Delay", f"{delay} min", delta=None)
         
-        # Confidence interval based on model MAE
-        mae = 3.35
-        st.caption(f"68% confidence: {max(0, delay-mae):.1f} - {delay+mae:.1f} min")
+        # Split-conformal interval (calibrated residual quantiles for this peak/Cologne stratum)
+        if lower is not None:
+            st.caption(f"68% prediction interval: {max(0, lower):.1f} - {upper:.1f} min")
+        else:
+            st.caption("Prediction interval unavailable (model trained without conformal calibration)")
         
         # Recommendation based on delay severity
         if delay > 10:
@@ -261,6 +336,14 @@ with col2:
             st.warning("⚡ **Recommendation**: Monitor closely, consider platform change")
         else:
             st.success("✅ **Recommendation**: Normal operations")
+        
+        # Why: per-input contributions of the model that produced the delay (precomputed at model load)
+        with st.expander("🧭 Why this prediction?"):
+            contributions = pd.Series(explanation['contributions'])
+            st.caption(f"Typical delay: {explanation['baseline']:.1f} min")
+            for factor, minutes in contributions.items():
+                if abs(minutes) >= 0.05:
+                    st.write(f"{'🔺' if minutes > 0 else '🔻'} **{factor}**: {minutes:+.1f} min")
 
 # ============================================
 # BOTTOM SECTION - RECENT HISTORY
@@ -281,4 +364,5 @@ fig = px.line(history_data, x="Time", y=["ICE 723", "RE 1", "RB 53"],
 st.plotly_chart(fig, width='stretch')
 
 # Footer
-st.caption("🚆 Data from v6.db.transport.rest | Model: Random Forest (R²=0.509)")
\ No newline at end of file
+model_name = "Ensemble (prediction service)" if prediction_client else "Random Forest (R²=0.509)"
+st.caption(f"🚆 Data from v6.db.transport.rest | Model: {model_name} | Version: {served_model_version() or 'unversioned'}")
\ No newline at end of file
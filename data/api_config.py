@@ -0,0 +1,71 @@
+"""
+API endpoint configuration for the collectors
+Base URLs of IRIS, v6 and VBB come from the environment (.env supported), so
+every collector can be pointed at the local emulator (data/emulator.py):
+
+    METRODORF_API_URL=http://127.0.0.1:8700      # emulator root: /iris, /v6, /vbb
+    METRODORF_IRIS_URL=...                       # or per API
+    METRODORF_V6_URL=...
+    METRODORF_VBB_URL=...
+    METRODORF_MIN_REQUEST_INTERVAL=0             # seconds between requests per API
+    METRODORF_HTTP_TIMEOUT=10                    # read timeout when a caller sets none
+    METRODORF_HTTP_RETRIES=2                     # retries on connection errors / 502-504
+
+Values are read on every call, so settings changed at runtime (tests, load
+runs) apply to the next collector that is created.
+"""
+
+import os
+from pathlib import Path
+from typing import Dict
+
+from dotenv import load_dotenv
+
+PROJECT_ROOT = Path(__file__).parent.parent
+ENV_PATH = PROJECT_ROOT / ".env"
+
+if ENV_PATH.exists():
+    load_dotenv(ENV_PATH)
+else:
+    load_dotenv()
+
+DEFAULT_BASE_URLS = {
+    'iris': "https://iris.noncd.db.de/iris-tts/timetable",
+    'v6': "https://v6.db.transport.rest",
+    'vbb': "https://v5.vbb.transport.rest",
+}
+DEFAULT_MIN_REQUEST_INTERVAL = 10  # seconds (1 request per 10 s per API)
+DEFAULT_CONNECT_TIMEOUT = 3.05
+DEFAULT_READ_TIMEOUT = 10
+DEFAULT_HTTP_RETRIES = 2
+
+
+def api_base(name: str) -> str:
+    """Base URL of one API: METRODORF_<NAME>_URL, else METRODORF_API_URL/<name>, else production"""
+    specific = os.getenv(f"METRODORF_{name.upper()}_URL")
+    if specific:
+        return specific.rstrip('/')
+    root = os.getenv("METRODORF_API_URL")
+    if root:
+        return f"{root.rstrip('/')}/{name}"
+    return DEFAULT_BASE_URLS[name]
+
+
+def api_bases() -> Dict[str, str]:
+    return {name: api_base(name) for name in DEFAULT_BASE_URLS}
+
+
+def min_request_interval() -> float:
+    value = os.getenv("METRODORF_MIN_REQUEST_INTERVAL")
+    return float(value) if value else DEFAULT_MIN_REQUEST_INTERVAL
+
+
+def http_timeout():
+    """(connect, read) timeout for requests that pass none"""
+    value = os.getenv("METRODORF_HTTP_TIMEOUT")
+    return (DEFAULT_CONNECT_TIMEOUT, float(value) if value else DEFAULT_READ_TIMEOUT)
+
+
+def http_retries() -> int:
+    value = os.getenv("METRODORF_HTTP_RETRIES")
+    return int(value) if value else DEFAULT_HTTP_RETRIES
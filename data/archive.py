@@ -0,0 +1,362 @@
+"""
+Record-and-replay archive of raw API responses
+Every collector run depends on live IRIS / v6 / VBB availability and keeps
+nothing of the payloads. This module hooks into requests at the transport
+level (HTTPAdapter on the shared session, data/http_client.py), so the
+collectors' own code paths stay unchanged:
+- RecordingAdapter: sends through the pooled transport and appends the raw response body
+  plus request metadata (time, method, URL, status, headers, latency, or the
+  connection error) to an append-only gzip JSON-lines archive
+- ReplayAdapter: answers requests from archives instead of the network,
+  at recorded pace × `speed` or as fast as possible (speed 0); connection
+  errors and 429 / 5xx answers are replayed as well
+
+Archives: data/archive/<host>_<YYYYmmdd>_<pid>.jsonl.gz, one gzip member
+stream per process, flushed after every record (readable while being written).
+
+Environment (read once when the shared session is created):
+    METRODORF_ARCHIVE_RECORD=data/archive        # record live responses
+    METRODORF_ARCHIVE_REPLAY=data/archive        # replay (directory, file or glob)
+    METRODORF_REPLAY_SPEED=0                     # 1 = recorded pace, 0 = no waiting
+
+Usage:
+    python main.py replay data/archive --speed 0 --duration 60
+"""
+
+import glob
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from .http_client import PooledAdapter
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = "data/archive"
+RECORD_ENV = "METRODORF_ARCHIVE_RECORD"
+REPLAY_ENV = "METRODORF_ARCHIVE_REPLAY"
+SPEED_ENV = "METRODORF_REPLAY_SPEED"
+
+# Body is stored decoded; these would describe the wire format, not the archive
+_DROPPED_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection', 'set-cookie'}
+# Request headers worth keeping as metadata (never credentials)
+_REQUEST_HEADERS = {'user-agent', 'accept', 'if-none-match', 'if-modified-since'}
+
+
+def _encode_body(content: bytes) -> str:
+    # surrogateescape keeps non-UTF-8 bytes round-trippable through JSON
+    return content.decode('utf-8', 'surrogateescape')
+
+
+def _decode_body(body: str) -> bytes:
+    return body.encode('utf-8', 'surrogateescape')
+
+
+def route(url: str) -> str:
+    """
+    URL with query and time-dependent path parts removed: host + path where every
+    numeric segment after the first (the EVA) is a wildcard
+
+    /timetables/v1/plan/8000080/261019/08 → /timetables/v1/plan/8000080/*/*
+    """
+    parts = urlsplit(url)
+    segments, seen_number = [], False
+    for segment in parts.path.split('/'):
+        if segment.isdigit():
+            segments.append('*' if seen_number else segment)
+            seen_number = True
+        else:
+            segments.append(segment)
+    return parts.netloc + '/'.join(segments)
+
+
+# ============================================
+# WRITING
+# ============================================
+class ArchiveWriter:
+    """Append-only, gzip-compressed JSON lines (one file per source, day and process)"""
+
+    def __init__(self, directory: Union[str, Path] = ARCHIVE_DIR, source: str = 'api'):
+        self.directory = Path(directory)
+        self.source = source
+        self.records = 0
+        self._file = None
+        self._day = None
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> Path:
+        return self.directory / f"{self.source}_{self._day}_{os.getpid()}.jsonl.gz"
+
+    def write(self, record: dict):
+        line = (json.dumps(record, separators=(',', ':')) + '\n').encode('utf-8')
+        with self._lock:
+            day = datetime.now().strftime('%Y%m%d')
+            if day != self._day:
+                self.close()
+                self._day = day
+                self.directory.mkdir(parents=True, exist_ok=True)
+                self._file = gzip.open(self.path, 'ab')
+            self._file.write(line)
+            self._file.flush()   # sync flush: everything written so far is decompressible
+            self.records += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+_WRITERS: Dict[tuple, ArchiveWriter] = {}
+_WRITERS_LOCK = threading.Lock()
+
+
+def shared_writer(directory: Union[str, Path], source: str) -> ArchiveWriter:
+    """One writer per (directory, source) and process, shared by all sessions"""
+    key = (str(directory), source)
+    with _WRITERS_LOCK:
+        if key not in _WRITERS:
+            _WRITERS[key] = ArchiveWriter(directory, source)
+        return _WRITERS[key]
+
+
+class RecordingAdapter(PooledAdapter):
+    """Pooled adapter that archives every exchange it sends (one archive per host)"""
+
+    def __init__(self, directory: Union[str, Path] = ARCHIVE_DIR, **kwargs):
+        super().__init__(**kwargs)
+        self.directory = directory
+
+    def send(self, request, **kwargs):
+        started = time.time()
+        writer = shared_writer(self.directory, urlsplit(request.url).netloc.replace(':', '_'))
+        record = {
+            't': started,
+            'source': writer.source,
+            'method': request.method,
+            'url': request.url,
+            'request_headers': {k: v for k, v in request.headers.items() if k.lower() in _REQUEST_HEADERS},
+        }
+        try:
+            response = super().send(request, **kwargs)
+            content = response.content   # reads streamed bodies too; iter_content() serves them from memory
+        except requests.RequestException as e:
+            record.update(error=type(e).__name__, message=str(e)[:200], elapsed=time.time() - started)
+            writer.write(record)
+            raise
+        record.update(
+            status=response.status_code,
+            reason=response.reason,
+            headers={k: v for k, v in response.headers.items() if k.lower() not in _DROPPED_HEADERS},
+            elapsed=time.time() - started,
+            body=_encode_body(content or b''),
+        )
+        writer.write(record)
+        return response
+
+
+# ============================================
+# READING / REPLAY
+# ============================================
+def archive_files(paths: Union[str, Path, Iterable[Union[str, Path]]]) -> List[Path]:
+    """Archive files from directories, files or glob patterns (sorted)"""
+    if isinstance(paths, (str, Path)):
+        paths = [paths]
+    files = []
+    for path in paths:
+        path = Path(path)
+        if path.is_dir():
+            files.extend(path.glob('*.jsonl.gz'))
+        elif path.exists():
+            files.append(path)
+        else:
+            files.extend(Path(p) for p in glob.glob(str(path)))
+    return sorted(set(files))
+
+
+def read_archive(paths) -> Iterator[dict]:
+    """Records of all archives (a truncated last line of a live archive is skipped)"""
+    for path in archive_files(paths):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            try:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        logger.warning(f"⚠️ Skipping damaged record in {path.name}")
+            except EOFError:
+                logger.warning(f"⚠️ {path.name} ends mid-record (still being written?)")
+
+
+class ReplayArchive:
+    """
+    Archived exchanges indexed by exact URL and by route, served in recorded order
+    (cycling when a URL is exhausted) and paced by the recorded timestamps
+    """
+
+    def __init__(self, paths, speed: float = 0.0):
+        self.records = sorted(read_archive(paths), key=lambda r: r['t'])
+        self.speed = speed
+        self._by_url = defaultdict(list)
+        self._by_route = defaultdict(list)
+        for record in self.records:
+            self._by_url[(record['method'], record['url'])].append(record)
+            self._by_route[(record['method'], route(record['url']))].append(record)
+        self._cursor = defaultdict(int)
+        self._t0 = self.records[0]['t'] if self.records else 0.0
+        self._span = (self.records[-1]['t'] - self._t0 + 1.0) if self.records else 1.0
+        self._started = None
+        self._lock = threading.Lock()
+        self.served = self.missed = 0
+        logger.info(f"📼 Replay archive: {len(self.records)} records, {len(self._by_route)} routes")
+
+    def next_record(self, method: str, url: str) -> Optional[dict]:
+        """Next archived exchange for a request (exact URL first, then same route)"""
+        with self._lock:
+            for key, index in (((method, url), self._by_url), ((method, route(url)), self._by_route)):
+                candidates = index.get(key)
+                if candidates:
+                    position = self._cursor[key]
+                    self._cursor[key] = position + 1
+                    cycle, i = divmod(position, len(candidates))
+                    self.served += 1
+                    return dict(candidates[i], _cycle=cycle)
+            self.missed += 1
+            return None
+
+    def wait_for(self, record: dict):
+        """Hold the answer until its recorded time (relative to replay start) / speed"""
+        if self.speed <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if self._started is None:
+                self._started = now
+        offset = (record['t'] - self._t0 + record.get('_cycle', 0) * self._span) / self.speed
+        delay = self._started + offset - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class ReplayAdapter(HTTPAdapter):
+    """HTTPAdapter that answers from a ReplayArchive and never touches the network"""
+
+    def __init__(self, archive: ReplayArchive, **kwargs):
+        super().__init__(**kwargs)
+        self.archive = archive
+
+    def send(self, request, **kwargs):
+        record = self.archive.next_record(request.method, request.url)
+        if record is None:
+            # Nothing archived for this endpoint: behave like an unknown resource
+            record = {'status': 404, 'reason': 'Not Archived', 'headers': {}, 'body': ''}
+        else:
+            self.archive.wait_for(record)
+        if record.get('error'):
+            error = getattr(requests.exceptions, record['error'], requests.ConnectionError)
+            raise error(f"replayed: {record.get('message', '')}", request=request)
+
+        response = requests.Response()
+        response.status_code = record['status']
+        response.reason = record.get('reason')
+        response.headers = CaseInsensitiveDict(record.get('headers') or {})
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = _decode_body(record.get('body') or '')
+        response._content_consumed = True
+        response.url = request.url
+        response.request = request
+        response.elapsed = timedelta(seconds=record.get('elapsed', 0.0))
+        return response
+
+
+_ARCHIVES: Dict[tuple, ReplayArchive] = {}
+
+
+def shared_archive(paths, speed: float = 0.0) -> ReplayArchive:
+    """One ReplayArchive per (paths, speed) and process (loaded once)"""
+    key = (str(paths), speed)
+    with _WRITERS_LOCK:
+        if key not in _ARCHIVES:
+            _ARCHIVES[key] = ReplayArchive(paths, speed)
+        return _ARCHIVES[key]
+
+
+def archive_mode() -> Optional[str]:
+    """'replay', 'record' or None (live) from the environment"""
+    if os.getenv(REPLAY_ENV):
+        return 'replay'
+    if os.getenv(RECORD_ENV):
+        return 'record'
+    return None
+
+
+def configure_session(session: requests.Session) -> Optional[str]:
+    """
+    Mount a recording or replay adapter on a session (environment driven)
+
+    Returns:
+        'record', 'replay' or None (live, unchanged)
+    """
+    mode = archive_mode()
+    if mode == 'replay':
+        adapter = ReplayAdapter(shared_archive(os.getenv(REPLAY_ENV), float(os.getenv(SPEED_ENV, '0') or 0)))
+    elif mode == 'record':
+        adapter = RecordingAdapter(os.getenv(RECORD_ENV))
+    else:
+        return None
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    logger.info(f"📼 HTTP {mode} mode ({os.getenv(REPLAY_ENV) or os.getenv(RECORD_ENV)})")
+    return mode
+
+
+def replay_benchmark(paths, speed: float = 0.0, duration: float = 60.0, write_batch: int = 16) -> dict:
+    """
+    Run the ingestion daemon against archives instead of the live APIs
+
+    Rate limits and the poll budget are lifted, so with speed 0 the result is
+    the pure parse / fuse / write throughput of the recorded payloads.
+    """
+    os.environ[REPLAY_ENV] = str(paths)
+    os.environ[SPEED_ENV] = str(speed)
+    os.environ.pop(RECORD_ENV, None)
+
+    from .ingest import IngestDaemon
+    from .real_time_collector import RealTimeCollector
+    from .scheduler import PollScheduler
+
+    collector = RealTimeCollector()
+    collector.scheduler = PollScheduler(
+        collector.stations,
+        budgets={api: 1e6 for api in ('iris', 'v6', 'vbb')},
+        min_interval=1e-3,
+    )
+    daemon = IngestDaemon(collector, write_batch=write_batch, metrics_path=None)
+    daemon.run(duration=duration, metrics_interval=max(duration / 4, 1.0))
+
+    archive = shared_archive(str(paths), speed)
+    metrics = daemon.metrics()
+    result = {
+        'records': len(archive.records),
+        'served': archive.served,
+        'missed': archive.missed,
+        'polls': int(metrics.loc[metrics['stage'] == 'fetch', 'items_out'].iloc[0]),
+        'rows_written': daemon.rows_written,
+        'polls_per_second': round(daemon.stages[0].metrics.items_out / duration, 2),
+    }
+    print(metrics.to_string(index=False))
+    print(json.dumps(result, indent=2))
+    return result
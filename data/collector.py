@@ -4,7 +4,6 @@ Clean architecture with CSV backup + optional live API
 FULLY UPDATED AND WORKING VERSION
 """
 
-import requests
 import pandas as pd
 import logging
 from datetime import datetime
@@ -13,6 +12,9 @@ import json
 import time
 import numpy as np
 
+from .api_config import api_base
+from .http_client import shared_session
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -39,9 +41,8 @@ class DBCollector:
         self._load_station_cache()
         
         # Live API (if enabled)
-        self.live_api = "https://v6.db.transport.rest"
-        self.session = requests.Session()
-        self.session.headers.update({"User-Agent": "Metrodorf/1.0"})
+        self.live_api = api_base('v6')
+        self.session = shared_session()
     
     def _load_station_cache(self):
         """Load stations from CSV if available"""
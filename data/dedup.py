@@ -0,0 +1,144 @@
+"""
+Departure deduplication and change detection across polls
+Every poll returns mostly the same departures with the same delays; only
+new trains and changed delays should reach real_delays:
+- key: train key (EVA, trip id, planned minute; data/fusion.py), value: last seen delay
+- hash map in insertion order of the last observation (OrderedDict), so the
+  oldest entries sit at the front
+- bounded: entries not seen for `ttl` seconds expire, and the map never grows
+  beyond `max_entries` (least recently seen dropped first)
+- writers use check() before and commit() after a successful write, so a
+  failed insert does not hide its delays until the TTL runs out
+
+One deduplicator is shared per process (shared_deduplicator()), because the
+dashboard builds a fresh RealTimeCollector for every cached poll.
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEDUP_TTL = 3 * 3600          # seconds a departure is remembered after it was last seen
+DEDUP_MAX_ENTRIES = 100_000
+DELAY_TOLERANCE = 0.01        # minutes; smaller differences are not a change
+
+
+class DepartureDeduplicator:
+    """Emits a departure only when it is new or its delay changed since the last poll"""
+
+    def __init__(self, ttl: float = DEDUP_TTL, max_entries: int = DEDUP_MAX_ENTRIES,
+                 tolerance: float = DELAY_TOLERANCE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.tolerance = tolerance
+        self._seen: "OrderedDict[Hashable, tuple]" = OrderedDict()   # key → (delay, last seen)
+        self._lock = threading.RLock()   # changed() = check() + commit() under one lock
+        self.observed = self.emitted = self.expired = self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def _same(self, old: float, new: float) -> bool:
+        if old is None or new is None:
+            return old is new
+        if math.isnan(old) or math.isnan(new):
+            return math.isnan(old) and math.isnan(new)
+        return abs(old - new) <= self.tolerance
+
+    def _expire(self, now: float):
+        cutoff = now - self.ttl
+        while self._seen:
+            key, (_, last_seen) = next(iter(self._seen.items()))
+            if last_seen >= cutoff:
+                break
+            self._seen.popitem(last=False)
+            self.expired += 1
+        while len(self._seen) > self.max_entries:
+            self._seen.popitem(last=False)
+            self.evicted += 1
+
+    def _store(self, keys: Sequence[Hashable], delays: Sequence[float], now: float):
+        seen = self._seen
+        for key, delay in zip(keys, delays):
+            seen.pop(key, None)
+            seen[key] = (None if delay is None else float(delay), now)   # at the end: most recently seen
+        self._expire(now)
+
+    def check(self, keys: Sequence[Hashable], delays: Sequence[float], now: Optional[float] = None) -> np.ndarray:
+        """
+        Flag the departures to emit without recording them (commit() once written)
+
+        Unchanged departures are refreshed right away (nothing to write for them).
+
+        Args:
+            keys: Train key (eva, trip id, planned) per departure
+            delays: Delay per departure (minutes)
+
+        Returns:
+            Boolean mask, True for new departures and changed delays
+        """
+        now = time.time() if now is None else now
+        keys, delays = list(keys), list(delays)
+        mask = np.zeros(len(keys), dtype=bool)
+        with self._lock:
+            self._expire(now)   # an expired departure counts as new again
+            for i, (key, delay) in enumerate(zip(keys, delays)):
+                previous = self._seen.get(key)
+                mask[i] = previous is None or not self._same(previous[0], None if delay is None else float(delay))
+            self._store([k for k, m in zip(keys, mask) if not m], [d for d, m in zip(delays, mask) if not m], now)
+            self.observed += len(keys)
+            self.emitted += int(mask.sum())
+        return mask
+
+    def commit(self, keys: Sequence[Hashable], delays: Sequence[float], now: Optional[float] = None):
+        """Record departures as seen with these delays (after they were written)"""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._store(keys, delays, now)
+
+    def changed(self, keys: Sequence[Hashable], delays: Sequence[float], now: Optional[float] = None) -> np.ndarray:
+        """check() and commit() in one step (nothing is written in between)"""
+        now = time.time() if now is None else now
+        keys, delays = list(keys), list(delays)
+        with self._lock:
+            mask = self.check(keys, delays, now)
+            self._store([k for k, m in zip(keys, mask) if m], [d for d, m in zip(delays, mask) if m], now)
+        return mask
+
+    def filter(self, frame: pd.DataFrame, keys: Sequence[Hashable], value_column: str = 'delay_minutes',
+               now: Optional[float] = None) -> pd.DataFrame:
+        """Rows of `frame` (aligned with `keys`) that are new or changed"""
+        if len(frame) == 0:
+            return frame
+        return frame[self.changed(keys, frame[value_column].to_numpy(), now)]
+
+    def stats(self) -> dict:
+        return {
+            'tracked': len(self._seen),
+            'observed': self.observed,
+            'emitted': self.emitted,
+            'suppressed': self.observed - self.emitted,
+            'expired': self.expired,
+            'evicted': self.evicted,
+        }
+
+
+_SHARED: Optional[DepartureDeduplicator] = None
+_SHARED_LOCK = threading.Lock()
+
+
+def shared_deduplicator() -> DepartureDeduplicator:
+    """Process-wide deduplicator (survives collector instances)"""
+    global _SHARED
+    with _SHARED_LOCK:
+        if _SHARED is None:
+            _SHARED = DepartureDeduplicator()
+        return _SHARED
@@ -0,0 +1,79 @@
+"""
+Columnar parsing of departure API responses
+Turns a whole v6 / VBB departure list into one typed frame in a single pass
+instead of one dict (and two DB writes) per departure:
+- fields are pulled out once per column, then everything is array operations
+- hour / weekday are sliced from the ISO 'when' strings (local time as sent)
+- peak and Cologne flags, distance lookup and delay conversion are vectorized
+- columns follow the typed training schema (data/loader.py), so the frame goes
+  straight to the bulk DB writer and to FeatureTransformer.transform()
+"""
+
+from datetime import datetime
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from .loader import optimize_dtypes
+from .real_time_collector import STATION_DISTANCES
+
+DEFAULT_DISTANCE_KM = 50
+PEAK_HOURS = np.array([(7 <= h <= 9) or (16 <= h <= 18) for h in range(24)], dtype=np.int8)
+UNPARSEABLE_HOUR = 12
+
+COLUMNS = ['distance_km', 'time_of_day', 'day_of_week', 'is_peak_hour', 'is_cologne_bottleneck',
+           'delay_minutes', 'source', 'timestamp']
+
+
+def _column(departures: list, key: str) -> pd.Series:
+    return pd.Series([d.get(key) for d in departures], dtype=object)
+
+
+def parse_departures(departures: Iterable[dict], station_name: str, now: Optional[datetime] = None) -> pd.DataFrame:
+    """
+    Parse a departure list into the training format (one row per departure)
+
+    Args:
+        departures: Departure dicts from get_departures()
+        station_name: Station the departures were requested for (distance lookup)
+        now: Collection time (default: datetime.now())
+
+    Returns:
+        Typed frame with the RealTimeCollector.parse_departure columns
+    """
+    departures = list(departures)
+    now = now or datetime.now()
+    if not departures:
+        return optimize_dtypes(pd.DataFrame(columns=COLUMNS))
+
+    # Delay: seconds (v6) or minutes (delayInMinutes), 0 when unknown
+    seconds = pd.to_numeric(_column(departures, 'delay'), errors='coerce').to_numpy(dtype=np.float64)
+    minutes = pd.to_numeric(_column(departures, 'delayInMinutes'), errors='coerce').to_numpy(dtype=np.float64)
+    delay = np.where(~np.isnan(seconds), np.floor(seconds / 60), np.nan_to_num(minutes, nan=0.0))
+
+    # Hour and weekday straight from 'YYYY-MM-DDTHH:MM:SS±hh:mm' (local time of the stop)
+    when = _column(departures, 'when').fillna('').astype(str)
+    hour = pd.to_numeric(when.str.slice(11, 13), errors='coerce')
+    date = pd.to_datetime(when.str.slice(0, 10), format='%Y-%m-%d', errors='coerce')
+    hour = np.where(when == '', 0, hour.fillna(UNPARSEABLE_HOUR)).astype(np.int64)
+    hour = np.clip(hour, 0, 23)
+    weekday = date.dt.weekday.fillna(now.weekday()).to_numpy(dtype=np.int64)
+
+    # Cologne passage and distance from the direction text
+    direction = _column(departures, 'direction').fillna('').astype(str).str.lower()
+    is_cologne = direction.str.contains('köln|cologne', regex=True).to_numpy(dtype=np.int8)
+    distances = {city: km for (station, city), km in STATION_DISTANCES.items() if station == station_name}
+    distance = direction.map(distances).fillna(DEFAULT_DISTANCE_KM).to_numpy(dtype=np.float64)
+
+    frame = pd.DataFrame({
+        'distance_km': distance,
+        'time_of_day': hour,
+        'day_of_week': weekday,
+        'is_peak_hour': PEAK_HOURS[hour],
+        'is_cologne_bottleneck': is_cologne,
+        'delay_minutes': np.maximum(delay, 0),
+        'source': 'real',
+        'timestamp': pd.Timestamp(now),
+    })
+    return optimize_dtypes(frame)
@@ -0,0 +1,566 @@
+"""
+Local stand-in for the IRIS, v6 and VBB APIs
+Lets RealTimeCollector, StationDownloader and DBCollector run against
+localhost instead of the rate-limited production endpoints:
+- routes: /iris/station|plan|fchg|rchg, /v6/stops[/{id}[/departures]], /v6/locations,
+  /vbb/stops/{id}/departures (same paths below the base URL as production)
+- synthetic timetables: deterministic per station and hour (seeded), trains
+  per hour configurable (large payloads), delays drift in 2-minute epochs so
+  /rchg and repeated departure polls see realistic changes
+- or replayed responses from data/archive recordings (synthetic as fallback)
+- faults: latency + jitter, random error rate, periodic 429 / 503 bursts,
+  per-client rate limit with Retry-After (production: 6 requests / minute)
+- stdlib ThreadingHTTPServer with keep-alive, rendered bodies cached per
+  epoch, so a dev box serves thousands of requests per second
+- counters per API and status at GET /metrics
+
+Usage:
+    python -m data.emulator --port 8700 --trains-per-hour 60 --latency-ms 20 --burst-every 60
+    METRODORF_API_URL=http://127.0.0.1:8700 python -m data.real_time_collector
+    python -m data.emulator --load http://127.0.0.1:8700 --concurrency 64 --duration 10
+    python -m data.emulator --load-collectors http://127.0.0.1:8700 --concurrency 16
+"""
+
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from datetime import datetime, timedelta
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, NamedTuple, Optional
+from urllib.parse import parse_qs, urlsplit
+from xml.sax.saxutils import quoteattr
+
+from .api_config import DEFAULT_BASE_URLS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8700
+EPOCH_SECONDS = 120          # delays change at most once per epoch (= /rchg window)
+CHANGE_LOOKBACK = 60         # epochs scanned for the last change of a train
+
+STATIONS = {
+    '8000080': ('Dortmund Hbf', 'EDO', 51.5175, 7.4592),
+    '8000098': ('Essen Hbf', 'EE', 51.4514, 7.0142),
+    '8000086': ('Duisburg Hbf', 'EDG', 51.4344, 6.7623),
+    '8000085': ('Düsseldorf Hbf', 'KD', 51.2277, 6.7735),
+    '8000207': ('Köln Hbf', 'KK', 50.9422, 6.9581),
+    '8000044': ('Bonn Hbf', 'KB', 50.7359, 7.0999),
+    '8000041': ('Bochum Hbf', 'EBO', 51.4786, 7.2233),
+    '8000266': ('Wuppertal Hbf', 'KW', 51.2543, 7.1497),
+}
+
+# (category, line, path) — path is the IRIS ppth of a departure
+LINES = [
+    ('ICE', None, 'Essen Hbf|Duisburg Hbf|Düsseldorf Hbf|Köln Hbf'),
+    ('IC', None, 'Hagen Hbf|Wuppertal Hbf|Köln Hbf|Bonn Hbf'),
+    ('RE', '1', 'Bochum Hbf|Essen Hbf|Duisburg Hbf|Düsseldorf Hbf|Köln Hbf'),
+    ('RE', '6', 'Essen Hbf|Duisburg Hbf|Düsseldorf Hbf'),
+    ('RB', '40', 'Bochum Hbf|Essen Hbf'),
+    ('S', '1', 'Bochum Hbf|Essen Hbf|Duisburg Hbf'),
+    ('S', '6', 'Düsseldorf Hbf|Köln Hbf'),
+]
+
+
+class Train(NamedTuple):
+    trip_id: str
+    stop_id: str
+    category: str
+    number: str
+    line: Optional[str]
+    planned: datetime
+    platform: str
+    path: str
+    base_delay: float        # minutes, the train's typical delay
+    cancelled: bool
+
+
+class Faults:
+    """Injected latency and errors"""
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0,
+                 error_status: int = 503, burst_every: float = 0.0, burst_length: float = 5.0,
+                 burst_status: int = 429, rate_limit: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.burst_every = burst_every
+        self.burst_length = burst_length
+        self.burst_status = burst_status
+        self.rate_limit = rate_limit      # requests per minute per client and API (0 = off)
+        self.started = time.monotonic()
+        self._clients = defaultdict(deque)
+        self._lock = threading.Lock()
+
+    def delay(self):
+        latency = self.latency_ms + (random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0)
+        if latency > 0:
+            time.sleep(latency / 1000)
+
+    def status(self, client: str, api: str) -> Optional[int]:
+        """Error status to answer with, or None to serve normally"""
+        now = time.monotonic()
+        if self.burst_every and (now - self.started) % self.burst_every < self.burst_length:
+            return self.burst_status
+        if self.rate_limit:
+            with self._lock:
+                window = self._clients[(client, api)]
+                while window and window[0] < now - 60:
+                    window.popleft()
+                if len(window) >= self.rate_limit:
+                    return 429
+                window.append(now)
+        if self.error_rate and random.random() < self.error_rate:
+            return self.error_status
+        return None
+
+
+class Timetable:
+    """Deterministic synthetic trains and delays per station"""
+
+    def __init__(self, trains_per_hour: int = 30, volatility: float = 0.15, seed: int = 42):
+        self.trains_per_hour = trains_per_hour
+        self.volatility = volatility   # probability a train's delay changes per epoch
+        self.seed = seed
+
+    @staticmethod
+    def station(eva: str):
+        return STATIONS.get(eva, (f"Station {eva}", 'XX', 51.0, 7.0))
+
+    @lru_cache(maxsize=4096)
+    def trains(self, eva: str, hour_start: datetime) -> tuple:
+        """Trains departing `eva` within one hour"""
+        rng = random.Random(f"{self.seed}:{eva}:{hour_start:%y%m%d%H}")
+        trains = []
+        for i in range(self.trains_per_hour):
+            category, line, path = LINES[rng.randrange(len(LINES))]
+            planned = hour_start + timedelta(minutes=int(i * 60 / self.trains_per_hour))
+            daily_id = rng.randrange(-9 * 10 ** 18, 9 * 10 ** 18)
+            number = str(rng.randrange(1000, 99999))
+            trains.append(Train(
+                trip_id=f"{daily_id}-{planned:%y%m%d%H%M}",
+                stop_id=f"{daily_id}-{planned:%y%m%d%H%M}-{rng.randrange(1, 20)}",
+                category=category,
+                number=number,
+                line=line,
+                planned=planned,
+                platform=str(rng.randrange(1, 20)),
+                path=path,
+                base_delay=rng.lognormvariate(0.5, 1.0) if rng.random() < 0.6 else 0.0,
+                cancelled=rng.random() < 0.02,
+            ))
+        return tuple(trains)
+
+    def window(self, eva: str, start: datetime, end: datetime) -> List[Train]:
+        hour = start.replace(minute=0, second=0, microsecond=0)
+        trains = []
+        while hour < end:
+            trains.extend(t for t in self.trains(eva, hour) if start <= t.planned < end)
+            hour += timedelta(hours=1)
+        return trains
+
+    def _changes(self, train: Train, epoch: int) -> bool:
+        return random.Random(f"{train.trip_id}:{epoch}").random() < self.volatility
+
+    def delay(self, train: Train, epoch: int) -> int:
+        """Delay in minutes at an epoch: value drawn at the train's last change epoch"""
+        for e in range(epoch, epoch - CHANGE_LOOKBACK, -1):
+            if self._changes(train, e):
+                return max(0, round(train.base_delay + random.Random(f"{train.trip_id}:{e}:d").gauss(0, 2)))
+        return round(train.base_delay)
+
+
+def _epoch(now: Optional[float] = None) -> int:
+    return int((now or time.time()) // EPOCH_SECONDS)
+
+
+def _iris_time(value: datetime) -> str:
+    return value.strftime('%y%m%d%H%M')
+
+
+def _iso(value: datetime) -> str:
+    return value.astimezone().isoformat(timespec='seconds')
+
+
+class Emulator:
+    """Renders IRIS XML and v6 / VBB JSON bodies (cached per epoch)"""
+
+    def __init__(self, timetable: Timetable, faults: Faults, replay=None):
+        self.timetable = timetable
+        self.faults = faults
+        self.replay = replay
+        self.requests = Counter()
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+
+    # IRIS --------------------------------------------------
+    @lru_cache(maxsize=1024)
+    def iris_station(self, pattern: str) -> bytes:
+        matches = [(eva, s) for eva, s in STATIONS.items() if pattern in (eva, s[1]) or pattern.lower() in s[0].lower()]
+        body = ''.join(f'<station name={quoteattr(name)} eva="{eva}" ds100="{ds100}"/>'
+                       for eva, (name, ds100, _, _) in matches)
+        return f'<?xml version="1.0" encoding="UTF-8"?><stations>{body}</stations>'.encode()
+
+    @lru_cache(maxsize=4096)
+    def iris_plan(self, eva: str, date: str, hour: str) -> bytes:
+        hour_start = datetime.strptime(date + hour, '%y%m%d%H')
+        name = self.timetable.station(eva)[0]
+        stops = []
+        for t in self.timetable.trains(eva, hour_start):
+            line = f' l="{t.line}"' if t.line else ''
+            stops.append(
+                f'<s id="{t.stop_id}"><tl f="F" t="p" o="800165" c="{t.category}" n="{t.number}"/>'
+                f'<ar pt="{_iris_time(t.planned - timedelta(minutes=2))}" pp="{t.platform}"{line}/>'
+                f'<dp pt="{_iris_time(t.planned)}" pp="{t.platform}"{line} ppth={quoteattr(t.path)}/></s>')
+        return (f'<?xml version="1.0" encoding="UTF-8"?><timetable station={quoteattr(name)}>'
+                f'{"".join(stops)}</timetable>').encode()
+
+    def _change_stops(self, eva: str, trains: List[Train], epoch: int, only_changed: bool) -> List[str]:
+        """<s> elements with changed times (all known changes, or only those of this epoch)"""
+        stops = []
+        for t in trains:
+            delay = self.timetable.delay(t, epoch)
+            if only_changed and delay == self.timetable.delay(t, epoch - 1):
+                continue
+            if t.cancelled:
+                stops.append(f'<s id="{t.stop_id}" eva="{eva}"><dp cs="c"/></s>')
+            elif delay or only_changed:
+                stops.append(f'<s id="{t.stop_id}" eva="{eva}">'
+                             f'<dp ct="{_iris_time(t.planned + timedelta(minutes=delay))}"/></s>')
+        return stops
+
+    @lru_cache(maxsize=1024)
+    def iris_changes(self, eva: str, epoch: int, recent: bool) -> bytes:
+        now = datetime.fromtimestamp(epoch * EPOCH_SECONDS)
+        trains = self.timetable.window(eva, now - timedelta(hours=1), now + timedelta(hours=3))
+        stops = self._change_stops(eva, trains, epoch, only_changed=recent)
+        name = self.timetable.station(eva)[0]
+        return (f'<?xml version="1.0" encoding="UTF-8"?><timetable station={quoteattr(name)} eva="{eva}">'
+                f'{"".join(stops)}</timetable>').encode()
+
+    # v6 / VBB ----------------------------------------------
+    @lru_cache(maxsize=4096)
+    def departures(self, eva: str, epoch: int, minute: int, duration: int, limit: int) -> List[dict]:
+        now = datetime.fromtimestamp(minute * 60)
+        trains = self.timetable.window(eva, now, now + timedelta(minutes=duration))[:limit]
+        result = []
+        for t in trains:
+            delay = self.timetable.delay(t, epoch)
+            name = f"{t.category} {t.line or t.number}"
+            result.append({
+                'tripId': f"1|{t.trip_id}|0|80|{t.planned:%d%m%Y}",
+                'stop': {'type': 'stop', 'id': eva, 'name': self.timetable.station(eva)[0]},
+                'when': None if t.cancelled else _iso(t.planned + timedelta(minutes=delay)),
+                'plannedWhen': _iso(t.planned),
+                'delay': None if t.cancelled else delay * 60,
+                'platform': t.platform,
+                'plannedPlatform': t.platform,
+                'direction': t.path.split('|')[-1],
+                'line': {'type': 'line', 'name': name, 'fahrtNr': t.number, 'product': t.category.lower()},
+                'cancelled': t.cancelled,
+            })
+        return result
+
+    @lru_cache(maxsize=4096)
+    def departures_body(self, api: str, eva: str, epoch: int, minute: int, duration: int, limit: int) -> bytes:
+        departures = self.departures(eva, epoch, minute, duration, limit)
+        # v6 wraps departures in an object, VBB (v5) returns the plain list
+        body = {'departures': departures, 'realtimeDataUpdatedAt': minute * 60} if api == 'v6' else departures
+        return json.dumps(body).encode()
+
+    def stop(self, eva: str) -> dict:
+        name, ds100, lat, lon = self.timetable.station(eva)
+        return {'type': 'stop', 'id': eva, 'name': name, 'ds100': ds100,
+                'location': {'type': 'location', 'latitude': lat, 'longitude': lon}}
+
+    # Routing -----------------------------------------------
+    def route(self, path: str, query: Dict[str, List[str]]):
+        """(status, content type, body) for a request path below /iris, /v6 or /vbb"""
+        parts = [p for p in path.split('/') if p]
+        if not parts:
+            return 404, 'application/json', b'{"error":"not found"}'
+        api, rest = parts[0], parts[1:]
+        arg = lambda key, default: int(query.get(key, [default])[0])
+        epoch = _epoch()
+
+        if api == 'iris' and len(rest) >= 2:
+            kind, eva = rest[0], rest[1]
+            if kind == 'station':
+                return 200, 'application/xml', self.iris_station(eva)
+            if kind == 'plan' and len(rest) == 4:
+                return 200, 'application/xml', self.iris_plan(eva, rest[2], rest[3])
+            if kind in ('fchg', 'rchg'):
+                return 200, 'application/xml', self.iris_changes(eva, epoch, kind == 'rchg')
+        elif api in ('v6', 'vbb') and rest and rest[0] in ('stops', 'locations'):
+            if len(rest) == 3 and rest[2] == 'departures':
+                body = self.departures_body(api, rest[1], epoch, int(time.time() // 60),
+                                            arg('duration', 10), arg('limit', 1000))
+                return 200, 'application/json', body
+            if len(rest) == 2:
+                return 200, 'application/json', json.dumps(self.stop(rest[1])).encode()
+            if len(rest) == 1:
+                text = query.get('query', [''])[0].lower()
+                matches = [self.stop(eva) for eva, s in STATIONS.items() if text in s[0].lower()]
+                return 200, 'application/json', json.dumps(matches[:arg('results', 10)]).encode()
+        return 404, 'application/json', b'{"error":"not found"}'
+
+    def replayed(self, api: str, path: str, query: str):
+        """Archived answer for the production URL of this request, if any"""
+        rest = path.split('/', 2)[2] if path.count('/') >= 2 else ''
+        url = f"{DEFAULT_BASE_URLS[api]}/{rest}" + (f"?{query}" if query else '')
+        record = self.replay.next_record('GET', url)
+        if record is None or record.get('error'):
+            return None
+        self.replay.wait_for(record)
+        content_type = (record.get('headers') or {}).get('Content-Type', 'application/octet-stream')
+        return record['status'], content_type, (record.get('body') or '').encode('utf-8', 'surrogateescape')
+
+    def count(self, api: str, status: int, size: int):
+        with self._lock:
+            self.requests[(api, status)] += 1
+            self.bytes_sent += size
+
+    def metrics(self) -> dict:
+        with self._lock:
+            per_api = defaultdict(dict)
+            for (api, status), n in sorted(self.requests.items()):
+                per_api[api][str(status)] = n
+            return {
+                'uptime_s': round(time.monotonic() - self.faults.started, 1),
+                'requests': sum(self.requests.values()),
+                'bytes_sent': self.bytes_sent,
+                'per_api': per_api,
+            }
+
+
+def make_handler(emulator: Emulator):
+    """HTTP handler bound to an emulator instance"""
+
+    class EmulatorHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like the production APIs
+        disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+        def _send(self, status: int, content_type: str, body: bytes, headers: Optional[dict] = None):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            api = parts.path.strip('/').split('/', 1)[0]
+            if api == 'metrics':
+                self._send(200, 'application/json', json.dumps(emulator.metrics()).encode())
+                return
+            if api == 'health':
+                self._send(200, 'application/json', b'{"status":"ok"}')
+                return
+
+            emulator.faults.delay()
+            status = emulator.faults.status(self.client_address[0], api) if api in DEFAULT_BASE_URLS else None
+            if status is not None:
+                body = json.dumps({'error': 'emulated', 'status': status}).encode()
+                self._send(status, 'application/json', body, {'Retry-After': '60'} if status == 429 else None)
+                emulator.count(api, status, len(body))
+                return
+            try:
+                answer = emulator.replayed(api, parts.path, parts.query) if emulator.replay and api in DEFAULT_BASE_URLS else None
+                status, content_type, body = answer or emulator.route(parts.path, parse_qs(parts.query))
+            except Exception as e:
+                logger.error(f"Emulator failed on {self.path}: {e}")
+                status, content_type, body = 500, 'application/json', json.dumps({'error': str(e)}).encode()
+            self._send(status, content_type, body)
+            emulator.count(api, status, len(body))
+
+    return EmulatorHandler
+
+
+class ThreadingTCPHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # load tests open many connections at once
+
+
+def start_server(port: int = DEFAULT_PORT, host: str = "127.0.0.1", timetable: Optional[Timetable] = None,
+                 faults: Optional[Faults] = None, replay=None):
+    """Start the emulator on a background thread; returns (server, emulator)"""
+    emulator = Emulator(timetable or Timetable(), faults or Faults(), replay)
+    server = ThreadingTCPHTTPServer((host, port), make_handler(emulator))
+    threading.Thread(target=server.serve_forever, name="api-emulator", daemon=True).start()
+    logger.info(f"🧪 API emulator listening on http://{host}:{server.server_port} (/iris, /v6, /vbb)")
+    return server, emulator
+
+
+# ============================================
+# LOAD TESTS
+# ============================================
+def load_test(base_url: str, concurrency: int = 32, duration: float = 10.0) -> dict:
+    """
+    Hammer the emulator with departure / change requests from `concurrency`
+    keep-alive connections (http.client: the client must not be the bottleneck)
+    """
+    import http.client
+    import numpy as np
+
+    target = urlsplit(base_url)
+    prefix = target.path.rstrip('/')
+    evas = list(STATIONS)
+    paths = [f"{prefix}/v6/stops/{eva}/departures?duration=60" for eva in evas] + \
+            [f"{prefix}/vbb/stops/{eva}/departures?duration=60" for eva in evas] + \
+            [f"{prefix}/iris/rchg/{eva}" for eva in evas]
+    latencies, statuses = [], Counter()
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def worker(i):
+        connection = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=10)
+        local_latencies, local_statuses = [], Counter()
+        n = i
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                connection.request('GET', paths[n % len(paths)])
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                status = 'error'
+            local_latencies.append(time.perf_counter() - start)
+            local_statuses[status] += 1
+            n += 1
+        connection.close()
+        with lock:
+            latencies.extend(local_latencies)
+            statuses.update(local_statuses)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    ms = np.array(latencies) * 1000
+    result = {
+        'requests': len(latencies),
+        'requests_per_second': round(len(latencies) / duration, 1),
+        'p50_ms': round(float(np.percentile(ms, 50)), 2) if len(ms) else None,
+        'p99_ms': round(float(np.percentile(ms, 99)), 2) if len(ms) else None,
+        'statuses': {str(k): v for k, v in statuses.items()},
+    }
+    logger.info(f"📊 Load test: {result}")
+    return result
+
+
+def collector_load_test(base_url: str, concurrency: int = 8, duration: float = 30.0) -> dict:
+    """
+    Run `concurrency` RealTimeCollectors against the emulator (no request spacing),
+    exercising their fetch paths, 429 / 503 handling and API disabling
+    """
+    import os
+    os.environ["METRODORF_API_URL"] = base_url
+    os.environ["METRODORF_MIN_REQUEST_INTERVAL"] = "0"
+    from .real_time_collector import RealTimeCollector
+
+    polls = Counter()
+    disabled = Counter()
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def worker(_):
+        collector = RealTimeCollector()
+        n = 0
+        while time.monotonic() < deadline:
+            for station in collector.stations:
+                if time.monotonic() >= deadline:
+                    break
+                raw = collector.fetch_sources(station)
+                n += 1
+                with lock:
+                    for api, departures in raw.items():
+                        polls[(api, bool(departures))] += 1
+        with lock:
+            polls['station_polls'] += n
+            for api, failures in collector.api_failures.items():
+                disabled[api] += failures >= collector.max_failures
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    result = {
+        'collectors': concurrency,
+        'station_polls': polls.pop('station_polls', 0),
+        'station_polls_per_second': None,
+        'answers': {f"{api}_{'data' if ok else 'empty'}": n for (api, ok), n in polls.items()},
+        'collectors_with_api_disabled': dict(disabled),
+    }
+    result['station_polls_per_second'] = round(result['station_polls'] / duration, 1)
+    logger.info(f"📊 Collector load test: {result}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local IRIS / v6 / VBB emulator")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--trains-per-hour", type=int, default=30, help="Departures per station and hour")
+    parser.add_argument("--volatility", type=float, default=0.15, help="Chance a delay changes per 2-min epoch")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--replay", default=None, help="Serve recorded responses (data/archive) where available")
+    parser.add_argument("--replay-speed", type=float, default=0, help="Recorded pace multiplier (0 = no waiting)")
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0, help="Share of requests answered with --error-status")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--burst-every", type=float, default=0, help="Seconds between error bursts (0 = none)")
+    parser.add_argument("--burst-length", type=float, default=5, help="Seconds each burst lasts")
+    parser.add_argument("--burst-status", type=int, default=429)
+    parser.add_argument("--rate-limit", type=int, default=0, help="Requests per minute per client and API (0 = off)")
+    parser.add_argument("--load", metavar="URL", default=None, help="Run an HTTP load test against an emulator")
+    parser.add_argument("--load-collectors", metavar="URL", default=None,
+                        help="Run concurrent RealTimeCollectors against an emulator")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.load:
+        print(json.dumps(load_test(args.load, args.concurrency, args.duration), indent=2))
+        return
+    if args.load_collectors:
+        print(json.dumps(collector_load_test(args.load_collectors, args.concurrency, args.duration), indent=2))
+        return
+
+    replay = None
+    if args.replay:
+        from .archive import ReplayArchive
+        replay = ReplayArchive(args.replay, speed=args.replay_speed)
+    faults = Faults(args.latency_ms, args.jitter_ms, args.error_rate, args.error_status,
+                    args.burst_every, args.burst_length, args.burst_status, args.rate_limit)
+    server, _ = start_server(args.port, args.host, Timetable(args.trains_per_hour, args.volatility, args.seed),
+                             faults, replay)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        logger.info("🛑 Shutting down API emulator")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+Cross-source per-train delay fusion (IRIS, v6, VBB)
+Replaces "first delay of each API, averaged" with one fused record per train:
+- every source is normalized to the same key: station EVA, line name
+  (ICE723, RE1, S6, ...) and planned departure minute (local time)
+- sources are aligned with hash joins on that key (outer: a train seen by a
+  single API is kept); same-line trains planned in the same minute are
+  numbered within the key instead of collapsing into one
+- trains are told apart downstream (dedup, scheduler) by trip id: the IRIS
+  trip id or HAFAS tripId of the most reliable source that sent one
+- reliability weights are applied per matched train in vectorized form,
+  renormalized over the sources that actually reported a delay
+- per-source delays, trip ids and a provenance string are kept
+
+Usage:
+    fused = fuse({'iris': iris_frame(stops), 'v6': hafas_frame(v6, eva), 'vbb': hafas_frame(vbb, eva)})
+"""
+
+from typing import Dict, Iterable, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+from .iris_feed import IrisFeed
+from .loader import optimize_dtypes
+from .real_time_collector import STATION_DISTANCES
+
+# API reliability weights (Dr. Oscar's recommendation)
+SOURCE_WEIGHTS = {
+    'iris': 0.7,   # most reliable
+    'v6': 0.2,     # unstable
+    'vbb': 0.1     # least reliable
+}
+KEYS = ['eva', 'line', 'planned']
+TRAIN_KEY = ['eva', 'trip_id', 'planned']   # dedup / scheduler key (line where no trip id)
+SOURCE_COLUMNS = ['delay', 'trip_id', 'direction', 'cancelled']
+DEFAULT_DISTANCE_KM = 50
+
+
+def normalize_line(names: pd.Series) -> pd.Series:
+    """'ICE 723' / 'RE 1' / 're1' → 'ICE723' / 'RE1' / 'RE1'"""
+    return names.astype('string').str.replace(r'\s+', '', regex=True).str.upper()
+
+
+def iris_frame(stops: Iterable[dict]) -> pd.DataFrame:
+    """Normalize IrisFeed stop states (stops with a planned departure or arrival)"""
+    stops = list(stops)
+    if not stops:
+        return pd.DataFrame(columns=KEYS + SOURCE_COLUMNS)
+    category = pd.Series([s.get('category') for s in stops], dtype=object)
+    # Regional trains carry a line (RE 1), long distance only a train number (ICE 723)
+    line = pd.Series([s.get('line') or s.get('number') for s in stops], dtype=object)
+    planned = [s.get('departure_planned') or s.get('arrival_planned') for s in stops]
+    path = pd.Series([s.get('departure_path') or s.get('arrival_path') or '' for s in stops], dtype=object)
+    frame = pd.DataFrame({
+        'eva': [s.get('eva') for s in stops],
+        'line': normalize_line(category.fillna('') + line.fillna('').astype(str)),
+        'planned': pd.to_datetime(pd.Series(planned, dtype=object), errors='coerce').dt.floor('min'),
+        'delay': np.array([IrisFeed.stop_delay(s) for s in stops], dtype=np.float64),
+        'trip_id': [s.get('trip_id') for s in stops],
+        'direction': path.str.split('|').str[-1],
+        'cancelled': [bool(s.get('departure_cancelled') or s.get('arrival_cancelled')) for s in stops],
+    })
+    return frame.dropna(subset=['line', 'planned'])
+
+
+def hafas_keys(departures: Iterable[dict], eva: str) -> pd.DataFrame:
+    """Join and trip keys of v6 / VBB departures, one row per departure (NA where unknown)"""
+    departures = list(departures)
+    line = pd.Series([(d.get('line') or {}).get('name') for d in departures], dtype=object)
+    planned = pd.Series([d.get('plannedWhen') or d.get('when') or '' for d in departures], dtype=object)
+    return pd.DataFrame({
+        'eva': pd.Series(eva, index=line.index, dtype=object),
+        'line': normalize_line(line),
+        # Local wall-clock minute as sent ('YYYY-MM-DDTHH:MM'), comparable with IRIS times
+        'planned': pd.to_datetime(planned.astype(str).str.slice(0, 16), format='%Y-%m-%dT%H:%M', errors='coerce'),
+        'trip_id': pd.Series([d.get('tripId') for d in departures], index=line.index, dtype=object),
+    })
+
+
+def hafas_frame(departures: Iterable[dict], eva: str) -> pd.DataFrame:
+    """Normalize v6 / VBB (hafas-client) departures of one station"""
+    departures = list(departures)
+    if not departures:
+        return pd.DataFrame(columns=KEYS + SOURCE_COLUMNS)
+    delay = pd.to_numeric(pd.Series([d.get('delay') for d in departures], dtype=object), errors='coerce')
+    frame = hafas_keys(departures, eva).assign(
+        delay=delay.to_numpy(dtype=np.float64) / 60,
+        direction=[d.get('direction') for d in departures],
+        cancelled=[bool(d.get('cancelled')) for d in departures],
+    )
+    return frame[KEYS + SOURCE_COLUMNS].dropna(subset=['line', 'planned'])
+
+
+def _train_ids(trains: pd.DataFrame) -> pd.Series:
+    """Trip id per train, the line where no source sent one"""
+    if 'trip_id' not in trains:
+        return trains['line']
+    return trains['trip_id'].where(trains['trip_id'].notna(), trains['line'])
+
+
+def has_train_key(trains: pd.DataFrame) -> np.ndarray:
+    """Rows with a complete train key (NA keys would all collide in the deduplicator)"""
+    if not len(trains):
+        return np.zeros(0, dtype=bool)
+    return (trains['eva'].notna() & _train_ids(trains).notna() & trains['planned'].notna()).to_numpy()
+
+
+def train_keys(trains: pd.DataFrame) -> list:
+    """(eva, trip id or line, planned) tuples of a frame with KEYS columns (dedup / scheduler keys)"""
+    if not len(trains):
+        return []
+    return list(zip(trains['eva'], _train_ids(trains), trains['planned']))
+
+
+def source_frames(raw: Mapping[str, Iterable[dict]], eva: str) -> Dict[str, pd.DataFrame]:
+    """Normalize raw per-API departures (RealTimeCollector.fetch_sources) in reliability order"""
+    frames = {}
+    for name in ('iris', 'v6', 'vbb'):
+        if name in raw:
+            frames[name] = iris_frame(raw[name]) if name == 'iris' else hafas_frame(raw[name], eva)
+    return frames
+
+
+def fuse(frames: Mapping[str, Optional[pd.DataFrame]], weights: Mapping[str, float] = SOURCE_WEIGHTS) -> pd.DataFrame:
+    """
+    Align all sources per train and compute the weighted delay
+
+    Args:
+        frames: source name → normalized frame (iris_frame / hafas_frame)
+        weights: Reliability weight per source (renormalized per train)
+
+    Returns:
+        One row per train: keys, delay_minutes, n_sources, sources, spread,
+        direction, cancelled, trip_id and delay_/trip_id_<source> provenance columns
+    """
+    sources = [name for name, frame in frames.items() if frame is not None and len(frame)]
+    if not sources:
+        return pd.DataFrame(columns=KEYS + ['delay_minutes', 'n_sources', 'sources', 'trip_id'])
+
+    fused = None
+    for name in sources:
+        # Trains sharing a join key (same line, same minute) are numbered in trip id order
+        frame = frames[name].sort_values('trip_id', kind='stable', na_position='last')
+        frame = frame.assign(n=frame.groupby(KEYS, sort=False).cumcount())
+        part = frame.set_index(KEYS + ['n'])[SOURCE_COLUMNS].add_suffix(f'_{name}')
+        fused = part if fused is None else fused.join(part, how='outer')  # hash join on the train key
+
+    delays = fused[[f'delay_{name}' for name in sources]].to_numpy(dtype=np.float64)
+    reported = ~np.isnan(delays)
+    w = np.array([weights.get(name, 0.1) for name in sources], dtype=np.float64)
+    weight_sum = reported @ w
+    with np.errstate(invalid='ignore', divide='ignore'):
+        fused['delay_minutes'] = np.where(weight_sum > 0, np.nan_to_num(delays) @ w / weight_sum, np.nan)
+        fused['spread'] = np.where(reported.any(axis=1),
+                                   np.nanmax(np.where(reported, delays, -np.inf), axis=1)
+                                   - np.nanmin(np.where(reported, delays, np.inf), axis=1), np.nan)
+    fused['n_sources'] = reported.sum(axis=1)
+
+    # Provenance: '+'-joined names of the sources that reported a delay
+    provenance = np.full(len(fused), '', dtype=object)
+    for i, name in enumerate(sources):
+        provenance = provenance + np.where(reported[:, i], f'+{name}', '')
+    fused['sources'] = pd.Series(provenance, index=fused.index).str.lstrip('+')
+
+    # First source (in reliability order of `frames`) that knows the direction
+    fused['direction'] = fused[[f'direction_{name}' for name in sources]].bfill(axis=1).iloc[:, 0]
+    fused['trip_id'] = fused[[f'trip_id_{name}' for name in sources]].bfill(axis=1).iloc[:, 0]
+    fused['cancelled'] = fused[[f'cancelled_{name}' for name in sources]].fillna(False).astype(bool).any(axis=1)
+    fused = fused.drop(columns=[f'{col}_{name}' for name in sources for col in ('direction', 'cancelled')])
+    return fused.reset_index().drop(columns='n')
+
+
+def to_training_frame(fused: pd.DataFrame, station_names: Mapping[str, str]) -> pd.DataFrame:
+    """
+    Fused trains in the collector's training format (typed schema)
+
+    Args:
+        station_names: EVA → station name (distance lookup)
+    """
+    fused = fused[~fused['cancelled'] & fused['delay_minutes'].notna()]
+    direction = fused['direction'].fillna('').astype(str).str.lower()
+    station = fused['eva'].map(station_names).fillna('')
+    # Destination city as in the distance table ('dortmund', 'essen', ...)
+    city = direction.str.split(' ').str[0].str.split('(').str[0]
+    distance = pd.Series([STATION_DISTANCES.get(key, DEFAULT_DISTANCE_KM) for key in zip(station, city)],
+                         index=fused.index, dtype=np.float64)
+    hour = fused['planned'].dt.hour
+    frame = pd.DataFrame({
+        'distance_km': distance,
+        'time_of_day': hour,
+        'day_of_week': fused['planned'].dt.weekday,
+        'is_peak_hour': (hour.between(7, 9) | hour.between(16, 18)).astype(np.int8),
+        'is_cologne_bottleneck': direction.str.contains('köln|cologne', regex=True).astype(np.int8),
+        'delay_minutes': fused['delay_minutes'].clip(lower=0),
+        'source': 'real_fused',
+        'timestamp': fused['planned'],
+        'station_name': station,
+        'sources': fused['sources'],
+    })
+    return optimize_dtypes(frame.reset_index(drop=True))
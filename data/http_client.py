@@ -0,0 +1,293 @@
+"""
+Shared HTTP client for all collectors and downloaders
+One process-wide requests.Session instead of one per collector instance
+(BasePredictor and the dashboard create collectors repeatedly):
+- per-host urllib3 connection pools with keep-alive: warm TCP / TLS
+  connections survive collector instances
+- retries with exponential backoff on connection errors and 502 / 503 / 504
+  (429 is left to the collectors, which back off themselves)
+- default (connect, read) timeout when a caller passes none
+- compressed transfer (gzip / deflate, br when brotli is installed)
+- conditional GETs: ETag / Last-Modified of 200 answers are remembered and sent
+  back as If-None-Match / If-Modified-Since; a 304 is served from the cached
+  body as a normal 200, so callers are unchanged (streamed requests are never
+  cached, their bodies stay streamed; the cache is bounded in bytes)
+- per-host latency histograms (log-spaced buckets), status counts, bytes,
+  revalidation hits and connections opened (http_stats())
+
+Record / replay archives (data/archive.py) mount on the same session.
+"""
+
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, OrderedDict
+from typing import Dict, NamedTuple, Optional
+from urllib.parse import urlsplit
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.util.retry import Retry
+
+from .api_config import http_retries, http_timeout
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "Metrodorf/1.0 (Research Project)"
+POOL_HOSTS = 16                 # host pools kept (IRIS, v6, VBB, emulator, ...)
+POOL_CONNECTIONS = 32           # keep-alive connections per host (ingest + dashboard threads)
+RETRY_STATUSES = (502, 503, 504)
+BACKOFF_FACTOR = 0.5
+CACHE_MAX_BYTES = 32 * 1024 * 1024     # all cached bodies together
+CACHE_MAX_BODY = 4 * 1024 * 1024
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+try:
+    import brotli  # noqa: F401  (urllib3 decodes br when available)
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+# Validators and representation headers worth keeping with a cached body
+_CACHED_HEADERS = {'content-type', 'etag', 'last-modified', 'date', 'cache-control'}
+
+
+class LatencyHistogram:
+    """Fixed log-spaced buckets (ms); the last bucket is open-ended"""
+
+    def __init__(self, bounds=LATENCY_BUCKETS_MS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0
+        self.sum_ms = 0.0
+
+    def observe(self, ms: float):
+        self.counts[bisect_left(self.bounds, ms)] += 1
+        self.total += 1
+        self.sum_ms += ms
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile (None: no data / open bucket)"""
+        if not self.total:
+            return None
+        rank, seen = q * self.total, 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return float(bound)
+        return None
+
+    def buckets(self) -> Dict[str, int]:
+        labels = [f"<={b}ms" for b in self.bounds] + [f">{self.bounds[-1]}ms"]
+        return dict(zip(labels, self.counts))
+
+
+class HostStats:
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.statuses = Counter()
+        self.errors = 0
+        self.bytes_received = 0
+        self.not_modified = 0
+        self.bytes_saved = 0
+
+
+class _CachedResponse(NamedTuple):
+    etag: Optional[str]
+    last_modified: Optional[str]
+    headers: dict
+    body: bytes
+
+
+class PooledAdapter(HTTPAdapter):
+    """HTTPAdapter with retries, default timeout, ETag revalidation and per-host metrics"""
+
+    def __init__(self, timeout=None, retries: Optional[int] = None, cache_bytes: int = CACHE_MAX_BYTES,
+                 pool_hosts: int = POOL_HOSTS, pool_connections: int = POOL_CONNECTIONS):
+        retries = http_retries() if retries is None else retries
+        super().__init__(
+            pool_connections=pool_hosts,
+            pool_maxsize=pool_connections,
+            max_retries=Retry(
+                total=retries,
+                backoff_factor=BACKOFF_FACTOR,
+                status_forcelist=RETRY_STATUSES,
+                allowed_methods=frozenset({'GET', 'HEAD'}),
+                raise_on_status=False,        # the caller sees the final status
+                respect_retry_after_header=False,
+            ),
+        )
+        self.timeout = timeout or http_timeout()
+        self.cache_bytes = cache_bytes
+        self._cache: "OrderedDict[str, _CachedResponse]" = OrderedDict()
+        self._cached_bytes = 0
+        self._stats: Dict[str, HostStats] = {}
+        self._lock = threading.Lock()
+
+    # Conditional requests ------------------------------------
+    def _cached(self, url: str) -> Optional[_CachedResponse]:
+        with self._lock:
+            entry = self._cache.get(url)
+            if entry is not None:
+                self._cache.move_to_end(url)
+            return entry
+
+    def _remember(self, url: str, response: requests.Response):
+        """Cache a non-streamed 200 (its body is already in memory)"""
+        etag, last_modified = response.headers.get('ETag'), response.headers.get('Last-Modified')
+        if not (etag or last_modified) or 'no-store' in response.headers.get('Cache-Control', ''):
+            return
+        body = response.content
+        if len(body) > min(CACHE_MAX_BODY, self.cache_bytes):
+            return
+        headers = {k: v for k, v in response.headers.items() if k.lower() in _CACHED_HEADERS}
+        with self._lock:
+            old = self._cache.pop(url, None)
+            if old is not None:
+                self._cached_bytes -= len(old.body)
+            self._cache[url] = _CachedResponse(etag, last_modified, headers, body)
+            self._cached_bytes += len(body)
+            while self._cached_bytes > self.cache_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self._cached_bytes -= len(evicted.body)
+
+    @staticmethod
+    def _from_cache(entry: _CachedResponse, request, not_modified: requests.Response) -> requests.Response:
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = 'OK (not modified)'
+        response.headers = CaseInsensitiveDict({**entry.headers, **{
+            k: v for k, v in not_modified.headers.items() if k.lower() in _CACHED_HEADERS}})
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response._content = entry.body
+        response._content_consumed = True
+        response.url = request.url
+        response.request = request
+        response.connection = not_modified.connection
+        return response
+
+    # Transport -----------------------------------------------
+    def _host(self, host: str) -> HostStats:
+        stats = self._stats.get(host)
+        if stats is None:
+            with self._lock:
+                stats = self._stats.setdefault(host, HostStats())
+        return stats
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        host = urlsplit(request.url).netloc
+        entry = None
+        if request.method == 'GET' and self.cache_bytes:
+            entry = self._cached(request.url)
+            if entry is not None:
+                if entry.etag and 'If-None-Match' not in request.headers:
+                    request.headers['If-None-Match'] = entry.etag
+                if entry.last_modified and 'If-Modified-Since' not in request.headers:
+                    request.headers['If-Modified-Since'] = entry.last_modified
+
+        stats = self._host(host)
+        start = time.perf_counter()
+        try:
+            response = super().send(request, stream=stream, timeout=timeout or self.timeout,
+                                    verify=verify, cert=cert, proxies=proxies)
+        except requests.RequestException:
+            with self._lock:
+                stats.errors += 1
+                stats.latency.observe((time.perf_counter() - start) * 1000)
+            raise
+        elapsed_ms = (time.perf_counter() - start) * 1000   # time to response headers
+
+        if response.status_code == 304 and entry is not None:
+            response.close()
+            with self._lock:
+                stats.not_modified += 1
+                stats.bytes_saved += len(entry.body)
+            result = self._from_cache(entry, request, response)
+        else:
+            # Streamed bodies (IRIS plan / fchg / rchg) are parsed chunk by chunk: reading
+            # them here for the cache would buffer every document in full again
+            if request.method == 'GET' and response.status_code == 200 and self.cache_bytes and not stream:
+                self._remember(request.url, response)
+            result = response
+
+        with self._lock:
+            stats.latency.observe(elapsed_ms)
+            stats.statuses[response.status_code] += 1
+            length = response.headers.get('Content-Length')
+            if response.status_code != 304 and length and length.isdigit():
+                stats.bytes_received += int(length)
+        return result
+
+    # Metrics -------------------------------------------------
+    def connections(self) -> Dict[str, int]:
+        """Connections opened per host since start (stays flat when keep-alive works)"""
+        opened = Counter()
+        pools = self.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                port = f":{pool.port}" if pool.port and pool.port not in (80, 443) else ''
+                opened[f"{pool.host}{port}"] += pool.num_connections
+        return dict(opened)
+
+    def stats(self) -> pd.DataFrame:
+        opened = self.connections()
+        records = []
+        with self._lock:
+            for host, s in sorted(self._stats.items()):
+                h = s.latency
+                records.append({
+                    'host': host,
+                    'requests': h.total,
+                    'errors': s.errors,
+                    'statuses': dict(s.statuses),
+                    'mean_ms': round(h.sum_ms / h.total, 1) if h.total else None,
+                    'p50_ms': h.quantile(0.5),
+                    'p95_ms': h.quantile(0.95),
+                    'p99_ms': h.quantile(0.99),
+                    'connections_opened': opened.get(host, 0),
+                    'not_modified': s.not_modified,
+                    'bytes_received': s.bytes_received,
+                    'bytes_saved': s.bytes_saved,
+                    'histogram': h.buckets(),
+                })
+        return pd.DataFrame(records)
+
+
+_SESSION: Optional[requests.Session] = None
+_SESSION_LOCK = threading.Lock()
+
+
+def shared_session() -> requests.Session:
+    """Process-wide session with pooled adapters (created on first use)"""
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            session = requests.Session()
+            session.headers.update({"User-Agent": USER_AGENT, "Accept-Encoding": ACCEPT_ENCODING})
+            adapter = PooledAdapter()
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            # Optional record / replay (environment driven) replaces the transport
+            from .archive import configure_session
+            configure_session(session)
+            _SESSION = session
+        return _SESSION
+
+
+def http_stats() -> pd.DataFrame:
+    """Per-host latency and transfer statistics of the shared session"""
+    if _SESSION is None:
+        return pd.DataFrame()
+    adapter = _SESSION.get_adapter('https://')
+    return adapter.stats() if isinstance(adapter, PooledAdapter) else pd.DataFrame()
+
+
+def log_http_stats():
+    for row in http_stats().to_dict('records'):
+        logger.info(f"🌐 {row['host']}: {row['requests']} requests, p50 ≤{row['p50_ms']}ms, "
+                    f"p95 ≤{row['p95_ms']}ms, {row['connections_opened']} connections, "
+                    f"{row['not_modified']} not modified ({row['bytes_saved'] / 1024:.0f} KiB saved)")
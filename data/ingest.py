@@ -0,0 +1,442 @@
+"""
+Ingestion daemon for Metrodorf
+Continuous collection as a pipeline of stages, each on its own thread:
+
+    fetch → parse → fuse / dedup → DB write → rollups
+
+- stages are connected by bounded queues; a full queue blocks the stage in
+  front of it, so a slow database throttles fetching instead of buffering
+  without limit (memory is bounded by the queue sizes)
+- fetch asks the PollScheduler which station is due (per-API rate budgets)
+- parse normalizes IRIS / v6 / VBB payloads (data/fusion.py)
+- fuse joins the sources per train and keeps only new or changed delays
+- DB write batches rows of several polls into one bulk insert per station
+  (CSV fallback without database)
+- rollups keep hourly per-station aggregates current (delay_rollups)
+- per stage: items in / out, throughput, busy and blocked time, queue depth
+  and end-to-end lag since fetch
+
+Usage:
+    python main.py ingest --duration 3600
+"""
+
+import json
+import logging
+import math
+import queue
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+
+import pandas as pd
+
+from .dedup import DepartureDeduplicator
+from .http_client import http_stats, log_http_stats
+
+logger = logging.getLogger(__name__)
+
+QUEUE_SIZE = 8                 # items per queue between two stages
+WRITE_BATCH = 16               # polls per bulk insert
+WRITE_FLUSH_SECONDS = 5.0      # flush a partial batch after this long
+ROLLUP_FLUSH_SECONDS = 30.0
+ROLLUP_KEEP_HOURS = 48
+DELAYED_MINUTES = 6            # DB punctuality: < 6 min counts as on time
+METRICS_PATH = "data/processed/ingest_metrics.json"
+FALLBACK_DIR = "data/raw"
+
+_STOP = object()
+
+
+def _json_records(frame: pd.DataFrame) -> List[dict]:
+    """Frame rows as dicts with NaN as None (json.dumps would write invalid NaN)"""
+    return [{key: None if isinstance(value, float) and math.isnan(value) else value
+             for key, value in row.items()} for row in frame.to_dict('records')]
+
+
+class Item(NamedTuple):
+    """One station poll travelling through the pipeline"""
+    station: str
+    eva: str
+    fetched_at: float      # time.monotonic() of the fetch (lag reference)
+    payload: object
+    keys: tuple = ()       # dedup keys / delays of the rows, committed once written
+    delays: tuple = ()
+    requests: Optional[dict] = None   # API → requests the fetch issued (scheduler poll cost)
+
+
+class StageMetrics:
+    """Counters of one stage (updated by its thread, read by metrics())"""
+
+    def __init__(self, name: str, window: float = 60.0):
+        self.name = name
+        self.window = window
+        self.items_in = self.items_out = self.errors = 0
+        self.busy_seconds = self.blocked_seconds = 0.0
+        self.last_lag = self.max_lag = 0.0
+        self._recent = deque()
+        self._lock = threading.Lock()
+
+    def processed(self, n_in: int, n_out: int, busy: float, lags: Iterable[float]):
+        now = time.monotonic()
+        lags = list(lags)
+        with self._lock:
+            self.items_in += n_in
+            self.items_out += n_out
+            self.busy_seconds += busy
+            if lags:
+                self.last_lag = lags[-1]
+                self.max_lag = max(self.max_lag, *lags)
+            self._recent.append((now, n_in))
+            while self._recent and self._recent[0][0] < now - self.window:
+                self._recent.popleft()
+
+    def throughput(self) -> float:
+        """Items per second over the last window"""
+        with self._lock:
+            return sum(n for _, n in self._recent) / self.window
+
+
+class Stage(threading.Thread):
+    """
+    Worker thread: takes items from `inbox`, applies `func`, puts results on `outbox`
+
+    `func` receives one item (or, with a `batch_size`, a list of up to that many
+    items) and returns an iterable of output items. A stage without inbox is a source:
+    `func(None)` is called until the pipeline stops.
+    """
+
+    def __init__(self, name: str, func: Callable, inbox: Optional[queue.Queue], outbox: Optional[queue.Queue],
+                 stop_event: threading.Event, batch_size: Optional[int] = None,
+                 flush_seconds: float = WRITE_FLUSH_SECONDS,
+                 on_stop: Optional[Callable] = None):
+        super().__init__(name=f"ingest-{name}", daemon=True)
+        self.func = func
+        self.inbox = inbox
+        self.outbox = outbox
+        self.stop_event = stop_event
+        self.batched = batch_size is not None
+        self.batch_size = batch_size or 1
+        self.flush_seconds = flush_seconds
+        self.on_stop = on_stop
+        self.metrics = StageMetrics(name)
+
+    def _emit(self, outputs):
+        for item in outputs or ():
+            if self.outbox is None:
+                continue
+            start = time.monotonic()
+            self.outbox.put(item)   # blocks while the next stage is behind: backpressure
+            self.metrics.blocked_seconds += time.monotonic() - start
+
+    def _process(self, items: List[Item]):
+        start = time.monotonic()
+        try:
+            outputs = list(self.func(items if self.batched else items[0]) or ())
+        except Exception as e:
+            self.metrics.errors += 1
+            logger.warning(f"⚠️ Stage {self.metrics.name} failed: {e}")
+            outputs = []
+        done = time.monotonic()
+        lags = [done - item.fetched_at for item in (outputs or items) if isinstance(item, Item)]
+        # A source counts what it produced, not its idle polls of the scheduler
+        n_in = len(outputs) if self.inbox is None else len(items)
+        self.metrics.processed(n_in, len(outputs), done - start, lags)
+        self._emit(outputs)
+
+    def run(self):
+        if self.inbox is None:
+            while not self.stop_event.is_set():
+                self._process([None])
+        else:
+            batch, deadline = [], None
+            while True:
+                try:
+                    item = self.inbox.get(timeout=max(0.0, deadline - time.monotonic()) if batch else 0.5)
+                except queue.Empty:
+                    if batch:
+                        self._process(batch)
+                        batch = []
+                    continue
+                if item is _STOP:
+                    break
+                batch.append(item)
+                if len(batch) == 1:
+                    deadline = time.monotonic() + self.flush_seconds
+                if len(batch) >= self.batch_size:
+                    self._process(batch)
+                    batch = []
+            if batch:
+                self._process(batch)
+        if self.on_stop:
+            self.on_stop()
+        if self.outbox is not None:
+            self.outbox.put(_STOP)
+
+
+class IngestDaemon:
+    """Long-running collection pipeline over all stations of a RealTimeCollector"""
+
+    def __init__(self, collector=None, queue_size: int = QUEUE_SIZE, write_batch: int = WRITE_BATCH,
+                 metrics_path: Optional[str] = METRICS_PATH):
+        if collector is None:
+            from .real_time_collector import RealTimeCollector
+            collector = RealTimeCollector()
+        self.collector = collector
+        self.scheduler = collector.scheduler
+        self.db = collector.db
+        self.metrics_path = Path(metrics_path) if metrics_path else None
+        self.station_names = {data['eva']: name for name, data in collector.stations.items()}
+        # Fused-train keys (eva, trip id, planned) → last delay; separate from the collectors' shared deduplicator
+        self.dedup = DepartureDeduplicator()
+        # Emitted but not yet written: later polls must not emit them again meanwhile
+        self._in_flight: Dict[tuple, float] = {}
+        self._in_flight_lock = threading.Lock()
+        self._station_ids: Dict[str, int] = {}
+        self._trains: Dict[tuple, Dict[tuple, float]] = {}   # (station, hour) → train → delay
+        self._dirty = set()
+        self._last_rollup_flush = time.monotonic()
+        self.rows_written = 0
+        self.rollups_written = 0
+
+        self.stop_event = threading.Event()
+        self.queues = {name: queue.Queue(maxsize=queue_size) for name in ('parse', 'fuse', 'write', 'rollup')}
+        self.stages = [
+            Stage('fetch', self._fetch, None, self.queues['parse'], self.stop_event),
+            Stage('parse', self._parse, self.queues['parse'], self.queues['fuse'], self.stop_event),
+            Stage('fuse', self._fuse, self.queues['fuse'], self.queues['write'], self.stop_event),
+            Stage('write', self._write, self.queues['write'], self.queues['rollup'], self.stop_event,
+                  batch_size=write_batch),
+            Stage('rollup', self._rollup, self.queues['rollup'], None, self.stop_event,
+                  on_stop=self._flush_rollups),
+        ]
+        self.started_at = None
+
+    # ============================================
+    # STAGES
+    # ============================================
+    def _fetch(self, _):
+        """Next due station (waits in short steps so stop() is honoured)"""
+        station, wait = self.scheduler.next_due()
+        if wait > 0:
+            self.stop_event.wait(min(wait, 1.0))
+            return []
+        # Taken now: the poll's feedback only reaches the scheduler in _fuse
+        self.scheduler.reserve(station)
+        fetched_at = time.monotonic()
+        requests = Counter()
+        raw = self.collector.fetch_sources(station, requests)
+        return [Item(station, self.collector.stations[station]['eva'], fetched_at, raw, requests=dict(requests))]
+
+    def _parse(self, item: Item):
+        from .fusion import source_frames
+        return [item._replace(payload=source_frames(item.payload, item.eva))]
+
+    def _fuse(self, item: Item):
+        from .fusion import fuse, has_train_key, to_training_frame, train_keys
+
+        trains = fuse(item.payload)
+        trains = trains[has_train_key(trains)]
+        keys = train_keys(trains)
+        delays = trains['delay_minutes'].to_numpy() if len(trains) else []
+        self.scheduler.record(item.station, keys, delays, requests=item.requests)
+        if not len(trains):
+            return []
+        mask = self.dedup.check(keys, delays)
+        with self._in_flight_lock:
+            for i in mask.nonzero()[0]:
+                pending = self._in_flight.get(keys[i])
+                if pending is not None and abs(pending - delays[i]) <= self.dedup.tolerance:
+                    mask[i] = False
+        changed = trains[mask]
+        writable = (~changed['cancelled'] & changed['delay_minutes'].notna()).to_numpy()
+        # Changed trains that are never written (cancelled, no delay) are remembered now
+        self.dedup.commit([k for k, w in zip(train_keys(changed), writable) if not w],
+                          changed['delay_minutes'].to_numpy()[~writable])
+        kept = changed[writable]
+        rows = to_training_frame(kept, self.station_names)
+        if not len(rows):
+            return []
+        kept_keys = train_keys(kept)
+        with self._in_flight_lock:
+            self._in_flight.update(zip(kept_keys, kept['delay_minutes']))
+        return [item._replace(payload=rows.assign(line=kept['line'].to_numpy()),
+                              keys=tuple(kept_keys), delays=tuple(kept['delay_minutes']))]
+
+    def _station_id(self, station: str) -> Optional[int]:
+        if station not in self._station_ids:
+            data = self.collector.stations[station]
+            station_id = self.db.insert_station(station, data['eva'], data['ds100'], data['lat'], data['lon'])
+            if not station_id:
+                return None
+            self._station_ids[station] = station_id
+        return self._station_ids[station]
+
+    def _commit(self, items: List[Item]):
+        for item in items:
+            self.dedup.commit(item.keys, item.delays)
+        self._release(items)
+
+    def _release(self, items: List[Item]):
+        """Forget the in-flight rows of written (or failed) polls"""
+        with self._in_flight_lock:
+            for item in items:
+                for key, delay in zip(item.keys, item.delays):
+                    if self._in_flight.get(key) == delay:
+                        del self._in_flight[key]
+
+    def _write(self, items: List[Item]):
+        """
+        One bulk insert per station for a whole batch of polls
+
+        Dedup keys are committed only for stations whose insert succeeded;
+        the others leave the in-flight set and are emitted again by the next poll.
+        """
+        if self.db.available:
+            by_station: Dict[str, List[Item]] = {}
+            for item in items:
+                by_station.setdefault(item.station, []).append(item)
+            for station, group in by_station.items():
+                station_id = self._station_id(station)
+                rows = pd.concat([item.payload for item in group], ignore_index=True)
+                written = self.db.insert_real_delays(station_id, rows) if station_id else 0
+                if written:
+                    self.rows_written += written
+                    self._commit(group)
+                else:
+                    self._release(group)
+        else:
+            rows = pd.concat([item.payload for item in items], ignore_index=True)
+            path = Path(FALLBACK_DIR) / f"ingest_{datetime.now():%Y%m%d}.csv"
+            rows.to_csv(path, mode='a', header=not path.exists(), index=False)
+            self.rows_written += len(rows)
+            self._commit(items)
+        return items
+
+    def _rollup(self, item: Item):
+        rows = item.payload
+        hours = pd.to_datetime(rows['timestamp']).dt.floor('h')
+        for station, hour, key, delay in zip(rows['station_name'], hours, item.keys, rows['delay_minutes']):
+            self._trains.setdefault((station, hour), {})[key] = float(delay)
+            self._dirty.add((station, hour))
+        if time.monotonic() - self._last_rollup_flush >= ROLLUP_FLUSH_SECONDS:
+            self._flush_rollups()
+        return []
+
+    def rollups(self, buckets: Optional[Iterable[tuple]] = None) -> pd.DataFrame:
+        """Hourly aggregates per station (latest delay per train)"""
+        records = []
+        for station, hour in sorted(buckets if buckets is not None else self._trains):
+            delays = list(self._trains[(station, hour)].values())
+            records.append({
+                'station_name': station,
+                'hour_start': hour,
+                'n_trains': len(delays),
+                'n_delayed': sum(d >= DELAYED_MINUTES for d in delays),
+                'mean_delay': round(sum(delays) / len(delays), 2),
+                'max_delay': max(delays),
+            })
+        return pd.DataFrame(records, columns=['station_name', 'hour_start', 'n_trains', 'n_delayed',
+                                              'mean_delay', 'max_delay'])
+
+    def _flush_rollups(self):
+        self._last_rollup_flush = time.monotonic()
+        if not self._dirty:
+            return
+        changed = self.rollups(self._dirty)
+        self._dirty = set()
+        if self.db.available:
+            for station, group in changed.groupby('station_name'):
+                station_id = self._station_id(station)
+                if station_id:
+                    self.rollups_written += self.db.upsert_rollups(station_id, group)
+        else:
+            self.rollups().to_csv(Path(FALLBACK_DIR) / "delay_rollups.csv", index=False)
+            self.rollups_written += len(changed)
+
+        # Bounded memory: forget hours that can no longer change
+        cutoff = pd.Timestamp(datetime.now()).floor('h') - pd.Timedelta(hours=ROLLUP_KEEP_HOURS)
+        for bucket in [b for b in self._trains if b[1] < cutoff]:
+            del self._trains[bucket]
+
+    # ============================================
+    # CONTROL
+    # ============================================
+    def start(self):
+        self.started_at = time.monotonic()
+        for stage in self.stages:
+            stage.start()
+        logger.info(f"🚀 Ingestion daemon started ({len(self.collector.stations)} stations, "
+                    f"{self.scheduler.polls_per_minute:.1f} polls/min budget)")
+
+    def stop(self, timeout: float = 60.0):
+        """Stop fetching and drain every queue into the database"""
+        self.stop_event.set()
+        for stage in self.stages:
+            stage.join(timeout)
+        self.write_metrics()
+        logger.info(f"🛑 Ingestion daemon stopped: {self.rows_written} rows, {self.rollups_written} rollups written")
+
+    def run(self, duration: Optional[float] = None, metrics_interval: float = 60.0):
+        """Run until `duration` seconds have passed (forever if None) or Ctrl+C"""
+        self.start()
+        deadline = None if duration is None else time.monotonic() + duration
+        try:
+            while deadline is None or time.monotonic() < deadline:
+                time.sleep(metrics_interval if deadline is None
+                           else max(0.0, min(metrics_interval, deadline - time.monotonic())))
+                self.log_metrics()
+        except KeyboardInterrupt:
+            logger.info("⏹️ Interrupted")
+        finally:
+            self.stop()
+
+    # ============================================
+    # METRICS
+    # ============================================
+    def metrics(self) -> pd.DataFrame:
+        """Per stage: throughput, counters, queue depth in front of it and lag since fetch"""
+        records = []
+        for stage in self.stages:
+            m = stage.metrics
+            records.append({
+                'stage': m.name,
+                'items_in': m.items_in,
+                'items_out': m.items_out,
+                'errors': m.errors,
+                'per_second': round(m.throughput(), 3),
+                'busy_s': round(m.busy_seconds, 2),
+                'blocked_s': round(m.blocked_seconds, 2),
+                'queue_depth': stage.inbox.qsize() if stage.inbox is not None else None,
+                'queue_size': stage.inbox.maxsize if stage.inbox is not None else None,
+                'lag_s': round(m.last_lag, 2),
+                'max_lag_s': round(m.max_lag, 2),
+            })
+        return pd.DataFrame(records)
+
+    def log_metrics(self):
+        for row in self.metrics().to_dict('records'):
+            depth = '' if pd.isna(row['queue_depth']) else f" queue {int(row['queue_depth'])}/{int(row['queue_size'])}"
+            logger.info(f"📈 {row['stage']:>6}: {row['items_in']} in, {row['per_second']:.2f}/s,"
+                        f"{depth} lag {row['lag_s']:.1f}s, blocked {row['blocked_s']:.1f}s, errors {row['errors']}")
+        log_http_stats()
+        self.write_metrics()
+
+    def write_metrics(self):
+        if self.metrics_path is None:
+            return
+        snapshot = {
+            'updated_at': datetime.now().isoformat(),
+            'uptime_s': round(time.monotonic() - (self.started_at or time.monotonic()), 1),
+            'rows_written': self.rows_written,
+            'rollups_written': self.rollups_written,
+            'dedup': self.dedup.stats(),
+            'stages': _json_records(self.metrics()),
+            'http': _json_records(http_stats()),
+        }
+        self.metrics_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.metrics_path.with_suffix('.tmp')
+        tmp.write_text(json.dumps(snapshot, indent=2, default=str))
+        tmp.replace(self.metrics_path)
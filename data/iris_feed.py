@@ -0,0 +1,352 @@
+"""
+Incremental IRIS change-feed ingestion for Metrodorf
+Replaces re-polling full station timetables every cycle:
+- the planned timetable (/plan/{eva}/{yymmdd}/{HH}) is fetched once per station and hour
+- the first poll loads all known changes (/fchg/{eva}), later polls only the
+  recent-changes delta of the last two minutes (/rchg/{eva})
+- deltas are applied to an in-memory per-stop state (planned vs. changed
+  arrival/departure, platform, cancellation)
+- stops whose departure has passed are emitted once in training format and dropped
+
+Request and byte counters per endpoint show the quota used per minute of coverage.
+One feed is shared per process (shared_iris_feed()), so collectors created
+over and over (BasePredictor, experiments) do not reload plans and /fchg.
+
+Usage:
+    python -m data.iris_feed --minutes 10
+"""
+
+import argparse
+import logging
+import threading
+import time
+import xml.etree.ElementTree as ET
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+import pandas as pd
+import requests
+
+from .api_config import DEFAULT_BASE_URLS, api_base
+from .iris_parser import CHUNK_SIZE, StopEvent, iter_stop_events
+from .real_time_collector import estimate_distance
+
+logger = logging.getLogger(__name__)
+
+IRIS_BASE = DEFAULT_BASE_URLS['iris']
+RECENT_CHANGES_WINDOW = 120   # seconds covered by /rchg (refetch /fchg after a longer gap)
+PLAN_HOURS_AHEAD = 1          # plan slices kept loaded beyond the current hour
+STALE_AFTER = timedelta(hours=2)
+
+
+class IrisFeed:
+    """
+    Per-stop timetable state for a set of stations, kept current from IRIS deltas
+
+    Args:
+        stations: station name → EVA number
+        session: Shared requests session (default: a new one)
+        wait: Called before every request (rate limiting, default: min_request_interval)
+        on_result: Called with True / False after every request (circuit breaker),
+            not for 429 answers
+        min_request_interval: Seconds between requests when no wait callback is given
+        clock: Wall clock for change stamps and the default poll / drain times
+    """
+
+    def __init__(
+        self,
+        stations: Dict[str, str],
+        session: Optional[requests.Session] = None,
+        base_url: Optional[str] = None,
+        wait: Optional[Callable[[], None]] = None,
+        on_result: Optional[Callable[[bool], None]] = None,
+        min_request_interval: float = 10.0,
+        timeout: float = 5.0,
+        clock: Callable[[], datetime] = datetime.now,
+    ):
+        self.stations = dict(stations)
+        self.station_names = {eva: name for name, eva in self.stations.items()}
+        self.session = session or requests.Session()
+        self.base_url = (base_url or api_base('iris')).rstrip('/')
+        self.wait = wait or self._default_wait
+        self.on_result = on_result
+        self.min_request_interval = min_request_interval
+        self.timeout = timeout
+        self.clock = clock
+
+        self.stops: Dict[str, Dict[str, dict]] = {eva: {} for eva in self.stations.values()}
+        self._plans_loaded = set()          # (eva, yymmdd, HH)
+        self._last_changes: Dict[str, float] = {}
+        self._last_request = 0.0
+        self._lock = threading.RLock()      # shared between collectors and threads
+        self._hooks = (self.wait, self.on_result)
+
+        self.requests = Counter()           # endpoint → requests
+        self.bytes = Counter()              # endpoint → response bytes
+        self.failures = Counter()
+        self.started = time.monotonic()
+
+    # ============================================
+    # HTTP
+    # ============================================
+    def _default_wait(self):
+        remaining = self.min_request_interval - (time.monotonic() - self._last_request)
+        if remaining > 0:
+            time.sleep(remaining)
+
+    def _counted(self, endpoint: str, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        for chunk in chunks:
+            self.bytes[endpoint] += len(chunk)
+            yield chunk
+
+    def _report(self, ok: bool):
+        on_result = self._hooks[1]
+        if on_result is not None:
+            on_result(ok)
+
+    def _fetch(self, endpoint: str, path: str, eva: str,
+               apply: Callable[[str, Iterable[StopEvent]], object]) -> bool:
+        """
+        Stream one IRIS document into `apply` (404 = nothing planned / no changes)
+
+        Returns:
+            True when the document was applied
+        """
+        self._hooks[0]()
+        self._last_request = time.monotonic()
+        try:
+            with self.session.get(f"{self.base_url}/{path}", timeout=self.timeout, stream=True) as response:
+                self.requests[endpoint] += 1
+                if response.status_code == 404:
+                    self._report(True)
+                    return True
+                if response.status_code != 200:
+                    self.failures[endpoint] += 1
+                    logger.warning(f"IRIS {endpoint} returned {response.status_code}")
+                    if response.status_code != 429:
+                        self._report(False)
+                    return False
+                chunks = self._counted(endpoint, response.iter_content(CHUNK_SIZE))
+                apply(eva, iter_stop_events(chunks, eva))
+                self._report(True)
+                return True
+        except requests.RequestException as e:
+            self.failures[endpoint] += 1
+            logger.debug(f"IRIS {endpoint} failed: {e}")
+        except ET.ParseError as e:
+            self.failures[endpoint] += 1
+            logger.warning(f"⚠️ Unparseable IRIS {endpoint} response: {e}")
+        self._report(False)
+        return False
+
+    # ============================================
+    # STATE UPDATES
+    # ============================================
+    def apply_plan(self, eva: str, events: Iterable[StopEvent]) -> int:
+        """Merge planned-timetable stop events into the stop state"""
+        state = self.stops.setdefault(eva, {})
+        for event in events:
+            state.setdefault(event.stop_id, {'eva': eva}).update(event.fields())
+        return len(state)
+
+    def apply_changes(self, eva: str, events: Iterable[StopEvent]) -> List[str]:
+        """Apply change events (fchg or rchg); returns the ids of the changed stops"""
+        state = self.stops.setdefault(eva, {})
+        changed = []
+        now = self.clock()
+        for event in events:
+            stop = state.setdefault(event.stop_id, {'eva': eva})
+            stop.update(event.fields())
+            stop['updated'] = now
+            changed.append(event.stop_id)
+        return changed
+
+    def _load_plans(self, eva: str, now: datetime):
+        for offset in range(PLAN_HOURS_AHEAD + 1):
+            hour = now + timedelta(hours=offset)
+            key = (eva, hour.strftime('%y%m%d'), hour.strftime('%H'))
+            if key in self._plans_loaded:
+                continue
+            if self._fetch('plan', f"plan/{eva}/{key[1]}/{key[2]}", eva, self.apply_plan):
+                self._plans_loaded.add(key)
+
+    def _load_changes(self, eva: str) -> List[str]:
+        last = self._last_changes.get(eva)
+        recent = last is not None and time.monotonic() - last < RECENT_CHANGES_WINDOW
+        endpoint = 'rchg' if recent else 'fchg'
+        changed = []
+        if self._fetch(endpoint, f"{endpoint}/{eva}", eva, lambda e, events: changed.extend(self.apply_changes(e, events))):
+            self._last_changes[eva] = time.monotonic()
+        return changed
+
+    def poll(self, now: Optional[datetime] = None, evas: Optional[List[str]] = None,
+             wait: Optional[Callable[[], None]] = None,
+             on_result: Optional[Callable[[bool], None]] = None) -> Dict[str, List[str]]:
+        """
+        One incremental update per station (missing plan hours + change delta)
+
+        Poll at least every RECENT_CHANGES_WINDOW seconds to stay on /rchg.
+
+        Args:
+            evas: Stations to update (default: all)
+            wait, on_result: Hooks of the calling collector for this poll
+                (default: the ones given at construction)
+
+        Returns:
+            EVA → ids of the stops changed by this poll
+        """
+        now = now or self.clock()
+        changed = {}
+        with self._lock:
+            self._hooks = (wait or self.wait, on_result or self.on_result)
+            try:
+                for eva in evas or self.stations.values():
+                    self._load_plans(eva, now)
+                    changed[eva] = self._load_changes(eva)
+                self._prune(now)
+            finally:
+                self._hooks = (self.wait, self.on_result)
+        return changed
+
+    def stop_states(self, eva: str) -> List[dict]:
+        """Copies of a station's current stop states"""
+        with self._lock:
+            return [dict(stop) for stop in self.stops.get(eva, {}).values()]
+
+    def _prune(self, now: datetime):
+        """Forget stops and plan slices far in the past"""
+        cutoff = now - STALE_AFTER
+        for state in self.stops.values():
+            stale = [i for i, stop in state.items()
+                     if (self._event_time(stop) or stop.get('updated', now)) < cutoff]
+            for stop_id in stale:
+                del state[stop_id]
+        self._plans_loaded = {key for key in self._plans_loaded
+                              if datetime.strptime(key[1] + key[2], '%y%m%d%H') >= cutoff - timedelta(hours=1)}
+
+    # ============================================
+    # OUTPUT
+    # ============================================
+    @staticmethod
+    def _event_time(stop: dict) -> Optional[datetime]:
+        """Actual (changed, else planned) departure, or arrival for terminating trains"""
+        for prefix in ('departure', 'arrival'):
+            when = stop.get(f'{prefix}_changed') or stop.get(f'{prefix}_planned')
+            if when is not None:
+                return when
+        return None
+
+    @staticmethod
+    def stop_delay(stop: dict) -> Optional[float]:
+        """Delay in minutes (departure preferred), None without a planned time"""
+        for prefix in ('departure', 'arrival'):
+            planned = stop.get(f'{prefix}_planned')
+            if planned is not None:
+                changed = stop.get(f'{prefix}_changed') or planned
+                return (changed - planned).total_seconds() / 60
+        return None
+
+    def stop_record(self, stop: dict) -> Optional[dict]:
+        """One stop in the training format of RealTimeCollector.parse_departure"""
+        delay = self.stop_delay(stop)
+        if delay is None or stop.get('departure_cancelled') or stop.get('arrival_cancelled'):
+            return None
+        planned = stop.get('departure_planned') or stop.get('arrival_planned')
+        path = stop.get('departure_path') or stop.get('arrival_path') or ''
+        destination = path.split('|')[-1] if path else ''
+        station = self.station_names.get(stop['eva'], '')
+        hour = planned.hour
+        return {
+            'distance_km': estimate_distance(station, destination.split(' ')[0].split('(')[0]),
+            'time_of_day': hour,
+            'day_of_week': planned.weekday(),
+            'is_peak_hour': 1 if (7 <= hour <= 9) or (16 <= hour <= 18) else 0,
+            'is_cologne_bottleneck': 1 if 'köln' in path.lower() else 0,
+            'delay_minutes': max(0.0, delay),
+            'source': 'iris',
+            'timestamp': (self._event_time(stop) or planned).isoformat(),
+            'station_name': station,
+            'train': f"{stop.get('category', '')} {stop.get('number', '')}".strip(),
+        }
+
+    def current_delay(self, eva: str, now: Optional[datetime] = None, horizon: timedelta = timedelta(hours=1)):
+        """Mean delay (minutes) of the station's stops in the next hour, None without data"""
+        now = now or self.clock()
+        delays = [self.stop_delay(stop) for stop in self.stop_states(eva)
+                  if (when := self._event_time(stop)) is not None and now <= when <= now + horizon]
+        delays = [d for d in delays if d is not None]
+        return sum(delays) / len(delays) if delays else None
+
+    def drain_departed(self, now: Optional[datetime] = None) -> pd.DataFrame:
+        """Emit every stop that has departed (final delay) and remove it from the state"""
+        now = now or self.clock()
+        records = []
+        with self._lock:
+            for state in self.stops.values():
+                departed = [i for i, stop in state.items()
+                            if (when := self._event_time(stop)) is not None and when <= now]
+                for stop_id in departed:
+                    record = self.stop_record(state.pop(stop_id))
+                    if record is not None:
+                        records.append(record)
+        return pd.DataFrame(records)
+
+    def stats(self) -> dict:
+        """Requests and bytes downloaded, in total and per minute of coverage"""
+        minutes = max((time.monotonic() - self.started) / 60, 1e-9)
+        return {
+            'minutes': minutes,
+            'requests': dict(self.requests),
+            'bytes': dict(self.bytes),
+            'failures': dict(self.failures),
+            'requests_per_minute': sum(self.requests.values()) / minutes,
+            'bytes_per_minute': sum(self.bytes.values()) / minutes,
+            'tracked_stops': sum(len(state) for state in self.stops.values()),
+        }
+
+
+_SHARED: Optional[IrisFeed] = None
+_SHARED_LOCK = threading.Lock()
+
+
+def shared_iris_feed(stations: Dict[str, str], **kwargs) -> IrisFeed:
+    """Process-wide feed (survives collector instances, like shared_deduplicator)"""
+    global _SHARED
+    with _SHARED_LOCK:
+        if _SHARED is None:
+            _SHARED = IrisFeed(stations, **kwargs)
+        return _SHARED
+
+
+# ============================================
+# COMMAND LINE
+# ============================================
+if __name__ == "__main__":
+    from .real_time_collector import RealTimeCollector
+
+    parser = argparse.ArgumentParser(description="Incremental IRIS change-feed ingestion")
+    parser.add_argument("--minutes", type=float, default=10, help="How long to follow the feed")
+    parser.add_argument("--interval", type=float, default=90, help="Seconds between polls (< 120 keeps /rchg)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    collector = RealTimeCollector()
+    feed = collector.iris_feed()
+    deadline = time.monotonic() + args.minutes * 60
+
+    print("\n" + "="*60)
+    print("🚆 IRIS CHANGE FEED")
+    print("="*60)
+    while time.monotonic() < deadline:
+        started = time.monotonic()
+        changed = feed.poll()
+        departed = feed.drain_departed()
+        saved = collector.save_records(departed)
+        stats = feed.stats()
+        print(f"🔄 {sum(map(len, changed.values()))} stops changed, {len(departed)} departed "
+              f"({saved} saved) | {stats['tracked_stops']} tracked | "
+              f"{stats['bytes_per_minute'] / 1024:.1f} KiB/min, {stats['requests_per_minute']:.1f} req/min")
+        time.sleep(max(0.0, args.interval - (time.monotonic() - started)))
+
+    print(f"\n✅ {feed.stats()}")
@@ -0,0 +1,175 @@
+"""
+Streaming IRIS XML parser for Metrodorf
+Parses timetable (/plan) and change (/fchg, /rchg) documents straight from
+the raw byte stream instead of ET.fromstring(response.text):
+- no decode of the whole body to str, no tree: expat is fed chunk by chunk and a
+  parser target keeps only the attributes of the <s> being read
+- one compact StopEvent per <s> element (line, trip id, planned / changed
+  arrival and departure, platforms, path, cancellation)
+- events are handed out after every chunk and nothing else is retained, so
+  memory stays flat no matter how many stops a Hbf document holds
+
+Usage:
+    with session.get(url, stream=True) as response:
+        for event in iter_stop_events(response.iter_content(CHUNK_SIZE)):
+            ...
+"""
+
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, NamedTuple, Optional, Union
+
+CHUNK_SIZE = 64 * 1024
+
+ByteSource = Union[bytes, Iterable[bytes]]
+
+
+class StopEvent(NamedTuple):
+    """One stop of one trip at one station (planned fields from /plan, changed from /fchg, /rchg)"""
+    stop_id: str
+    trip_id: str
+    eva: Optional[str]
+    category: Optional[str]
+    number: Optional[str]
+    line: Optional[str]
+    arrival_planned: Optional[datetime]
+    arrival_changed: Optional[datetime]
+    arrival_platform: Optional[str]
+    arrival_changed_platform: Optional[str]
+    arrival_path: Optional[str]
+    arrival_cancelled: bool
+    departure_planned: Optional[datetime]
+    departure_changed: Optional[datetime]
+    departure_platform: Optional[str]
+    departure_changed_platform: Optional[str]
+    departure_path: Optional[str]
+    departure_cancelled: bool
+
+    def fields(self) -> Dict:
+        """Non-empty fields only (a change event must not erase planned values)"""
+        return {k: v for k, v in self._asdict().items() if v is not None and v is not False}
+
+
+@lru_cache(maxsize=8192)
+def parse_iris_time(value: Optional[str]) -> Optional[datetime]:
+    """IRIS timestamps are local time as yyMMddHHmm (sliced, cached: minutes repeat across stops)"""
+    if not value or len(value) != 10:
+        return None
+    try:
+        return datetime(2000 + int(value[0:2]), int(value[2:4]), int(value[4:6]),
+                        int(value[6:8]), int(value[8:10]))
+    except ValueError:
+        return None
+
+
+def _chunks(source: ByteSource) -> Iterator[bytes]:
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        view = memoryview(source)
+        for start in range(0, len(view), CHUNK_SIZE):
+            yield bytes(view[start:start + CHUNK_SIZE])
+    elif hasattr(source, 'read'):
+        for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+            yield chunk
+    else:
+        yield from source
+
+
+class _StopCollector:
+    """
+    XMLParser target: keeps only the attributes of the current <s>, <tl>, <ar>, <dp>
+    (no Element objects are built, so nothing has to be freed)
+    """
+
+    def __init__(self, eva: Optional[str]):
+        self.eva = eva
+        self.events = []
+        self._stop = self._label = self._arrival = self._departure = None
+        self._depth = 0
+
+    def start(self, tag, attrib):
+        self._depth += 1
+        if tag == 's' and self._depth == 2:
+            self._stop = attrib
+            self._label = self._arrival = self._departure = _EMPTY
+        elif self._stop is None:
+            if self._depth == 1:
+                self.eva = self.eva or attrib.get('eva')
+        elif tag == 'ar':
+            self._arrival = attrib
+        elif tag == 'dp':
+            self._departure = attrib
+        elif tag == 'tl':
+            self._label = attrib
+
+    def end(self, tag):
+        self._depth -= 1
+        if tag == 's' and self._depth == 1:
+            self.events.append(_stop_event(self._stop, self._label, self._arrival, self._departure, self.eva))
+            self._stop = None
+
+    def close(self):
+        return None
+
+
+_EMPTY: Dict[str, str] = {}
+
+
+def _stop_event(stop: Dict[str, str], label: Dict[str, str], ar: Dict[str, str], dp: Dict[str, str],
+                default_eva: Optional[str]) -> StopEvent:
+    stop_id = stop.get('id', '')
+    return StopEvent(
+        stop_id=stop_id,
+        # <daily trip id>-<yyMMddHHmm of the first stop>-<stop index>; the daily trip id may be negative
+        trip_id=stop_id.rsplit('-', 2)[0] if stop_id.count('-') >= 2 else stop_id,
+        eva=stop.get('eva', default_eva),
+        category=label.get('c'),
+        number=label.get('n'),
+        line=dp.get('l') or ar.get('l'),
+        arrival_planned=parse_iris_time(ar.get('pt')),
+        arrival_changed=parse_iris_time(ar.get('ct')),
+        arrival_platform=ar.get('pp'),
+        arrival_changed_platform=ar.get('cp'),
+        arrival_path=ar.get('cpth') or ar.get('ppth'),
+        arrival_cancelled=ar.get('cs') == 'c',
+        departure_planned=parse_iris_time(dp.get('pt')),
+        departure_changed=parse_iris_time(dp.get('ct')),
+        departure_platform=dp.get('pp'),
+        departure_changed_platform=dp.get('cp'),
+        departure_path=dp.get('cpth') or dp.get('ppth'),
+        departure_cancelled=dp.get('cs') == 'c',
+    )
+
+
+def iter_stop_events(source: ByteSource, eva: Optional[str] = None) -> Iterator[StopEvent]:
+    """
+    Incrementally parse an IRIS timetable or change document
+
+    Args:
+        source: Raw bytes, a binary file object or an iterable of byte chunks
+            (e.g. response.iter_content(CHUNK_SIZE))
+        eva: Station EVA for documents whose <s> elements carry none (plans)
+
+    Yields:
+        StopEvent per top-level <s> element, in document order
+    """
+    collector = _StopCollector(eva)
+    parser = ET.XMLParser(target=collector)
+    for chunk in _chunks(source):
+        parser.feed(chunk)
+        if collector.events:
+            yield from collector.events
+            collector.events = []
+    parser.close()
+    yield from collector.events
+
+
+def first_station(source: ByteSource) -> Optional[Dict[str, str]]:
+    """Attributes of the first <station> element (/station lookup), stops reading there"""
+    parser = ET.XMLPullParser(events=('start',))
+    for chunk in _chunks(source):
+        parser.feed(chunk)
+        for _, element in parser.read_events():
+            if element.tag == 'station':
+                return dict(element.attrib)
+    return None
@@ -0,0 +1,96 @@
+"""
+Memory-lean typed loading of Metrodorf training data
+Inferred CSV dtypes give int64/float64 flags and an object `source` column.
+The typed schema below stores a training row in ~12 bytes instead of ~60+:
+- int8 flags (is_peak_hour, is_cologne_bottleneck)
+- uint8 hour / weekday
+- float32 distance / delay
+- categorical source (synthetic / real / real_fused)
+"""
+
+import logging
+from pathlib import Path
+from typing import Dict, Union
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+TRAINING_DTYPES = {
+    'distance_km': 'float32',
+    'time_of_day': 'uint8',
+    'day_of_week': 'uint8',
+    'is_peak_hour': 'int8',
+    'is_cologne_bottleneck': 'int8',
+    'delay_minutes': 'float32',
+    'source': 'category',
+}
+
+
+def _fits(values: pd.Series, dtype: str) -> bool:
+    """True if every value is representable in the integer dtype (astype would wrap silently)"""
+    if values.empty:
+        return True
+    info = np.iinfo(dtype)
+    return info.min <= values.min() and values.max() <= info.max
+
+
+def optimize_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Cast a training frame to the typed schema (in place where possible)
+    Integer columns holding missing values stay float32 instead of failing;
+    columns with values outside the small integer range keep their dtype.
+    """
+    for column, dtype in TRAINING_DTYPES.items():
+        if column not in df.columns or df[column].dtype == dtype:
+            continue
+        if dtype.startswith(('int', 'uint')) and df[column].isna().any():
+            df[column] = df[column].astype('float32')
+        elif dtype.startswith(('int', 'uint')) and not _fits(df[column], dtype):
+            logger.warning(f"⚠️ {column} has values outside {dtype}, keeping {df[column].dtype}")
+        else:
+            df[column] = df[column].astype(dtype)
+    if 'timestamp' in df.columns and df['timestamp'].dtype == object:
+        df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce', format='ISO8601')
+    return df
+
+
+def memory_report(df: pd.DataFrame) -> Dict[str, float]:
+    """Total and per-row memory of a frame (deep, i.e. including strings)"""
+    usage = df.memory_usage(deep=True, index=False)
+    total = int(usage.sum())
+    return {
+        'rows': len(df),
+        'total_bytes': total,
+        'bytes_per_row': round(total / len(df), 1) if len(df) else 0.0,
+        'columns': {col: int(b) for col, b in usage.items()},
+    }
+
+
+def load_training_data(path: Union[str, Path] = "data/processed/training_data.csv", report: bool = True) -> pd.DataFrame:
+    """
+    Read a training CSV straight into the typed schema
+
+    Args:
+        path: CSV with the collector / export_for_models columns
+        report: Log the memory footprint after loading
+    """
+    header = pd.read_csv(path, nrows=0).columns
+    # Integer columns are parsed wide and range-checked by optimize_dtypes:
+    # read_csv would wrap out-of-range values into the small dtype silently
+    dtypes = {col: dtype for col, dtype in TRAINING_DTYPES.items()
+              if col in header and not dtype.startswith(('int', 'uint'))}
+
+    try:
+        df = pd.read_csv(path, dtype=dtypes)
+    except (ValueError, TypeError):
+        # Unparseable values in a typed column: parse with inferred dtypes, then downcast
+        df = pd.read_csv(path)
+    df = optimize_dtypes(df)
+
+    if report:
+        stats = memory_report(df)
+        logger.info(f"📊 Loaded {stats['rows']} training rows: "
+                    f"{stats['bytes_per_row']} bytes/row ({stats['total_bytes'] / 1e6:.2f} MB)")
+    return df
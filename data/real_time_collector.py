@@ -7,19 +7,41 @@ Uses multiple API endpoints with conservative rate limiting
 Always falls back to synthetic data when APIs unavailable
 """
 
-import requests
 import pandas as pd
 import logging
 import random 
 from datetime import datetime
 import time
+from collections import Counter
 import numpy as np
 from pathlib import Path
-import xml.etree.ElementTree as ET
 from database.db_manager import DatabaseManager
+from .api_config import api_bases, min_request_interval
+from .archive import archive_mode
+from .http_client import shared_session
+from .dedup import shared_deduplicator
+from .scheduler import shared_scheduler
+from .iris_parser import CHUNK_SIZE, first_station
 
 logger = logging.getLogger(__name__)
 
+# Simplified distances (km) from a station to a destination city
+STATION_DISTANCES = {
+    ('Cologne Hbf', 'dortmund'): 70,
+    ('Cologne Hbf', 'düsseldorf'): 40,
+    ('Cologne Hbf', 'essen'): 65,
+    ('Düsseldorf Hbf', 'dortmund'): 55,
+    ('Düsseldorf Hbf', 'essen'): 30,
+    ('Essen Hbf', 'bochum'): 15,
+    ('Dortmund Hbf', 'essen'): 35,
+}
+
+
+def estimate_distance(from_station, to_city):
+    """Estimate distance between stations (simplified, 50 km default)"""
+    return STATION_DISTANCES.get((from_station, to_city.lower()), 50)
+
+
 class RealTimeCollector:
     """
     Collects real-time train data from multiple German public transport APIs
@@ -28,8 +50,8 @@ class RealTimeCollector:
     """
     
     def __init__(self, data_dir="data/raw"):
-        self.session = requests.Session()
-        self.session.headers.update({"User-Agent": "Metrodorf/1.0 (Research Project)"})
+        # Pooled keep-alive session shared by every collector in this process
+        self.session = shared_session()
         
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(parents=True, exist_ok=True)
@@ -52,7 +74,14 @@ class RealTimeCollector:
             'v6': 0,
             'vbb': 0
         }
-        self.min_request_interval = 10  # seconds
+        self.min_request_interval = min_request_interval()  # seconds (default 10)
+        self.requests_made = Counter()   # API → requests issued (every request passes the rate limit)
+        # Production endpoints unless METRODORF_*_URL point elsewhere (e.g. data/emulator.py)
+        self.api_base = api_bases()
+        # Optional record / replay of raw responses (data/archive.py, environment driven)
+        self.archive_mode = archive_mode()
+        if self.archive_mode == 'replay':
+            self.min_request_interval = 0  # pacing comes from the archive
         
         # API failure tracking
         self.api_failures = {
@@ -61,6 +90,10 @@ class RealTimeCollector:
             'vbb': 0
         }
         self.max_failures = 3  # Disable API after 3 consecutive failures
+        # Last-seen delays per departure, shared by all collectors in this process
+        self.dedup = shared_deduplicator()
+        # Adaptive poll times per station against the per-API budgets (shared as well)
+        self.scheduler = shared_scheduler(self.stations)
         # Initialize database connection
         self.db = DatabaseManager()
         self.db.create_tables()  # Ensure tables exist
@@ -83,10 +116,10 @@ class RealTimeCollector:
     
         delays = {}
     
-        # Try IRIS (most reliable)
-        iris_departures = self._get_from_iris(station_data['eva'])
-        if iris_departures:
-           delays['iris'] = self._extract_delay_from_xml(iris_departures)
+        # Try IRIS (most reliable): incremental plan + change feed, no full re-download
+        if self.api_failures['iris'] < self.max_failures:
+           feed = self._poll_iris(station_data['eva'])
+           delays['iris'] = feed.current_delay(station_data['eva'])
     
         # Try v6 - with None handling
         v6_departures = self._get_from_v6(station_data['eva'])
@@ -132,6 +165,76 @@ class RealTimeCollector:
     
         return delays
 
+    def fetch_sources(self, station_name, requests=None):
+        """
+        Raw departures of a station per API: IRIS stop states (copies), v6 / VBB lists
+        Empty dict for an unknown station.
+        
+        Args:
+            requests: Counter updated with the requests this poll issued per API
+                (IRIS plan slices and /fchg included), for PollScheduler.record
+        """
+        station_data = self.stations.get(station_name)
+        if not station_data:
+            return {}
+        eva = station_data['eva']
+        
+        before = self.requests_made.copy()
+        raw = {}
+        if self.api_failures['iris'] < self.max_failures:
+            raw['iris'] = self._poll_iris(eva).stop_states(eva)
+        raw['v6'] = self._get_from_v6(eva) or []
+        raw['vbb'] = self._get_from_vbb(eva) or []
+        if requests is not None:
+            requests.update(self.requests_made - before)
+        return raw
+
+    def fused_departures(self, station_name, requests=None):
+        """
+        Departures of a station from every available API, joined per train
+        (data/fusion.py: one row per train with weighted delay and provenance)
+        """
+        from .fusion import fuse, source_frames
+        
+        raw = self.fetch_sources(station_name, requests)
+        if not raw:
+            return fuse({})
+        return fuse(source_frames(raw, self.stations[station_name]['eva']))
+
+    def iris_feed(self):
+        """Process-wide IRIS change feed for all known stations (created on first use)"""
+        from .iris_feed import shared_iris_feed
+        return shared_iris_feed(
+            {name: data['eva'] for name, data in self.stations.items()},
+            session=self.session,
+            base_url=self.api_base['iris'],
+            wait=lambda: self._wait_for_rate_limit('iris'),
+            on_result=self._iris_result
+        )
+
+    def _poll_iris(self, eva):
+        """Incremental IRIS update of one station, paced and counted by this collector"""
+        feed = self.iris_feed()
+        feed.poll(evas=[eva], wait=lambda: self._wait_for_rate_limit('iris'), on_result=self._iris_result)
+        return feed
+
+    def _iris_result(self, ok):
+        """Feed requests count towards the IRIS circuit breaker like _get_from_iris"""
+        self.api_failures['iris'] = 0 if ok else self.api_failures['iris'] + 1
+
+    def save_records(self, records):
+        """Store parsed delay records (DataFrame with station_name) in the database"""
+        if len(records) == 0 or not self.db.available:
+            return 0
+        saved = 0
+        for station_name, group in records.groupby('station_name'):
+            station = self.stations[station_name]
+            station_id = self.db.insert_station(station_name, station['eva'], station['ds100'],
+                                                station['lat'], station['lon'])
+            if station_id:
+                saved += self.db.insert_real_delays(station_id, group)
+        return saved
+
     def _extract_delay_from_xml(self, station_element):
         """Extract delay minutes from IRIS XML response."""
         try:
@@ -152,7 +255,8 @@ class RealTimeCollector:
            sleep_time = self.min_request_interval - time_since_last
            logger.debug(f"⏳ Rate limit for {api_name}: waiting {sleep_time:.1f}s")
            time.sleep(sleep_time)
-           self.last_request_time[api_name] = time.time()  # type: ignore
+        self.last_request_time[api_name] = time.time()  # type: ignore
+        self.requests_made[api_name] += 1
               
     def _check_any_api(self):
         """Check if at least one API is reachable"""
@@ -160,7 +264,7 @@ class RealTimeCollector:
         try:
             self._wait_for_rate_limit('iris')
             response = self.session.get(
-                "https://iris.noncd.db.de/iris-tts/timetable/station/8000080",
+                f"{self.api_base['iris']}/station/8000080",
                 timeout=3
             )
             if response.status_code == 200:
@@ -172,7 +276,7 @@ class RealTimeCollector:
         try:
             self._wait_for_rate_limit('v6')
             response = self.session.get(
-                "https://v6.db.transport.rest/stops/8000080",
+                f"{self.api_base['v6']}/stops/8000080",
                 timeout=3
             )
             if response.status_code == 200:
@@ -195,12 +299,14 @@ class RealTimeCollector:
         self._wait_for_rate_limit('iris')
         
         try:
-            url = f"https://iris.noncd.db.de/iris-tts/timetable/station/{station_id}"
-            response = self.session.get(url, timeout=3)
+            url = f"{self.api_base['iris']}/station/{station_id}"
+            with self.session.get(url, timeout=3, stream=True) as response:
+                status = response.status_code
+                # Streamed: stops reading at the first <station> instead of building the whole tree
+                station = first_station(response.iter_content(CHUNK_SIZE)) if status == 200 else None
             
-            if response.status_code == 200:
-                root = ET.fromstring(response.text)
-                for station in root.findall('.//station'):
+            if status == 200:
+                if station:
                     self.api_failures['iris'] = 0  # Reset on success
                     return {
                         'name': station.get('name'),
@@ -208,13 +314,13 @@ class RealTimeCollector:
                         'ds100': station.get('ds100'),
                         'source': 'iris'
                     }
-            elif response.status_code == 429:
+            elif status == 429:
                 logger.warning("IRIS API rate limited, waiting 60s")
                 time.sleep(60)
                 return None
             else:
                 self.api_failures['iris'] += 1
-                logger.warning(f"IRIS API returned {response.status_code}")
+                logger.warning(f"IRIS API returned {status}")
                 return None
                 
         except Exception as e:
@@ -235,7 +341,7 @@ class RealTimeCollector:
         self._wait_for_rate_limit('v6')
         
         try:
-            url = f"https://v6.db.transport.rest/stops/{station_id}/departures"
+            url = f"{self.api_base['v6']}/stops/{station_id}/departures"
             response = self.session.get(
                 url, 
                 params={"duration": 60, "limit": 10},
@@ -276,7 +382,7 @@ class RealTimeCollector:
         self._wait_for_rate_limit('vbb')
         
         try:
-            url = f"https://v5.vbb.transport.rest/stops/{station_id}/departures"
+            url = f"{self.api_base['vbb']}/stops/{station_id}/departures"
             response = self.session.get(
                 url,
                 params={"duration": 60},
@@ -341,72 +447,59 @@ class RealTimeCollector:
         return []
     
     def parse_departure(self, departure, station_name):
-        """Parse departure data into training format"""
+        """Parse one departure into training format (see parse_departures for lists)"""
         try:
-             # Extract delay in minutes
-             delay = 0
-             if 'delay' in departure and departure['delay'] is not None:
-                 delay = departure['delay'] // 60  # Convert seconds to minutes
-             elif 'delayInMinutes' in departure and departure['delayInMinutes'] is not None:
-                 delay = departure['delayInMinutes']
-
-             when = departure.get('when', '')
-        
-             hour = 0
-             if when:
-                try:
-                     hour = datetime.fromisoformat(when.replace('Z', '+00:00')).hour
-                except:
-                     hour = 12
-        
-             is_peak = 1 if (7 <= hour <= 9) or (16 <= hour <= 18) else 0
-        
-             direction = (departure.get('direction') or '').lower()
-             is_cologne = 1 if 'köln' in direction or 'cologne' in direction else 0
-        
-             parsed = {
-                 'distance_km': self._estimate_distance(station_name, direction),
-                 'time_of_day': hour,
-                 'day_of_week': datetime.now().weekday(),
-                 'is_peak_hour': is_peak,
-                 'is_cologne_bottleneck': is_cologne,
-                 'delay_minutes': max(0, delay),
-                 'source': 'real',
-                 'timestamp': datetime.now().isoformat()
-             }
-        
-             # Save to database
-             station_id = self.db.insert_station(
-                 station_name,
-                 self.stations[station_name]['eva'],
-                 self.stations[station_name]['ds100'],
-                 self.stations[station_name]['lat'],
-                 self.stations[station_name]['lon']
-             )
-             if station_id:
-                # Note: is_peak_hour and is_cologne_bottleneck converted to boolean inside insert_real_delay
-                self.db.insert_real_delay(station_id, parsed)
-                logger.debug(f"💾 Saved to DB: {parsed['delay_minutes']} min delay")
+            frame = self.parse_departures([departure], station_name)
+        except Exception as e:
+            logger.error(f"Error parsing departure: {e}")
+            return None
+        if frame.empty:
+            return None
+        parsed = frame.iloc[0].to_dict()
+        parsed['timestamp'] = parsed['timestamp'].isoformat()
+        return parsed
+    
+    def parse_departures(self, departures, station_name, save=True):
+        """
+        Parse a whole departure list into a typed frame in one vectorized pass
         
-             return parsed
+        Args:
+            departures: Departure dicts from get_departures()
+            station_name: Station the departures belong to
+            save: Bulk-insert the rows into the database (one station lookup, one executemany)
+        """
+        from .departures import parse_departures
+        from .fusion import hafas_keys, has_train_key, train_keys
         
-        except Exception as e:
-           logger.error(f"Error parsing departure: {e}")
-           return None
-           
+        departures = list(departures)
+        frame = parse_departures(departures, station_name)
+        station = self.stations[station_name]
+        # Same (eva, trip id, planned) keys as the fused path, so scheduler volatility is comparable;
+        # departures without a key cannot be told apart across polls and are not written
+        trains = hafas_keys(departures, station['eva'])
+        keyed = has_train_key(trains)
+        keys = train_keys(trains[keyed])
+        delays = frame['delay_minutes'].to_numpy()[keyed]
+        # Density and delay volatility steer when this station is polled next
+        self.scheduler.record(station_name, keys, delays)
+        if save and len(keys) and self.db.available:
+            # Only new trains and changed delays since the last poll are written
+            mask = self.dedup.check(keys, delays)
+            changes = frame[keyed][mask]
+            if len(changes):
+                station_id = self.db.insert_station(
+                    station_name, station['eva'], station['ds100'], station['lat'], station['lon']
+                )
+                saved = self.db.insert_real_delays(station_id, changes) if station_id else 0
+                if saved:
+                    # Remembered only once written: a failed insert is retried on the next poll
+                    self.dedup.commit([k for k, m in zip(keys, mask) if m], delays[mask])
+                    logger.debug(f"💾 Saved {saved} of {len(frame)} delays for {station_name} to DB")
+        return frame
     
     def _estimate_distance(self, from_station, to_city):
         """Estimate distance between stations (simplified)"""
-        distances = {
-            ('Cologne Hbf', 'dortmund'): 70,
-            ('Cologne Hbf', 'düsseldorf'): 40,
-            ('Cologne Hbf', 'essen'): 65,
-            ('Düsseldorf Hbf', 'dortmund'): 55,
-            ('Düsseldorf Hbf', 'essen'): 30,
-            ('Essen Hbf', 'bochum'): 15,
-            ('Dortmund Hbf', 'essen'): 35,
-        }
-        return distances.get((from_station, to_city.lower()), 50)
+        return estimate_distance(from_station, to_city)
     
     def generate_synthetic_sample(self):
         """Generate realistic synthetic sample based on Bologna 2025"""
@@ -470,60 +563,35 @@ class RealTimeCollector:
         data = []
         real_samples = 0
     
-        # API reliability weights (Dr. Oscar's recommendation)
-        api_weights = {
-           'iris': 0.7,   # most reliable
-           'v6': 0.2,     # unstable
-           'vbb': 0.1     # least reliable
-        }
-    
         if self.api_available:
+           from .fusion import to_training_frame, train_keys
            target_real = int(n_samples * real_ratio)
            logger.info(f"📡 Attempting to collect up to {target_real} real samples...")
         
-           for station_name in self.stations.keys():
+           station_names = {data['eva']: name for name, data in self.stations.items()}
+           # One round of polls; the scheduler picks the order (focus station, busy and
+           # volatile stations first) and waits until the API budget allows the next one
+           for _ in range(len(self.stations)):
                 if real_samples >= target_real:
                    break
+                station_name = self.scheduler.wait_next()
             
-                # STEP 1: Get delays from ALL APIs
-                delays_dict = self.get_delays_from_all_apis(station_name)
-              
-                if delays_dict:
-                   # STEP 2: Extract readings and weights
-                   readings = []
-                   weights = []
-                   for api_name, delay in delays_dict.items():
-                        if delay is not None:
-                           readings.append(delay)
-                           weights.append(api_weights.get(api_name, 0.1))
-                
-                if readings:
-                    # STEP 3: Weighted fusion
-                    fused_delay = self.weighted_sensor_fusion(readings, weights)
-                    
-                    # STEP 4: Create sample with fused delay
-                    hour = datetime.now().hour
-                    is_peak = 1 if (7 <= hour <= 9) or (16 <= hour <= 18) else 0
-                    
-                    sample = {
-                        'distance_km': 50,  # default or estimate
-                        'time_of_day': hour,
-                        'day_of_week': datetime.now().weekday(),
-                        'is_peak_hour': is_peak,
-                        'is_cologne_bottleneck': 0,  # would need direction info
-                        'delay_minutes': fused_delay,
-                        'source': 'real_fused',
-                        'timestamp': datetime.now().isoformat()
-                    }
-                    
-                    data.append(sample)
-                    real_samples += 1
-                    logger.info(f"   ✓ Fusion: {readings} → {fused_delay:.1f} min")
-            
-                    # Extra wait between stations
-                    time.sleep(5)
+                # One fused record per train, aligned across IRIS / v6 / VBB
+                requests = Counter()
+                trains = self.fused_departures(station_name, requests)
+                self.scheduler.record(station_name, train_keys(trains),
+                                      trains['delay_minutes'].to_numpy() if len(trains) else [],
+                                      requests=requests)
+                if trains.empty:
+                    continue
+                samples = to_training_frame(trains, station_names).head(target_real - real_samples)
+                if len(samples):
+                    data.extend(samples.drop(columns=['station_name', 'sources']).to_dict('records'))
+                    real_samples += len(samples)
+                    provenance = samples['sources'].value_counts().to_dict()
+                    logger.info(f"   ✓ Fusion: {len(samples)} trains at {station_name} {provenance}")
         
-                logger.info(f"✅ Collected {real_samples} real samples (fused)")
+           logger.info(f"✅ Collected {real_samples} real samples (fused)")
     
         # Fill remaining with synthetic
         synthetic_needed = n_samples - len(data)
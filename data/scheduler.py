@@ -0,0 +1,236 @@
+"""
+Adaptive polling scheduler for the real-time APIs
+Replaces fixed station order + sleep(5) with a rate budget that follows the traffic:
+- weight per station = timetable density (departures per poll, EWMA)
+  × delay volatility (changed delays per minute since the last poll, EWMA)
+  × a boost for the dispatcher's station (Dortmund Hbf)
+- the per-API budgets (requests per minute) fix how many station polls fit
+  into a minute; that total is split proportionally to the weights with
+  water-filling between a minimum and maximum poll interval
+- next poll time = last poll + 1 / rate; due stations are served highest weight first
+
+Quiet stations at night drift towards the maximum interval, busy and
+volatile ones towards the minimum, for the same total quota.
+"""
+
+import heapq
+import logging
+import threading
+import time
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from .dedup import DepartureDeduplicator
+
+logger = logging.getLogger(__name__)
+
+# Requests per minute per API (1 request / 10 s, see RealTimeCollector.min_request_interval)
+API_BUDGETS = {'iris': 6.0, 'v6': 6.0, 'vbb': 6.0}
+# Requests one station poll costs per API, a prior until polls report their actual
+# requests (EWMA). IRIS: the first poll and every hour rollover add plan slices
+# and a full /fchg to the /rchg delta
+POLL_COST = {'iris': 3.0, 'v6': 1.0, 'vbb': 1.0}
+
+FOCUS_STATION = 'Dortmund Hbf'
+FOCUS_BOOST = 3.0
+MIN_INTERVAL = 60.0       # seconds; never poll a station more often
+MAX_INTERVAL = 1800.0     # seconds; never leave a station unpolled longer
+DENSITY_SCALE = 20.0      # departures per poll that double a station's weight
+VOLATILITY_SCALE = 1.0    # changed delays per minute that double a station's weight
+EWMA_ALPHA = 0.3
+
+
+def water_fill(weights: Dict[str, float], total: float, low: float, high: float) -> Dict[str, float]:
+    """
+    Split `total` proportionally to `weights` with every share clamped to [low, high]
+
+    Shares above `high` are capped first, then shares below `low` are
+    raised; the remainder is redistributed among the others each time
+    until nothing changes.
+    """
+    if not weights:
+        return {}
+    if low * len(weights) >= total:
+        return {name: total / len(weights) for name in weights}
+
+    shares: Dict[str, float] = {}
+    free = dict(weights)
+    remaining = total
+    while free:
+        weight_sum = sum(free.values()) or 1.0
+        proposal = {name: remaining * w / weight_sum for name, w in free.items()}
+        # Capping raises everyone else's share and flooring lowers it, so fix
+        # one side per pass (caps first) or the bounds would break the total
+        clamped = {name: high for name, share in proposal.items() if share > high}
+        if not clamped:
+            clamped = {name: low for name, share in proposal.items() if share < low}
+        if not clamped:
+            shares.update(proposal)
+            break
+        shares.update(clamped)
+        remaining -= sum(clamped.values())
+        for name in clamped:
+            del free[name]
+    return shares
+
+
+class PollScheduler:
+    """Per-station next-poll times solved against per-API request budgets"""
+
+    def __init__(
+        self,
+        stations: Iterable[str],
+        budgets: Dict[str, float] = API_BUDGETS,
+        poll_cost: Dict[str, float] = POLL_COST,
+        focus_station: Optional[str] = FOCUS_STATION,
+        focus_boost: float = FOCUS_BOOST,
+        min_interval: float = MIN_INTERVAL,
+        max_interval: float = MAX_INTERVAL,
+        clock=time.monotonic,
+    ):
+        self.stations = list(stations)
+        self.budgets = dict(budgets)
+        self.poll_cost = dict(poll_cost)
+        self.focus_station = focus_station
+        self.focus_boost = focus_boost
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.clock = clock
+
+        self.density = {name: 0.0 for name in self.stations}
+        self.volatility = {name: 0.0 for name in self.stations}
+        self.last_poll: Dict[str, Optional[float]] = {name: None for name in self.stations}
+        self.last_feedback: Dict[str, Optional[float]] = {name: None for name in self.stations}
+        self._reserved = set()
+        self.changes = DepartureDeduplicator(ttl=2 * max_interval)
+        self._intervals = self._solve()
+        self._lock = threading.Lock()
+
+    # ============================================
+    # BUDGET
+    # ============================================
+    @property
+    def polls_per_minute(self) -> float:
+        """Station polls per minute the tightest API budget allows"""
+        # No API costing anything (every source skipped lately): only the interval bounds apply
+        return min((self.budgets[api] / cost for api, cost in self.poll_cost.items() if cost > 0),
+                   default=len(self.stations) * 60.0 / self.min_interval)
+
+    def weight(self, station: str) -> float:
+        boost = self.focus_boost if station == self.focus_station else 1.0
+        return (boost * (1 + self.density[station] / DENSITY_SCALE)
+                * (1 + self.volatility[station] / VOLATILITY_SCALE))
+
+    def _solve(self) -> Dict[str, float]:
+        """Poll interval (seconds) per station from the weights and the budget"""
+        rates = water_fill(
+            {name: self.weight(name) for name in self.stations},
+            total=self.polls_per_minute,
+            low=60.0 / self.max_interval,
+            high=60.0 / self.min_interval,
+        )
+        return {name: 60.0 / rate for name, rate in rates.items()}
+
+    def interval(self, station: str) -> float:
+        return self._intervals[station]
+
+    def next_poll(self, station: str) -> float:
+        """Clock time the station is due (never polled = due now)"""
+        last = self.last_poll[station]
+        return self.clock() if last is None else last + self._intervals[station]
+
+    # ============================================
+    # SCHEDULING
+    # ============================================
+    def due(self, limit: Optional[int] = None, now: Optional[float] = None) -> List[str]:
+        """Stations due now, highest weight first"""
+        now = self.clock() if now is None else now
+        with self._lock:
+            due = [name for name in self.stations if self.next_poll(name) <= now]
+            due.sort(key=self.weight, reverse=True)
+        return due[:limit] if limit else due
+
+    def next_due(self) -> Tuple[str, float]:
+        """(station, seconds until it is due) for the earliest due station"""
+        with self._lock:
+            queue = [(self.next_poll(name), -self.weight(name), name) for name in self.stations]
+        when, _, name = heapq.nsmallest(1, queue)[0]
+        return name, max(0.0, when - self.clock())
+
+    def wait_next(self) -> str:
+        """Sleep until the next station is due and return it"""
+        name, wait = self.next_due()
+        if wait > 0:
+            time.sleep(wait)
+        return name
+
+    def reserve(self, station: str, now: Optional[float] = None):
+        """
+        Mark a station as polled when the poll starts
+
+        For pipelined callers (data/ingest.py) whose feedback arrives later:
+        without it next_due() keeps returning the station until record().
+        """
+        now = self.clock() if now is None else now
+        with self._lock:
+            self.last_poll[station] = now
+            self._reserved.add(station)
+
+    def record(self, station: str, keys: Sequence[Hashable], delays: Sequence[float], now: Optional[float] = None,
+               requests: Optional[Dict[str, int]] = None):
+        """
+        Feed back one poll: departures seen and how many delays changed
+
+        Args:
+            keys: Departure keys (eva, trip id, planned), see data.fusion.train_keys
+            delays: Delay per departure (minutes)
+            requests: Requests the poll issued per API; moves the poll cost the
+                budget is split with (EWMA) towards what polls actually use
+        """
+        now = self.clock() if now is None else now
+        with self._lock:
+            if requests is not None:
+                for api, cost in self.poll_cost.items():
+                    self.poll_cost[api] = cost + EWMA_ALPHA * (requests.get(api, 0) - cost)
+            last = self.last_feedback.get(station)
+            changed = int(self.changes.changed([(station, key) for key in keys], delays, now).sum())
+            # The first poll sees every departure as new: it only sets the density
+            if last is not None:
+                per_minute = changed / max((now - last) / 60.0, 1.0 / 60)
+                self.volatility[station] += EWMA_ALPHA * (per_minute - self.volatility[station])
+                self.density[station] += EWMA_ALPHA * (len(keys) - self.density[station])
+            else:
+                self.density[station] = float(len(keys))
+            self.last_feedback[station] = now
+            # A reserved poll already moved the schedule when it started
+            if station in self._reserved:
+                self._reserved.discard(station)
+            else:
+                self.last_poll[station] = now
+            self._intervals = self._solve()
+
+    def plan(self) -> pd.DataFrame:
+        """Current weights, intervals and due times per station"""
+        now = self.clock()
+        return pd.DataFrame([{
+            'station': name,
+            'weight': round(self.weight(name), 3),
+            'density': round(self.density[name], 1),
+            'changes_per_min': round(self.volatility[name], 2),
+            'interval_s': round(self._intervals[name], 1),
+            'due_in_s': round(max(0.0, self.next_poll(name) - now), 1),
+        } for name in self.stations]).sort_values('weight', ascending=False, ignore_index=True)
+
+
+_SHARED: Optional[PollScheduler] = None
+_SHARED_LOCK = threading.Lock()
+
+
+def shared_scheduler(stations: Iterable[str]) -> PollScheduler:
+    """Process-wide scheduler (survives collector instances, like shared_deduplicator)"""
+    global _SHARED
+    with _SHARED_LOCK:
+        if _SHARED is None:
+            _SHARED = PollScheduler(stations)
+        return _SHARED
@@ -19,6 +19,10 @@ try:
 except (ImportError, ModuleNotFoundError):
     DATABASE_URL = None
 
+def _iso(value):
+    """ISO string for datetimes / pandas Timestamps (same format as insert_real_delay)"""
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
 class DatabaseManager:
     """
     Manages all PostgreSQL operations for Metrodorf
@@ -100,6 +104,20 @@ class DatabaseManager:
                 conn.execute(text("CREATE INDEX IF NOT EXISTS idx_real_delays_station ON real_delays(station_id)"))
                 conn.execute(text("CREATE INDEX IF NOT EXISTS idx_real_delays_timestamp ON real_delays(api_timestamp)"))
                 
+                # Hourly per-station aggregates kept current by the ingestion daemon
+                conn.execute(text("""
+                    CREATE TABLE IF NOT EXISTS delay_rollups (
+                        station_id INTEGER REFERENCES stations(id) ON DELETE CASCADE,
+                        hour_start TIMESTAMP NOT NULL,
+                        n_trains INTEGER,
+                        n_delayed INTEGER,
+                        mean_delay DECIMAL(6, 2),
+                        max_delay DECIMAL(6, 2),
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        PRIMARY KEY (station_id, hour_start)
+                    )
+                """))
+                
                 logger.info("✅ Tables created/verified")
         except RuntimeError:
             logger.info("📁 Cannot create tables — no database connection")
@@ -181,6 +199,107 @@ class DatabaseManager:
         except RuntimeError:
             return False
     
+    def insert_real_delays(self, station_id, records):
+        """
+        Bulk insert parsed delays (DataFrame or list of dicts) in one transaction
+        Uses a single executemany instead of one round trip per record.
+        
+        Returns:
+            Number of inserted rows
+        """
+        if not self.available:
+            logger.info("📁 Skipping delay insert (no database)")
+            return 0
+        
+        if isinstance(records, pd.DataFrame):
+            records = records.to_dict('records')
+        now = datetime.now().isoformat()
+        rows = [
+            {
+                "station_id": station_id,
+                "distance_km": float(r['distance_km']),
+                "time_of_day": int(r['time_of_day']),
+                "day_of_week": int(r['day_of_week']),
+                "is_peak_hour": bool(r['is_peak_hour']),
+                "is_cologne_bottleneck": bool(r['is_cologne_bottleneck']),
+                "delay_minutes": float(r['delay_minutes']),
+                "source": str(r.get('source', 'real')),
+                "api_timestamp": _iso(r.get('timestamp', now))
+            }
+            for r in records
+        ]
+        if not rows:
+            return 0
+        
+        try:
+            with self.get_connection() as conn:
+                conn.execute(
+                    text("""
+                        INSERT INTO real_delays (
+                            station_id, distance_km, time_of_day, day_of_week,
+                            is_peak_hour, is_cologne_bottleneck, delay_minutes,
+                            source, api_timestamp
+                        ) VALUES (
+                            :station_id, :distance_km, :time_of_day, :day_of_week,
+                            :is_peak_hour, :is_cologne_bottleneck, :delay_minutes,
+                            :source, :api_timestamp
+                        )
+                    """),
+                    rows
+                )
+            return len(rows)
+        except RuntimeError:
+            return 0
+    
+    def upsert_rollups(self, station_id, rollups):
+        """
+        Insert or replace hourly rollups (DataFrame or list of dicts with
+        hour_start, n_trains, n_delayed, mean_delay, max_delay) of one station
+        
+        Returns:
+            Number of written rows
+        """
+        if not self.available:
+            return 0
+        
+        if isinstance(rollups, pd.DataFrame):
+            rollups = rollups.to_dict('records')
+        rows = [
+            {
+                "station_id": station_id,
+                "hour_start": _iso(r['hour_start']),
+                "n_trains": int(r['n_trains']),
+                "n_delayed": int(r['n_delayed']),
+                "mean_delay": float(r['mean_delay']),
+                "max_delay": float(r['max_delay'])
+            }
+            for r in rollups
+        ]
+        if not rows:
+            return 0
+        
+        try:
+            with self.get_connection() as conn:
+                conn.execute(
+                    text("""
+                        INSERT INTO delay_rollups (
+                            station_id, hour_start, n_trains, n_delayed, mean_delay, max_delay
+                        ) VALUES (
+                            :station_id, :hour_start, :n_trains, :n_delayed, :mean_delay, :max_delay
+                        )
+                        ON CONFLICT (station_id, hour_start) DO UPDATE SET
+                            n_trains = EXCLUDED.n_trains,
+                            n_delayed = EXCLUDED.n_delayed,
+                            mean_delay = EXCLUDED.mean_delay,
+                            max_delay = EXCLUDED.max_delay,
+                            updated_at = CURRENT_TIMESTAMP
+                    """),
+                    rows
+                )
+            return len(rows)
+        except RuntimeError:
+            return 0
+    
     def get_training_data(self, limit=None):
         """Get all real delays for training"""
         if not self.available or self.engine is None:
@@ -9,7 +9,6 @@ Includes manual corrections for known API errors:
 - Bingen → Bochum (API confusion)
 """
 
-import requests
 import pandas as pd
 import logging
 from datetime import datetime
@@ -17,6 +16,9 @@ from pathlib import Path
 import xml.etree.ElementTree as ET
 import time
 
+from data.api_config import api_base
+from data.http_client import shared_session
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -37,8 +39,7 @@ class StationDownloader:
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(parents=True, exist_ok=True)
         
-        self.session = requests.Session()
-        self.session.headers.update({"User-Agent": "Metrodorf/1.0 (Research Project)"})
+        self.session = shared_session()
         
         # Rhine-Ruhr stations we care about
         self.target_stations = [
@@ -62,13 +63,13 @@ class StationDownloader:
         self.apis = [
             {
                 'name': 'v6',
-                'url': "https://v6.db.transport.rest/stops",
+                'url': f"{api_base('v6')}/stops",
                 'type': 'json',
                 'priority': 1
             },
             {
                 'name': 'iris',
-                'url': "https://iris.noncd.db.de/iris-tts/timetable/station",
+                'url': f"{api_base('iris')}/station",
                 'type': 'xml',
                 'priority': 2
             }
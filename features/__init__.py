@@ -0,0 +1,6 @@
+"""
+Feature engineering for Metrodorf
+Shared feature transformer used by training, evaluation and inference
+"""
+
+from .transformer import FeatureTransformer, FEATURE_COLUMNS
@@ -0,0 +1,220 @@
+"""
+Versioned on-disk feature store for prepared training matrices
+- Caches the FeatureTransformer output (X) and target (y) as raw float32 files
+- Loads them back as read-only memory maps (no CSV parsing, no feature engineering)
+- Keyed by feature code version (hash of features/transformer.py) and source file
+  (name plus a hash of the resolved path, so equally named CSVs never collide)
+- Append-only: when rows are appended to the source CSV, only the new tail is
+  parsed and transformed, then appended to the cached arrays
+
+Layout:
+    data/features/<code_key>/<source_stem>_<path_hash>/
+        X.f32, y.f32        # row-major float32, n_rows x n_cols / n_rows
+        meta.json           # n_rows, source size/mtime/prefix hash, CSV header
+
+Full rebuilds are written to a temporary directory and swapped in with
+os.replace, so a concurrent reader never maps a half-written file.
+"""
+
+import hashlib
+import io
+import json
+import logging
+import os
+import shutil
+import tempfile
+import uuid
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from . import transformer as transformer_module
+from .transformer import FeatureTransformer, FEATURE_COLUMNS, FEATURE_VERSION
+from data.loader import load_training_data, optimize_dtypes
+
+logger = logging.getLogger(__name__)
+
+STORE_DIR = "data/features"
+TARGET_COLUMN = 'delay_minutes'
+
+
+def _sha256_prefix(path: Path, n_bytes: int) -> str:
+    """Hash the first n_bytes of a file"""
+    digest = hashlib.sha256()
+    remaining = n_bytes
+    with open(path, 'rb') as f:
+        while remaining > 0:
+            block = f.read(min(1 << 20, remaining))
+            if not block:
+                break
+            digest.update(block)
+            remaining -= len(block)
+    return digest.hexdigest()
+
+
+def feature_code_key() -> str:
+    """Version key for the feature code: FEATURE_VERSION + transformer source"""
+    digest = hashlib.sha256(FEATURE_VERSION.encode())
+    digest.update(Path(transformer_module.__file__).read_bytes())
+    return digest.hexdigest()[:12]
+
+
+class FeatureStore:
+    """Memory-mappable cache of prepared feature matrices"""
+
+    def __init__(self, root: str = STORE_DIR):
+        self.root = Path(root) / feature_code_key()
+        self.transformer = FeatureTransformer()
+
+    def _entry_dir(self, source: Path) -> Path:
+        path_key = hashlib.sha256(str(source.resolve()).encode()).hexdigest()[:12]
+        return self.root / f"{source.stem}_{path_key}"
+
+    def _read_meta(self, entry: Path) -> Optional[dict]:
+        try:
+            with open(entry / "meta.json") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _write_meta(self, entry: Path, meta: dict):
+        tmp = entry / "meta.json.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp, entry / "meta.json")
+
+    def _open(self, entry: Path, meta: dict) -> Tuple[np.ndarray, np.ndarray]:
+        n_rows, n_cols = meta['n_rows'], meta['n_cols']
+        if n_rows == 0:
+            return np.empty((0, n_cols), dtype=np.float32), np.empty(0, dtype=np.float32)
+        X = np.memmap(entry / "X.f32", dtype=np.float32, mode='r', shape=(n_rows, n_cols))
+        y = np.memmap(entry / "y.f32", dtype=np.float32, mode='r', shape=(n_rows,))
+        return X, y
+
+    def _transform(self, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        X = self.transformer.transform(df)
+        y = df[TARGET_COLUMN].to_numpy(dtype=np.float32)
+        return X, y
+
+    def _append_arrays(self, entry: Path, X: np.ndarray, y: np.ndarray):
+        with open(entry / "X.f32", 'ab') as f:
+            f.write(np.ascontiguousarray(X, dtype=np.float32).tobytes())
+        with open(entry / "y.f32", 'ab') as f:
+            f.write(np.ascontiguousarray(y, dtype=np.float32).tobytes())
+
+    def load(self, source: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return (X, y) for a training CSV, building or extending the cache as needed
+
+        Returns:
+            X: (n_rows, 9) read-only float32 memmap in FEATURE_COLUMNS order
+            y: (n_rows,) read-only float32 memmap of delay_minutes
+        """
+        source = Path(source)
+        entry = self._entry_dir(source)
+        stat = source.stat()
+        meta = self._read_meta(entry)
+
+        if meta is not None:
+            # Unchanged file (cheap check first, then the prefix hash)
+            if meta['source_bytes'] == stat.st_size and meta['source_mtime'] == stat.st_mtime:
+                logger.info(f"⚡ Feature store hit: {meta['n_rows']} rows ({entry})")
+                return self._open(entry, meta)
+
+            prefix_intact = (
+                stat.st_size >= meta['source_bytes']
+                and meta.get('ends_with_newline', False)
+                and _sha256_prefix(source, meta['source_bytes']) == meta['source_sha']
+            )
+            if prefix_intact:
+                return self._extend(source, entry, meta, stat)
+
+        return self._build(source, entry, stat)
+
+    def _build(self, source: Path, entry: Path, stat: os.stat_result) -> Tuple[np.ndarray, np.ndarray]:
+        """Full (re)build from the source CSV (in a temp directory, swapped in at the end)"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        df = load_training_data(source, report=False)
+        X, y = self._transform(df)
+
+        build = Path(tempfile.mkdtemp(prefix=f".{entry.name}.", suffix=".tmp", dir=self.root))
+        self._append_arrays(build, X, y)
+
+        with open(source, 'rb') as f:
+            header = f.readline().decode().rstrip('\r\n')
+        meta = {
+            'feature_version': FEATURE_VERSION,
+            'columns': FEATURE_COLUMNS,
+            'n_cols': X.shape[1],
+            'n_rows': len(X),
+            'header': header,
+            **self._source_state(source, stat),
+        }
+        self._write_meta(build, meta)
+        self._swap_in(build, entry)
+        logger.info(f"💾 Feature store built: {len(X)} rows → {entry}")
+        return self._open(entry, meta)
+
+    def _swap_in(self, build: Path, entry: Path):
+        """
+        Replace `entry` by the finished `build` directory
+
+        The old entry is renamed aside first (os.replace cannot overwrite a
+        non-empty directory); readers that mapped its files keep valid data.
+        """
+        old = self.root / f".{entry.name}.{uuid.uuid4().hex}.old"
+        try:
+            os.replace(entry, old)
+        except FileNotFoundError:
+            old = None
+        try:
+            os.replace(build, entry)
+        except OSError:
+            # A concurrent build got there first; its entry is just as current
+            shutil.rmtree(build, ignore_errors=True)
+        if old is not None:
+            shutil.rmtree(old, ignore_errors=True)
+
+    def _extend(self, source: Path, entry: Path, meta: dict, stat: os.stat_result) -> Tuple[np.ndarray, np.ndarray]:
+        """Append-only update: parse and transform just the new tail of the CSV"""
+        with open(source, 'rb') as f:
+            f.seek(meta['source_bytes'])
+            tail = f.read(stat.st_size - meta['source_bytes'])
+
+        if tail.strip():
+            df = pd.read_csv(io.BytesIO(meta['header'].encode() + b"\n" + tail))
+            df = optimize_dtypes(df)
+            X, y = self._transform(df)
+            self._append_arrays(entry, X, y)
+            meta['n_rows'] += len(X)
+            logger.info(f"➕ Feature store appended {len(X)} new rows ({meta['n_rows']} total)")
+
+        meta.update(self._source_state(source, stat))
+        self._write_meta(entry, meta)
+        return self._open(entry, meta)
+
+    def append(self, source: str, rows: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Append new rows to the source CSV and to the cached matrices in one step
+        (rows must have the same columns as the CSV)
+        """
+        source = Path(source)
+        meta = self._read_meta(self._entry_dir(source))
+        columns = meta['header'].split(',') if meta else list(rows.columns)
+        rows[columns].to_csv(source, mode='a', header=not source.exists(), index=False)
+        return self.load(str(source))
+
+    @staticmethod
+    def _source_state(source: Path, stat: os.stat_result) -> dict:
+        with open(source, 'rb') as f:
+            f.seek(max(0, stat.st_size - 1))
+            last_byte = f.read(1)
+        return {
+            'source': str(source),
+            'source_bytes': stat.st_size,
+            'source_mtime': stat.st_mtime,
+            'source_sha': _sha256_prefix(source, stat.st_size),
+            'ends_with_newline': last_byte == b"\n",
+        }
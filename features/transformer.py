@@ -0,0 +1,91 @@
+"""
+Unified feature transformer for Metrodorf
+Single implementation of the research-derived features, shared by
+training, evaluation, serving and batch scoring:
+- Bologna 2025: Priority rules → cologne_effect (2.0x multiplier)
+- UvA 2025: External factors → peak_effect (1.5x multiplier)
+- Bologna 2025: Laplacian noise → distance_decay (Gaussian, sigma=50km)
+- Bologna + UvA: Non-linear interaction → cologne_peak_interaction
+
+Builds one C-contiguous float32 matrix in the trained column order.
+Every ensemble member consumes that matrix directly (no DataFrame copies,
+no recomputation inside the models).
+"""
+
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+# Trained column order (do not reorder: saved models depend on it)
+FEATURE_COLUMNS = [
+    'distance_km',             # Travel distance
+    'time_of_day',             # Hour of day (UvA external factor)
+    'day_of_week',             # Day of week (UvA external factor)
+    'is_peak_hour',            # Peak hour flag (UvA)
+    'is_cologne_bottleneck',   # Cologne passage flag (Bologna)
+    'cologne_effect',          # 2.0x multiplier (Bologna priority)
+    'peak_effect',             # 1.5x multiplier (UvA external)
+    'distance_decay',          # Laplacian noise (Bologna)
+    'cologne_peak_interaction' # Combined effect
+]
+BASE_COLUMNS = FEATURE_COLUMNS[:5]
+
+# Bump whenever a derived feature changes (invalidates cached feature matrices)
+FEATURE_VERSION = "1"
+
+COLOGNE_MULTIPLIER = 2.0
+PEAK_MULTIPLIER = 1.5
+DECAY_SIGMA_KM = 50
+
+
+class FeatureTransformer:
+    """Turns base journey columns into the model feature matrix"""
+
+    feature_columns = FEATURE_COLUMNS
+    version = FEATURE_VERSION
+
+    def transform_arrays(self, distance, time_of_day, day_of_week, is_peak, is_cologne) -> np.ndarray:
+        """
+        Build the feature matrix from base columns (scalars or equal-length arrays)
+
+        Returns:
+            (n, 9) C-contiguous float32 matrix in FEATURE_COLUMNS order
+        """
+        distance = np.atleast_1d(distance)
+        X = np.empty((len(distance), len(FEATURE_COLUMNS)), dtype=np.float32)
+
+        X[:, 0] = distance
+        X[:, 1] = time_of_day
+        X[:, 2] = day_of_week
+        X[:, 3] = is_peak
+        X[:, 4] = is_cologne
+
+        # Derived features are written in place (no temporary frames)
+        np.multiply(X[:, 4], COLOGNE_MULTIPLIER, out=X[:, 5])
+        np.multiply(X[:, 3], PEAK_MULTIPLIER, out=X[:, 6])
+        # Decay in float64 then rounded once, so tree splits match models trained on float64 frames
+        X[:, 7] = np.exp(-(np.asarray(distance, dtype=np.float64) ** 2) / (2 * DECAY_SIGMA_KM ** 2))
+        np.multiply(X[:, 5], X[:, 6], out=X[:, 8])
+        return X
+
+    def transform(self, df: pd.DataFrame) -> np.ndarray:
+        """Build the feature matrix from a frame with the five base columns"""
+        return self.transform_arrays(*(df[col].to_numpy() for col in BASE_COLUMNS))
+
+    @staticmethod
+    def to_frame(X: np.ndarray) -> pd.DataFrame:
+        """Named view of a feature matrix (for inspection / CSV export)"""
+        return pd.DataFrame(X, columns=FEATURE_COLUMNS, copy=False)
+
+
+def as_matrix(X: Union[np.ndarray, pd.DataFrame]) -> np.ndarray:
+    """
+    Accept a feature matrix or a (legacy) feature DataFrame
+    Matrices pass through untouched when already float32 and contiguous.
+    """
+    if isinstance(X, pd.DataFrame):
+        if all(col in X.columns for col in FEATURE_COLUMNS):
+            return np.ascontiguousarray(X[FEATURE_COLUMNS].to_numpy(), dtype=np.float32)
+        return FeatureTransformer().transform(X)
+    return np.ascontiguousarray(X, dtype=np.float32)
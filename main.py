@@ -2,12 +2,212 @@
 """
 Metrodorf – Delay Prediction for Polycentric Regions (Rhine-Ruhr)
 Based on Levy (2024), TU Darmstadt (2023), and Al Ghamdi (2022)
+
+Commands:
+    python main.py                                   # banner
+    python main.py score journeys.csv scored.csv     # streaming batch scoring
+    python main.py train --weight-folds 5            # train with K-fold ensemble weights
+    python main.py tune --configs 27 --eta 3         # successive-halving hyperparameter search
+    python main.py experiment --runs 20              # parallel seeded experiment runs
+    python main.py results                           # aggregate runs from the experiment store
+    python main.py backtest --train-days 14          # walk-forward backtest over real_delays
+    python main.py ingest --duration 3600            # pipelined ingestion daemon
+    python main.py replay data/archive --speed 0     # offline ingestion benchmark from archives
 """
 
-def main():
+import argparse
+import logging
+
+
+def banner():
     print("🚆 Metrodorf – Ready to build!")
     print("📚 Research: Levy + TU Darmstadt + Al Ghamdi")
     print("📍 Focus: Rhine-Ruhr polycentric region")
 
+
+def cmd_score(args):
+    """Score a large journey file with all cores"""
+    from prediction.batch_scoring import score_file
+
+    score_file(
+        args.input,
+        args.output,
+        chunksize=args.chunksize,
+        workers=args.workers,
+        version=args.version
+    )
+
+
+def cmd_train(args):
+    """Train, evaluate, register and promote the ensemble"""
+    from models.delay_predictor import DelayPredictor
+    from models.registry import ModelRegistry
+
+    predictor = DelayPredictor(use_real_data=not args.offline)
+    result = predictor.train_ensemble(weight_folds=args.weight_folds, n_jobs=args.workers)
+    # Explicit promotion: the dashboard hot-reloads whatever CURRENT points at
+    if result['version']:
+        ModelRegistry().promote(result['version'])
+
+
+def cmd_tune(args):
+    """Search member hyperparameters and write models/saved/tuned_params.json"""
+    from models.tuning import tune_members
+
+    tune_members(
+        members=args.members,
+        n_configs=args.configs,
+        eta=args.eta,
+        workers=args.workers,
+        seed=args.seed,
+        use_real_data=args.real_data
+    )
+
+
+def cmd_experiment(args):
+    """Run seeded trainings concurrently and write one results table"""
+    from models.experiment import run_experiment
+
+    run_experiment(
+        n_runs=args.runs,
+        workers=args.workers,
+        base_seed=args.seed,
+        weight_folds=args.weight_folds,
+        use_real_data=args.real_data,
+        register=not args.no_register,
+        results_dir=args.results_dir
+    )
+
+
+def cmd_results(args):
+    """Summarize runs from the experiment store"""
+    import pandas as pd
+    from models.experiment_store import ExperimentStore
+
+    store = ExperimentStore(args.store)
+    experiment_id = None if args.all else (args.experiment or store.latest_experiment())
+    if experiment_id is None and not args.all:
+        print("No experiments recorded yet")
+        return
+
+    with pd.option_context('display.width', 200, 'display.max_columns', 20, 'display.precision', 3):
+        print(f"\n📊 Model summary ({experiment_id or 'all experiments'})")
+        print(store.model_summary(experiment_id).to_string(index=False))
+        print(f"\n🏆 Best run per {args.best_by}")
+        print(store.best_runs(by=args.best_by, experiment_id=experiment_id).head(args.top).to_string(index=False))
+
+
+def cmd_backtest(args):
+    """Walk-forward backtest with per-window MAE / R²"""
+    from models.backtest import run_backtest
+
+    run_backtest(
+        csv_path=args.csv,
+        output=args.output,
+        train_days=args.train_days,
+        test_days=args.test_days,
+        step_days=args.step_days,
+        expanding=args.expanding,
+        incremental=args.incremental,
+        chain_length=args.chain_length,
+        workers=args.workers
+    )
+
+
+def cmd_ingest(args):
+    """Run the fetch → parse → fuse → write → rollup pipeline"""
+    from data.ingest import IngestDaemon
+
+    daemon = IngestDaemon(queue_size=args.queue_size, write_batch=args.write_batch)
+    daemon.run(duration=args.duration, metrics_interval=args.metrics_interval)
+
+
+def cmd_replay(args):
+    """Benchmark ingestion against recorded API responses"""
+    from data.archive import replay_benchmark
+
+    replay_benchmark(args.archive, speed=args.speed, duration=args.duration, write_batch=args.write_batch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Metrodorf delay prediction")
+    subparsers = parser.add_subparsers(dest="command")
+
+    score = subparsers.add_parser("score", help="Stream-score a CSV/Parquet file of journeys")
+    score.add_argument("input", help="Input CSV or Parquet file")
+    score.add_argument("output", help="Output CSV or Parquet file (input columns + predicted_delay)")
+    score.add_argument("--chunksize", type=int, default=100_000, help="Rows per chunk")
+    score.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    score.add_argument("--version", default=None, help="Registry model version (default: promoted)")
+    score.set_defaults(func=cmd_score)
+
+    train = subparsers.add_parser("train", help="Train and register the ensemble")
+    train.add_argument("--weight-folds", type=int, default=0,
+                       help="K-fold ensemble weight estimation (0 = single validation split)")
+    train.add_argument("--workers", type=int, default=None, help="Worker processes for the K-fold jobs")
+    train.add_argument("--offline", action="store_true", help="Use the preprocessed CSV (no API calls)")
+    train.set_defaults(func=cmd_train)
+
+    tune = subparsers.add_parser("tune", help="Successive-halving search over XGBoost / RF hyperparameters")
+    tune.add_argument("--members", nargs="+", default=["xgb", "rf"], choices=["xgb", "rf"])
+    tune.add_argument("--configs", type=int, default=27, help="Random configurations in the first rung")
+    tune.add_argument("--eta", type=int, default=3, help="Keep the best 1/eta configurations per rung")
+    tune.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    tune.add_argument("--seed", type=int, default=42, help="Seed for configurations and row subsamples")
+    tune.add_argument("--real-data", action="store_true", help="Fetch real-time samples first")
+    tune.set_defaults(func=cmd_tune)
+
+    experiment = subparsers.add_parser("experiment", help="Parallel seeded training runs with a results table")
+    experiment.add_argument("--runs", type=int, default=20, help="Number of seeded runs")
+    experiment.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    experiment.add_argument("--seed", type=int, default=42, help="Seed of the first run")
+    experiment.add_argument("--weight-folds", type=int, default=0, help="K-fold weight estimation per run")
+    experiment.add_argument("--real-data", action="store_true", help="Collect real-time samples once before the runs")
+    experiment.add_argument("--no-register", action="store_true", help="Do not publish or promote the best run")
+    experiment.add_argument("--results-dir", default=None, help="Output directory (default: experiment_results_<timestamp>)")
+    experiment.set_defaults(func=cmd_experiment)
+
+    results = subparsers.add_parser("results", help="Query the experiment store")
+    results.add_argument("--experiment", default=None, help="Experiment id (default: latest)")
+    results.add_argument("--all", action="store_true", help="Aggregate over every recorded experiment")
+    results.add_argument("--best-by", default="config_key", choices=["config_key", "experiment_id", "data_hash"])
+    results.add_argument("--top", type=int, default=10, help="Rows of the best-run table")
+    results.add_argument("--store", default="experiments/experiments.db", help="Experiment store path")
+    results.set_defaults(func=cmd_results)
+
+    backtest = subparsers.add_parser("backtest", help="Walk-forward backtest over the real_delays history")
+    backtest.add_argument("--csv", default=None, help="Timestamped history CSV instead of the database")
+    backtest.add_argument("--output", default=None, help="Per-window report CSV")
+    backtest.add_argument("--train-days", type=float, default=14, help="Training window length")
+    backtest.add_argument("--test-days", type=float, default=1, help="Test window length")
+    backtest.add_argument("--step-days", type=float, default=1, help="Shift between windows")
+    backtest.add_argument("--expanding", action="store_true", help="Keep the training start fixed")
+    backtest.add_argument("--incremental", action="store_true", help="Warm-start members along chains of windows")
+    backtest.add_argument("--chain-length", type=int, default=7, help="Windows per warm-started chain")
+    backtest.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    backtest.set_defaults(func=cmd_backtest)
+
+    ingest = subparsers.add_parser("ingest", help="Long-running ingestion daemon (bounded pipeline stages)")
+    ingest.add_argument("--duration", type=float, default=None, help="Seconds to run (default: until Ctrl+C)")
+    ingest.add_argument("--queue-size", type=int, default=8, help="Items per queue between two stages")
+    ingest.add_argument("--write-batch", type=int, default=16, help="Station polls per bulk DB insert")
+    ingest.add_argument("--metrics-interval", type=float, default=60, help="Seconds between metric logs")
+    ingest.set_defaults(func=cmd_ingest)
+
+    replay = subparsers.add_parser("replay", help="Run the ingestion pipeline against recorded API archives")
+    replay.add_argument("archive", help="Archive directory, file or glob (data/archive)")
+    replay.add_argument("--speed", type=float, default=0, help="Recorded pace multiplier (0 = as fast as possible)")
+    replay.add_argument("--duration", type=float, default=60, help="Seconds to run")
+    replay.add_argument("--write-batch", type=int, default=16, help="Station polls per bulk DB insert")
+    replay.set_defaults(func=cmd_replay)
+
+    args = parser.parse_args()
+    if args.command is None:
+        banner()
+        return
+
+    logging.basicConfig(level=logging.INFO)
+    args.func(args)
+
 if __name__ == "__main__":
     main()
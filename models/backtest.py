@@ -0,0 +1,368 @@
+"""
+Walk-forward backtesting over the real_delays history
+A random test split overstates accuracy on time-ordered delay data and hides
+drift. The backtest slides calendar windows forward by api_timestamp:
+
+    |---- train (fit) ----|-- val --|-- test --|
+                 step →   |---- train (fit) ----|-- val --|-- test --|
+
+- members are fitted on the train part; the time-ordered validation tail
+  gives the Al Ghamdi WE weights; the next test window is predicted
+- incremental mode warm-starts within a chain of consecutive windows
+  (XGBoost continues boosting, RF adds trees on the newly arrived rows,
+  the Ridge-based Gaussian model is refitted - it is cheap); newly arrived
+  rows are batched until there are MIN_INCREMENT_ROWS of them, so no trees
+  are grown on a handful of rows
+- independent windows (or chains) run in parallel worker processes on a
+  shared-memory feature matrix
+- per-window predictions are cached under a hash of config + window data,
+  so reruns only compute windows whose data changed or that are new
+
+Data source: DatabaseManager.get_training_data() (PostgreSQL real_delays);
+without a database the timestamped collector snapshots in data/raw are used.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import mean_absolute_error, r2_score
+
+from data.loader import optimize_dtypes
+from features.transformer import BASE_COLUMNS, FEATURE_VERSION, FeatureTransformer
+from .parallel import SharedArray, SharedArraySpec
+from .training_pipeline import MEMBER_NAMES, build_member, member_params, normalize_weights
+
+logger = logging.getLogger(__name__)
+
+BACKTEST_DIR = "models/saved/backtest"
+RAW_SNAPSHOT_GLOB = "data/raw/training_data_*.csv"
+MIN_TRAIN_ROWS = 50
+MIN_TEST_ROWS = 5
+MIN_INCREMENT_ROWS = MIN_TRAIN_ROWS   # smallest tail the warm start adds trees for
+
+
+# ============================================
+# DATA
+# ============================================
+def _load_raw_snapshots(pattern: str = RAW_SNAPSHOT_GLOB) -> pd.DataFrame:
+    """Collector snapshots (training_data_YYYYmmdd_HHMMSS.csv), real rows stamped by file time"""
+    frames = []
+    for path in sorted(Path().glob(pattern)):
+        try:
+            stamp = datetime.strptime(path.stem.replace("training_data_", ""), "%Y%m%d_%H%M%S")
+        except ValueError:
+            continue
+        df = pd.read_csv(path)
+        if 'source' in df.columns:
+            df = df[df['source'].astype(str).str.startswith('real')]
+        frames.append(df.assign(api_timestamp=stamp))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def load_delay_history(csv_path: Optional[str] = None) -> pd.DataFrame:
+    """
+    Time-ordered delay history with an api_timestamp column
+
+    Args:
+        csv_path: CSV with an api_timestamp (or timestamp) column instead of the database
+    """
+    df = pd.DataFrame()
+    if csv_path:
+        df = pd.read_csv(csv_path)
+        if 'api_timestamp' not in df.columns and 'timestamp' in df.columns:
+            df = df.rename(columns={'timestamp': 'api_timestamp'})
+    else:
+        try:
+            from database.db_manager import DatabaseManager
+            df = DatabaseManager().get_training_data()
+        except Exception as e:
+            logger.warning(f"⚠️ real_delays not available: {e}")
+        if df.empty:
+            logger.info("📁 Falling back to collector snapshots in data/raw")
+            df = _load_raw_snapshots()
+
+    if df.empty or 'api_timestamp' not in df.columns:
+        raise ValueError("No timestamped delay history found (need an api_timestamp column)")
+
+    missing = [column for column in BASE_COLUMNS + ['delay_minutes'] if column not in df.columns]
+    if missing:
+        raise ValueError(f"Delay history lacks required columns: {missing}")
+
+    df['api_timestamp'] = pd.to_datetime(df['api_timestamp'], errors='coerce', format='mixed')
+    for column in ['is_peak_hour', 'is_cologne_bottleneck']:
+        if df[column].dtype == bool:
+            df[column] = df[column].astype('int8')
+    df = optimize_dtypes(df.dropna(subset=['api_timestamp', 'delay_minutes']))
+    return df.sort_values('api_timestamp', kind='stable').reset_index(drop=True)
+
+
+# ============================================
+# WINDOWS
+# ============================================
+def make_windows(
+    timestamps: pd.Series,
+    train_days: float,
+    test_days: float,
+    step_days: float,
+    val_fraction: float,
+    expanding: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Calendar windows anchored at the first day of data (stable as data is appended)
+    Row positions refer to the time-sorted history.
+    """
+    ts = timestamps.to_numpy()
+    origin = timestamps.min().floor('D')
+    train, test, step = (pd.Timedelta(days=d) for d in (train_days, test_days, step_days))
+
+    windows = []
+    i = 0
+    while origin + i * step + train < timestamps.max():
+        train_start = origin if expanding else origin + i * step
+        train_end = origin + i * step + train
+        test_end = train_end + test
+        start, test_pos, end = np.searchsorted(ts, np.array([train_start, train_end, test_end], dtype=ts.dtype))
+        # Validation = the most recent val_fraction of the training rows (robust to bursty collection)
+        val_pos = test_pos - int(round((test_pos - start) * val_fraction))
+        windows.append({
+            'window': i,
+            'train_start': train_start, 'test_start': train_end, 'test_end': test_end,
+            'rows': (int(start), int(val_pos), int(test_pos), int(end)),  # fit [0:1], val [1:2], test [2:3]
+        })
+        i += 1
+    return windows
+
+
+def _window_usable(window: Dict[str, Any]) -> bool:
+    start, val, test, end = window['rows']
+    return (val - start) >= MIN_TRAIN_ROWS and (test - val) >= 1 and (end - test) >= MIN_TEST_ROWS
+
+
+# ============================================
+# WORKERS (shared-memory feature matrix)
+# ============================================
+_WORKER: Dict[str, Any] = {}
+
+
+def _init_backtest_worker(x_spec: SharedArraySpec, y_spec: SharedArraySpec, zone_matrix):
+    _WORKER['X'] = SharedArray.attach(x_spec)
+    _WORKER['y'] = SharedArray.attach(y_spec)
+    _WORKER['zone_matrix'] = zone_matrix
+
+
+def _update_member(name: str, model, X_new: np.ndarray, y_new: np.ndarray, X_all: np.ndarray,
+                   y_all: np.ndarray, incremental_trees: int):
+    """Warm-start a fitted member with newly arrived rows"""
+    if name == 'xgb':
+        params = {**member_params(name), 'n_estimators': incremental_trees}
+        return build_member(name, n_jobs=1, params=params).fit(X_new, y_new, xgb_model=model.get_booster())
+    if name == 'rf':
+        model.set_params(warm_start=True, n_estimators=model.n_estimators + incremental_trees)
+        return model.fit(X_new, y_new)
+    return build_member(name, _WORKER['zone_matrix']).fit(X_all, y_all)
+
+
+def _run_chain(chain: List[Dict[str, Any]], incremental: bool, incremental_trees: int) -> List[Dict[str, Any]]:
+    """
+    Fit / predict a chain of consecutive windows
+    Without incremental training every chain holds a single window.
+    """
+    X, y = _WORKER['X'].array, _WORKER['y'].array
+    models: Dict[str, Any] = {}
+    fitted_until = None
+    results = []
+
+    for window in chain:
+        start, val, test, end = window['rows']
+        if not _window_usable(window):
+            continue
+
+        # Smaller tails keep the current members and accumulate into the next window
+        if incremental and models and val - fitted_until >= MIN_INCREMENT_ROWS:
+            new = slice(fitted_until, val)
+            models = {name: _update_member(name, model, X[new], y[new], X[start:val], y[start:val], incremental_trees)
+                      for name, model in models.items()}
+            fitted_until = val
+        elif not models or not incremental:
+            models = {name: build_member(name, _WORKER['zone_matrix'], n_jobs=1).fit(X[start:val], y[start:val])
+                      for name in MEMBER_NAMES}
+            fitted_until = val
+
+        weights = normalize_weights({name: model.score(X[val:test], y[val:test]) for name, model in models.items()})
+        predictions = {name: np.asarray(model.predict(X[test:end]), dtype=np.float32) for name, model in models.items()}
+        predictions['ensemble'] = sum(weights[name] * predictions[name] for name in models).astype(np.float32)
+        results.append({'key': window['key'], 'window': window['window'], 'weights': weights,
+                        'y_true': y[test:end].copy(), 'predictions': predictions})
+    return results
+
+
+# ============================================
+# ENGINE
+# ============================================
+class WalkForwardBacktest:
+    """Sliding-window backtest of the three-member ensemble with a prediction cache"""
+
+    def __init__(
+        self,
+        train_days: float = 14,
+        test_days: float = 1,
+        step_days: float = 1,
+        val_fraction: float = 0.15,
+        expanding: bool = False,
+        incremental: bool = False,
+        incremental_trees: int = 20,
+        chain_length: int = 7,
+        workers: Optional[int] = None,
+        cache_dir: str = BACKTEST_DIR,
+    ):
+        self.train_days = train_days
+        self.test_days = test_days
+        self.step_days = step_days
+        self.val_fraction = val_fraction
+        self.expanding = expanding
+        self.incremental = incremental
+        self.incremental_trees = incremental_trees
+        self.chain_length = chain_length if incremental else 1
+        self.workers = workers or os.cpu_count() or 1
+        self.cache_dir = Path(cache_dir) / "cache"
+        self.transformer = FeatureTransformer()
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        return {
+            'train_days': self.train_days, 'test_days': self.test_days, 'step_days': self.step_days,
+            'val_fraction': self.val_fraction, 'expanding': self.expanding,
+            'incremental': self.incremental, 'incremental_trees': self.incremental_trees,
+            'chain_length': self.chain_length, 'feature_version': FEATURE_VERSION,
+            'params': {name: member_params(name) for name in MEMBER_NAMES},
+        }
+
+    def _window_keys(self, windows: List[Dict[str, Any]], X: np.ndarray, y: np.ndarray):
+        """Cache key = config + every row the window's result depends on"""
+        config = json.dumps(self.config, sort_keys=True, default=str).encode()
+        for window in windows:
+            chain_first = windows[(window['window'] // self.chain_length) * self.chain_length]
+            first_row = chain_first['rows'][0] if self.incremental else window['rows'][0]
+            end_row = window['rows'][3]
+            digest = hashlib.sha256(config)
+            digest.update(str(window['window']).encode())
+            digest.update(np.ascontiguousarray(X[first_row:end_row]).tobytes())
+            digest.update(np.ascontiguousarray(y[first_row:end_row]).tobytes())
+            window['key'] = digest.hexdigest()[:16]
+
+    def _load_cached(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self.cache_dir / f"{key}.npz"
+        if not path.exists():
+            return None
+        with np.load(path) as data:
+            weights = json.loads(str(data['weights']))
+            predictions = {name[5:]: data[name] for name in data.files if name.startswith('pred_')}
+            return {'key': key, 'weights': weights, 'y_true': data['y_true'], 'predictions': predictions}
+
+    def _save_cached(self, result: Dict[str, Any]):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self.cache_dir / f"{result['key']}.npz"
+        tmp = path.with_suffix(".tmp.npz")
+        np.savez(tmp, y_true=result['y_true'], weights=json.dumps(result['weights']),
+                 **{f"pred_{name}": pred for name, pred in result['predictions'].items()})
+        os.replace(tmp, path)
+
+    def run(self, history: pd.DataFrame, zone_matrix: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """
+        Backtest over a time-ordered history (see load_delay_history)
+
+        Returns:
+            One row per window: period, row counts, weights and MAE / R² per member + ensemble
+        """
+        X = self.transformer.transform(history)
+        y = history['delay_minutes'].to_numpy(dtype=np.float32)
+        windows = make_windows(history['api_timestamp'], self.train_days, self.test_days,
+                               self.step_days, self.val_fraction, self.expanding)
+        self._window_keys(windows, X, y)
+        usable = [w for w in windows if _window_usable(w)]
+
+        results = {}
+        for window in usable:
+            cached = self._load_cached(window['key'])
+            if cached is not None:
+                results[window['window']] = {**cached, 'cached': True}
+
+        # A chain is recomputed when any of its usable windows is missing from the cache
+        chains: Dict[int, List[Dict[str, Any]]] = {}
+        for window in windows:
+            chains.setdefault(window['window'] // self.chain_length, []).append(window)
+        pending = [chain for chain in chains.values()
+                   if any(_window_usable(w) and w['window'] not in results for w in chain)]
+        logger.info(f"🔁 Backtest: {len(usable)} windows ({len(windows) - len(usable)} too small), "
+                    f"{len(results)} cached, {len(pending)} chain(s) to compute")
+
+        if pending:
+            with SharedArray.from_array(X) as shared_X, SharedArray.from_array(y) as shared_y:
+                with ProcessPoolExecutor(
+                    max_workers=max(1, min(self.workers, len(pending))),
+                    initializer=_init_backtest_worker,
+                    initargs=(shared_X.spec, shared_y.spec, zone_matrix),
+                ) as pool:
+                    futures = [pool.submit(_run_chain, chain, self.incremental, self.incremental_trees)
+                               for chain in pending]
+                    for future in futures:
+                        for result in future.result():
+                            self._save_cached(result)
+                            results.setdefault(result['window'], {**result, 'cached': False})
+
+        return self._report(usable, results)
+
+    @staticmethod
+    def _report(windows: List[Dict[str, Any]], results: Dict[int, Dict[str, Any]]) -> pd.DataFrame:
+        rows = []
+        for window in windows:
+            result = results[window['window']]
+            start, val, test, end = window['rows']
+            row = {
+                'window': window['window'],
+                'train_start': window['train_start'], 'test_start': window['test_start'],
+                'test_end': window['test_end'],
+                'n_train': val - start, 'n_val': test - val, 'n_test': end - test,
+                'cached': result['cached'],
+            }
+            for name, pred in result['predictions'].items():
+                row[f"{name}_mae"] = float(mean_absolute_error(result['y_true'], pred))
+                row[f"{name}_r2"] = float(r2_score(result['y_true'], pred))
+            for name, weight in result['weights'].items():
+                row[f"{name}_weight"] = float(weight)
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+
+def run_backtest(csv_path: Optional[str] = None, output: Optional[str] = None, **kwargs) -> pd.DataFrame:
+    """Load the history, run the walk-forward backtest and write the per-window report"""
+    history = load_delay_history(csv_path)
+    zone_matrix = pd.read_csv("data/processed/zone_interaction_matrix.csv", index_col=0)
+    backtest = WalkForwardBacktest(**kwargs)
+    report = backtest.run(history, zone_matrix)
+
+    output = Path(output or Path(BACKTEST_DIR) / "report.csv")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    report.to_csv(output, index=False)
+
+    print("\n" + "=" * 60)
+    print("📈 WALK-FORWARD BACKTEST")
+    print("=" * 60)
+    print(f"History: {len(history)} rows, {history['api_timestamp'].min()} → {history['api_timestamp'].max()}")
+    print(f"Windows: {len(report)} ({int(report['cached'].sum()) if len(report) else 0} from cache)")
+    if len(report):
+        for name in MEMBER_NAMES + ['ensemble']:
+            print(f"{name:10} MAE={report[f'{name}_mae'].mean():.2f} min "
+                  f"(worst window {report[f'{name}_mae'].max():.2f}), "
+                  f"R²={report[f'{name}_r2'].mean():.3f}")
+    print(f"📁 Per-window report: {output}")
+    print("=" * 60)
+    return report
@@ -12,6 +12,11 @@ import pandas as pd
 import numpy as np
 import logging
 from pathlib import Path
+from features.transformer import FeatureTransformer
+from features.store import FeatureStore
+from data.loader import load_training_data, optimize_dtypes
+
+TRAINING_DATA_PATH = "data/processed/training_data.csv"
 
 logger = logging.getLogger(__name__)
 
@@ -22,47 +27,72 @@ class BasePredictor:
         """
         Initialize predictor with optional real-time data
         
+        Training data is loaded lazily on first access of `training_data`,
+        so predictors that only serve saved models never read the CSV or
+        call the real-time APIs.
+        
         Args:
             use_real_data: If True, tries to fetch real data from API
             real_ratio: Percentage of real data in training set (0.0 to 1.0)
         """
+        self.use_real_data = use_real_data
+        self.real_ratio = real_ratio
+        self._training_data = None
+        
+        # The collector also writes what it returns to TRAINING_DATA_PATH,
+        # so in both cases the cached feature matrix for that file is valid
+        self.training_data_path = TRAINING_DATA_PATH
         
+        # === LOAD ZONE MATRIX AND FEATURES (always from files) ===
+        self.zone_matrix = pd.read_csv("data/processed/zone_interaction_matrix.csv", index_col=0)
+        self.zone_features = pd.read_csv("data/processed/zone_features.csv")
+        
+        # === INITIALIZE MODEL STORAGE ===
+        self.models = {}      # Will store trained models: xgb, rf, gaussian
+        self.weights = {}     # Will store R²-based weights for ensemble
+        
+        logger.info(f"✅ Loaded {len(self.zone_matrix)} zones")
+        logger.info(f"✅ Loaded {len(self.zone_features)} station features")
+    
+    @property
+    def training_data(self) -> pd.DataFrame:
+        """Typed training frame, loaded once on first access"""
+        if self._training_data is None:
+            self._training_data = self._load_training_data()
+        return self._training_data
+    
+    @training_data.setter
+    def training_data(self, value: pd.DataFrame):
+        self._training_data = value
+    
+    def _load_training_data(self) -> pd.DataFrame:
+        """Fetch real-time samples (with fallback) or read the preprocessed CSV"""
         # === OPTION 1: LOAD REAL-TIME DATA (with fallback) ===
-        if use_real_data:
+        if self.use_real_data:
             try:
                 from data.real_time_collector import RealTimeCollector
                 collector = RealTimeCollector()
                 
                 logger.info("📡 Attempting to fetch real-time data from v6.db.transport.rest...")
-                self.training_data = collector.collect_training_data(
+                training_data = optimize_dtypes(collector.collect_training_data(
                     n_samples=1000,
-                    real_ratio=real_ratio
-                )
-                logger.info(f"✅ Loaded {len(self.training_data)} samples "
-                          f"({(self.training_data['source']=='real').sum()} real, "
-                          f"{(self.training_data['source']=='synthetic').sum()} synthetic)")
+                    real_ratio=self.real_ratio
+                ))
+                logger.info(f"✅ Loaded {len(training_data)} samples "
+                          f"({(training_data['source']=='real').sum()} real, "
+                          f"{(training_data['source']=='synthetic').sum()} synthetic)")
+                return training_data
             except Exception as e:
                 logger.warning(f"⚠️ Real-time data failed: {e}")
                 logger.info("📁 Falling back to preprocessed training_data.csv")
-                self.training_data = pd.read_csv("data/processed/training_data.csv")
+                return load_training_data(TRAINING_DATA_PATH)
         
         # === OPTION 2: LOAD PREPROCESSED DATA (original) ===
-        else:
-            self.training_data = pd.read_csv("data/processed/training_data.csv")
-            logger.info(f"✅ Loaded {len(self.training_data)} preprocessed training samples")
-        
-        # === LOAD ZONE MATRIX AND FEATURES (always from files) ===
-        self.zone_matrix = pd.read_csv("data/processed/zone_interaction_matrix.csv", index_col=0)
-        self.zone_features = pd.read_csv("data/processed/zone_features.csv")
-        
-        # === INITIALIZE MODEL STORAGE ===
-        self.models = {}      # Will store trained models: xgb, rf, gaussian
-        self.weights = {}     # Will store R²-based weights for ensemble
-        
-        logger.info(f"✅ Loaded {len(self.zone_matrix)} zones")
-        logger.info(f"✅ Loaded {len(self.zone_features)} station features")
+        training_data = load_training_data(TRAINING_DATA_PATH)
+        logger.info(f"✅ Loaded {len(training_data)} preprocessed training samples")
+        return training_data
     
-    def prepare_features(self):
+    def prepare_features(self, use_store=True):
         """
         Create feature matrix for model training
         Features based on research findings:
@@ -70,41 +100,29 @@ class BasePredictor:
         - Bologna 2025: Priority rules explain Cologne bottleneck (2.0x multiplier)
         - UvA 2025: External factors (peak hour) essential for beating 0.65 baseline
         - Al Ghamdi 2022: Features engineered for ensemble learning
-        """
-        df = self.training_data.copy()
-        
-        # Bologna 2025: Priority rules - Cologne bottleneck effect
-        # Trains passing through Cologne suffer 2x delay impact
-        df['cologne_effect'] = df['is_cologne_bottleneck'] * 2.0
         
-        # UvA 2025: External factors - peak hour impact
-        # Time-of-day crucial for beating baseline (0.65 BA)
-        df['peak_effect'] = df['is_peak_hour'] * 1.5
+        Derived features come from the shared FeatureTransformer (features/transformer.py)
+        and are written straight into one float32 matrix, so no copy of
+        training_data is made.
         
-        # Bologna 2025: Laplacian noise - distance-based decay
-        # Station-to-station fluctuations modeled as Gaussian decay
-        # Sigma=50km matches Rhine-Ruhr regional scale
-        df['distance_decay'] = np.exp(-(df['distance_km']**2) / (2 * 50**2))
-        
-        # Bologna + UvA: Non-linear interaction effects
-        # When both Cologne AND peak hour occur, impact > sum of parts
-        df['cologne_peak_interaction'] = df['cologne_effect'] * df['peak_effect']
+        Args:
+            use_store: Reuse the cached matrix from the feature store when
+                training_data is still the on-disk CSV (skips feature engineering)
+        """
+        transformer = FeatureTransformer()
+        if self.use_real_data:
+            self.training_data  # collect fresh samples first (rewrites the CSV)
         
-        # Feature set for model training
-        feature_columns = [
-            'distance_km',           # Travel distance
-            'time_of_day',           # Hour of day (UvA external factor)
-            'day_of_week',           # Day of week (UvA external factor)
-            'is_peak_hour',          # Peak hour flag (UvA)
-            'is_cologne_bottleneck', # Cologne passage flag (Bologna)
-            'cologne_effect',        # 2.0x multiplier (Bologna priority)
-            'peak_effect',           # 1.5x multiplier (UvA external)
-            'distance_decay',        # Laplacian noise (Bologna)
-            'cologne_peak_interaction' # Combined effect
-        ]
+        if use_store and getattr(self, 'training_data_path', None):
+            X, y = FeatureStore().load(self.training_data_path)
+        else:
+            X = transformer.transform(self.training_data)
+            y = self.training_data['delay_minutes'].to_numpy(dtype=np.float32)
         
-        logger.info(f"✅ Created {len(feature_columns)} features")
+        self.feature_columns = list(transformer.feature_columns)
+        self.n_training_rows = len(y)
+        logger.info(f"✅ Created {len(self.feature_columns)} features")
         logger.info(f"   Features based on: Bologna 2025 (priority + Laplacian), UvA 2025 (external factors), Al Ghamdi 2022 (ensemble)")
         
         # Return features (X) and target (y)
-        return df[feature_columns], df['delay_minutes']
\ No newline at end of file
+        return X, y
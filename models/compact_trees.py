@@ -0,0 +1,332 @@
+"""
+Compact array-backed tree ensembles for fast model loading
+Flattens the Random Forest and XGBoost members (Al Ghamdi 2022 ensemble)
+into a handful of contiguous NumPy arrays:
+- feature, threshold, left/right children, missing direction, node value
+  (leaf value, or the mean of the leaves below an internal node)
+- saved uncompressed as .npy so they can be memory-mapped on load
+- every Streamlit process shares the same pages through the OS page cache
+
+Inference walks all trees of the ensemble level by level in vectorized form,
+so no Python node objects are ever created.
+"""
+
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from features.transformer import as_matrix
+
+logger = logging.getLogger(__name__)
+
+COMPACT_DIR = "models/saved/compact"
+ARRAY_NAMES = ['feature', 'threshold', 'left', 'right', 'missing_left', 'value', 'roots']
+ROW_BLOCK = 8192  # rows walked at once (bounds the node-index matrix)
+
+
+class CompactTreeEnsemble:
+    """
+    Array-backed tree ensemble with the same predict() API as the sklearn/XGBoost members
+
+    sklearn trees route x <= threshold to the left child and average the trees,
+    XGBoost routes x < threshold to the left child and sums the leaves on top of base_score.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray], meta: Dict[str, Any]):
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.left = arrays['left']
+        self.right = arrays['right']
+        self.missing_left = arrays['missing_left']
+        self.value = arrays['value']
+        self.roots = arrays['roots']
+        self.meta = meta
+        self.kind = meta['kind']
+        self.max_depth = int(meta['max_depth'])
+        self.base_score = float(meta.get('base_score', 0.0))
+        self.feature_names = meta.get('feature_names')
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.feature)
+
+    def _as_matrix(self, X: Union[np.ndarray, pd.DataFrame]) -> np.ndarray:
+        """Convert input to a float32 matrix in the trained column order"""
+        if isinstance(X, pd.DataFrame) and self.feature_names:
+            # Trained on named columns: use them as they are (any names, no feature engineering)
+            return np.ascontiguousarray(X[self.feature_names].to_numpy(), dtype=np.float32)
+        return as_matrix(X)
+
+    def apply(self, X: Union[np.ndarray, pd.DataFrame]) -> np.ndarray:
+        """
+        Return the leaf index reached in every tree
+
+        Returns:
+            (n_samples, n_trees) array of global node indices
+        """
+        X = self._as_matrix(X)
+        leaves = np.empty((len(X), self.n_trees), dtype=np.int32)
+        for start in range(0, len(X), ROW_BLOCK):
+            block = X[start:start + ROW_BLOCK]
+            leaves[start:start + len(block)] = self._walk(block)
+        return leaves
+
+    def _walk(self, X: np.ndarray) -> np.ndarray:
+        """Descend all trees for a block of rows, one depth level per iteration"""
+        rows = np.arange(len(X))[:, None]
+        node = np.repeat(self.roots[None, :], len(X), axis=0)
+
+        for _ in range(self.max_depth):
+            feat = self.feature[node]
+            internal = feat >= 0
+            if not internal.any():
+                break
+
+            x = X[rows, np.where(internal, feat, 0)]
+            thr = self.threshold[node]
+            go_left = (x <= thr) if self.kind == 'sklearn' else (x < thr)
+            go_left = np.where(np.isnan(x), self.missing_left[node].astype(bool), go_left)
+
+            child = np.where(go_left, self.left[node], self.right[node])
+            node = np.where(internal, child, node)
+
+        return node
+
+    def predict(self, X: Union[np.ndarray, pd.DataFrame]) -> np.ndarray:
+        """Vectorized ensemble prediction (same output as the original model)"""
+        leaf_values = self.value[self.apply(X)]
+        if self.kind == 'sklearn':
+            return leaf_values.mean(axis=1)
+        return self.base_score + leaf_values.sum(axis=1)
+
+    def save(self, directory: Union[str, Path]):
+        """Write arrays as uncompressed .npy files plus a small meta.json"""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for name in ARRAY_NAMES:
+            np.save(directory / f"{name}.npy", np.ascontiguousarray(getattr(self, name)))
+        with open(directory / "meta.json", 'w') as f:
+            json.dump(self.meta, f, indent=2)
+
+    @classmethod
+    def load(cls, directory: Union[str, Path], mmap: bool = True) -> 'CompactTreeEnsemble':
+        """Memory-map a previously exported ensemble (no deserialization of node objects)"""
+        directory = Path(directory)
+        with open(directory / "meta.json") as f:
+            meta = json.load(f)
+        mode = 'r' if mmap else None
+        arrays = {name: np.load(directory / f"{name}.npy", mmap_mode=mode) for name in ARRAY_NAMES}
+        return cls(arrays, meta)
+
+
+def _flatten_sklearn_forest(model) -> CompactTreeEnsemble:
+    """Concatenate every sklearn tree_ into global node arrays"""
+    features, thresholds, lefts, rights, missing, values, roots = [], [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        is_leaf = tree.children_left < 0
+
+        features.append(np.where(is_leaf, -1, tree.feature).astype(np.int32))
+        thresholds.append(tree.threshold.astype(np.float64))
+        lefts.append(np.where(is_leaf, -1, tree.children_left + offset).astype(np.int32))
+        rights.append(np.where(is_leaf, -1, tree.children_right + offset).astype(np.int32))
+        # Older sklearn versions have no missing-value support: NaN goes right
+        missing_go_left = getattr(tree, 'missing_go_to_left', np.zeros(tree.node_count))
+        missing.append(np.asarray(missing_go_left, dtype=np.uint8))
+        values.append(tree.value[:, 0, 0].astype(np.float64))
+        roots.append(offset)
+
+        offset += tree.node_count
+        max_depth = max(max_depth, tree.max_depth)
+
+    feature_names = getattr(model, 'feature_names_in_', None)
+    meta = {
+        'kind': 'sklearn',
+        'source': type(model).__name__,
+        'max_depth': int(max_depth),
+        'base_score': 0.0,
+        'feature_names': [str(f) for f in feature_names] if feature_names is not None else None,
+        'node_means': True,
+    }
+    arrays = {
+        'feature': np.concatenate(features),
+        'threshold': np.concatenate(thresholds),
+        'left': np.concatenate(lefts),
+        'right': np.concatenate(rights),
+        'missing_left': np.concatenate(missing),
+        'value': np.concatenate(values),
+        'roots': np.asarray(roots, dtype=np.int32),
+    }
+    return CompactTreeEnsemble(arrays, meta)
+
+
+def _node_depths(left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """
+    Depth of every node of a single tree given its local child arrays
+
+    Walks down from the root one level at a time, so it does not rely on
+    the order nodes are stored in. Unreachable nodes keep depth -1.
+    """
+    depth = np.full(len(left), -1, dtype=np.int32)
+    level = np.array([0])
+    d = 0
+    while level.size:
+        depth[level] = d
+        children = np.concatenate([left[level], right[level]])
+        level = children[children >= 0]
+        d += 1
+    return depth
+
+
+def _tree_depth(left: np.ndarray, right: np.ndarray) -> int:
+    """Depth of a single tree given its local child arrays"""
+    return int(_node_depths(left, right).max())
+
+
+def _node_means(left: np.ndarray, right: np.ndarray, value: np.ndarray, cover: np.ndarray) -> np.ndarray:
+    """
+    Cover-weighted mean of the leaf values below every node (leaves keep their value)
+
+    The path attributions in models/explanations.py credit each split with
+    the change from a node's mean to its child's, like sklearn's node values.
+    """
+    means = value.astype(np.float64)
+    depth = _node_depths(left, right)
+    for d in range(int(depth.max()) - 1, -1, -1):
+        nodes = np.flatnonzero((depth == d) & (left >= 0))
+        lc, rc = cover[left[nodes]], cover[right[nodes]]
+        total = np.where(lc + rc > 0, lc + rc, 1.0)
+        means[nodes] = (means[left[nodes]] * lc + means[right[nodes]] * rc) / total
+    return means
+
+
+def _flatten_xgboost(model) -> CompactTreeEnsemble:
+    """Read the booster's JSON dump (exact float32 split conditions) into global node arrays"""
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    dump = json.loads(booster.save_raw('json'))
+    learner = dump['learner']
+
+    objective = learner.get('objective', {}).get('name', 'reg:squarederror')
+    if not objective.startswith('reg:squared'):
+        raise ValueError(f"Compact export only supports identity-link objectives, got {objective}")
+
+    base_score = float(str(learner['learner_model_param']['base_score']).strip('[]'))
+
+    features, thresholds, lefts, rights, missing, values, roots = [], [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+
+    for tree in learner['gradient_booster']['model']['trees']:
+        left = np.asarray(tree['left_children'], dtype=np.int32)
+        right = np.asarray(tree['right_children'], dtype=np.int32)
+        is_leaf = left < 0
+        conditions = np.asarray(tree['split_conditions'], dtype=np.float32)
+
+        features.append(np.where(is_leaf, -1, tree['split_indices']).astype(np.int32))
+        thresholds.append(conditions.astype(np.float64))
+        lefts.append(np.where(is_leaf, -1, left + offset).astype(np.int32))
+        rights.append(np.where(is_leaf, -1, right + offset).astype(np.int32))
+        missing.append(np.asarray(tree['default_left'], dtype=np.uint8))
+        # Leaf values live in split_conditions; internal nodes get the mean of their leaves
+        cover = np.asarray(tree['sum_hessian'], dtype=np.float64)
+        values.append(_node_means(left, right, np.where(is_leaf, conditions, 0.0), cover))
+        roots.append(offset)
+
+        offset += len(left)
+        max_depth = max(max_depth, _tree_depth(left, right))
+
+    meta = {
+        'kind': 'xgboost',
+        'source': type(model).__name__,
+        'max_depth': int(max_depth),
+        'base_score': base_score,
+        'feature_names': booster.feature_names,
+        'node_means': True,
+    }
+    arrays = {
+        'feature': np.concatenate(features),
+        'threshold': np.concatenate(thresholds),
+        'left': np.concatenate(lefts),
+        'right': np.concatenate(rights),
+        'missing_left': np.concatenate(missing),
+        'value': np.concatenate(values),
+        'roots': np.asarray(roots, dtype=np.int32),
+    }
+    return CompactTreeEnsemble(arrays, meta)
+
+
+def flatten_model(model) -> CompactTreeEnsemble:
+    """Flatten a fitted RandomForestRegressor or XGBRegressor"""
+    if hasattr(model, 'estimators_'):
+        return _flatten_sklearn_forest(model)
+    if hasattr(model, 'get_booster') or type(model).__name__ == 'Booster':
+        return _flatten_xgboost(model)
+    raise TypeError(f"Cannot flatten model of type {type(model).__name__}")
+
+
+def export_compact_models(models: Dict[str, Any], directory: Union[str, Path] = COMPACT_DIR) -> List[str]:
+    """
+    Export every tree-based ensemble member to <directory>/<name>/
+    Non-tree members (Gaussian) are skipped.
+
+    Returns:
+        names of the exported members
+    """
+    exported = []
+    for name, model in models.items():
+        try:
+            compact = flatten_model(model)
+        except (TypeError, ValueError) as e:
+            logger.debug(f"Skipping compact export for {name}: {e}")
+            continue
+        compact.save(Path(directory) / name)
+        exported.append(name)
+        logger.info(f"✅ Exported {name}: {compact.n_trees} trees, {compact.n_nodes} nodes")
+    return exported
+
+
+def load_compact_model(name: str, directory: Union[str, Path] = COMPACT_DIR) -> Optional[CompactTreeEnsemble]:
+    """Memory-map a compact member, or return None if it was never (completely) exported"""
+    path = Path(directory) / name
+    if not (path / "meta.json").exists():
+        return None
+    missing = [array for array in ARRAY_NAMES if not (path / f"{array}.npy").exists()]
+    if missing:
+        logger.warning(f"⚠️ Incomplete compact export for {name} (missing {missing}), ignoring it")
+        return None
+    return CompactTreeEnsemble.load(path)
+
+
+# ============================================
+# EXPORT EXISTING PICKLES
+# ============================================
+if __name__ == "__main__":
+    import time
+    import joblib
+
+    print("\n" + "="*60)
+    print("🌲 COMPACT TREE EXPORT")
+    print("="*60 + "\n")
+
+    models = {}
+    for name in ['xgb', 'rf']:
+        model_path = Path(f"models/saved/{name}_model.pkl")
+        if model_path.exists():
+            models[name] = joblib.load(model_path)
+
+    for name in export_compact_models(models):
+        start = time.time()
+        compact = load_compact_model(name)
+        print(f"{name:10} loaded in {(time.time() - start) * 1000:.1f} ms "
+              f"({compact.n_trees} trees, {compact.n_nodes} nodes)")
@@ -0,0 +1,160 @@
+"""
+Split-conformal prediction intervals for the delay ensemble
+Replaces the std-across-three-members × z-score interval (and the app's
+hardcoded MAE band):
+- absolute residuals on the held-out validation split (never used for fitting)
+- finite-sample conformal quantile ceil((n+1)·level)/n per confidence level
+- optionally stratified by peak hour / Cologne passage / hour band, with a
+  pooled fallback for strata that have too few calibration rows
+- computed once at training time and stored next to the model (conformal.json)
+
+Serving an interval is one table lookup on top of the point prediction:
+    half_width = table[model][stratum, level]  →  [pred - hw, pred + hw]
+"""
+
+import json
+import logging
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Union
+
+import numpy as np
+
+from features.transformer import FEATURE_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+CONFORMAL_FILE = "conformal.json"
+LEVELS = (0.5, 0.68, 0.8, 0.9, 0.95, 0.99)
+STRATIFY = ('peak', 'cologne')
+MIN_STRATUM_ROWS = 30
+
+# Hour bands for the optional 'hour' stratum: night, morning peak, midday, evening peak, late
+HOUR_BANDS = np.array([0] * 6 + [1] * 4 + [2] * 6 + [3] * 4 + [4] * 4, dtype=np.int64)
+STRATUM_SIZES = {'peak': 2, 'cologne': 2, 'hour': len(set(HOUR_BANDS.tolist()))}
+
+_COLUMN = {name: FEATURE_COLUMNS.index(name) for name in ('time_of_day', 'is_peak_hour', 'is_cologne_bottleneck')}
+
+
+def stratum_index(stratify: Sequence[str], is_peak, is_cologne, time_of_day) -> np.ndarray:
+    """Mixed-radix stratum id per row (0 when not stratified)"""
+    values = {
+        'peak': lambda: np.asarray(is_peak, dtype=np.int64) != 0,
+        'cologne': lambda: np.asarray(is_cologne, dtype=np.int64) != 0,
+        'hour': lambda: HOUR_BANDS[np.clip(np.asarray(time_of_day, dtype=np.int64), 0, 23)],
+    }
+    index = np.zeros(np.broadcast(np.asarray(is_peak), np.asarray(is_cologne), np.asarray(time_of_day)).shape,
+                     dtype=np.int64)
+    for name in stratify:
+        index = index * STRATUM_SIZES[name] + values[name]()
+    return index
+
+
+def conformal_quantile(residuals: np.ndarray, level: float) -> float:
+    """Split-conformal quantile of absolute residuals (finite-sample valid)"""
+    n = len(residuals)
+    rank = int(np.ceil((n + 1) * level))
+    if rank > n:
+        return float('inf') if n == 0 else float(np.max(residuals))
+    return float(np.partition(residuals, rank - 1)[rank - 1])
+
+
+class ConformalIntervals:
+    """Per-model lookup tables of residual quantiles: tables[model][stratum, level]"""
+
+    def __init__(self, tables: Dict[str, np.ndarray], levels: Sequence[float] = LEVELS,
+                 stratify: Sequence[str] = STRATIFY, counts: Optional[Dict[str, list]] = None):
+        self.tables = {name: np.asarray(table, dtype=np.float64) for name, table in tables.items()}
+        self.levels = np.asarray(levels, dtype=np.float64)
+        self.stratify = tuple(stratify)
+        self.counts = counts or {}
+
+    @classmethod
+    def fit(
+        cls,
+        X: np.ndarray,
+        y: np.ndarray,
+        predictions: Dict[str, np.ndarray],
+        levels: Sequence[float] = LEVELS,
+        stratify: Sequence[str] = STRATIFY,
+        min_count: int = MIN_STRATUM_ROWS,
+    ) -> 'ConformalIntervals':
+        """
+        Calibrate on held-out rows
+
+        Args:
+            X: Calibration feature matrix (FEATURE_COLUMNS order)
+            y: Calibration targets
+            predictions: model name (member or 'ensemble') → predictions on X
+            stratify: Any of 'peak', 'cologne', 'hour'
+            min_count: Strata with fewer rows use the pooled quantile
+        """
+        X = np.asarray(X)
+        y = np.asarray(y, dtype=np.float64)
+        strata = stratum_index(stratify, X[:, _COLUMN['is_peak_hour']], X[:, _COLUMN['is_cologne_bottleneck']],
+                               X[:, _COLUMN['time_of_day']])
+        n_strata = int(np.prod([STRATUM_SIZES[name] for name in stratify])) if stratify else 1
+        counts = np.bincount(strata, minlength=n_strata)
+
+        tables = {}
+        for name, pred in predictions.items():
+            residuals = np.abs(y - np.asarray(pred, dtype=np.float64).ravel())
+            pooled = [conformal_quantile(residuals, level) for level in levels]
+            table = np.tile(pooled, (n_strata, 1))
+            for stratum in np.flatnonzero(counts >= min_count):
+                stratum_residuals = residuals[strata == stratum]
+                table[stratum] = [conformal_quantile(stratum_residuals, level) for level in levels]
+            tables[name] = table
+
+        pooled_strata = int((counts < min_count).sum())
+        logger.info(f"📏 Conformal calibration: {len(y)} rows, {n_strata} strata "
+                    f"({pooled_strata} using the pooled quantile)")
+        return cls(tables, levels, stratify, {'rows': counts.tolist()})
+
+    def _level_index(self, level: float) -> int:
+        """Smallest calibrated level ≥ the requested one (conservative)"""
+        index = int(np.searchsorted(self.levels, level - 1e-9))
+        if index >= len(self.levels):
+            # A narrower table would undercover: no silent fallback
+            raise ValueError(f"Confidence level {level} above the highest calibrated level {self.levels[-1]}")
+        return index
+
+    def half_width(self, level: float, is_peak, is_cologne, time_of_day, model: str = 'ensemble') -> np.ndarray:
+        """Interval half-width per journey from base columns (O(1) lookup per row)"""
+        table = self.tables.get(model, self.tables.get('ensemble'))
+        strata = stratum_index(self.stratify, is_peak, is_cologne, time_of_day)
+        return table[strata, self._level_index(level)]
+
+    def half_width_for(self, X: np.ndarray, level: float, model: str = 'ensemble') -> np.ndarray:
+        """Interval half-width per row of a feature matrix"""
+        X = np.atleast_2d(X)
+        return self.half_width(level, X[:, _COLUMN['is_peak_hour']], X[:, _COLUMN['is_cologne_bottleneck']],
+                               X[:, _COLUMN['time_of_day']], model)
+
+    def to_dict(self) -> dict:
+        return {
+            'levels': self.levels.tolist(),
+            'stratify': list(self.stratify),
+            'tables': {name: table.tolist() for name, table in self.tables.items()},
+            'counts': self.counts,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'ConformalIntervals':
+        return cls(data['tables'], data['levels'], data['stratify'], data.get('counts'))
+
+    def save(self, directory: Union[str, Path]):
+        path = Path(directory) / CONFORMAL_FILE
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_dict(), indent=2))
+
+    @classmethod
+    def load(cls, directory: Union[str, Path]) -> Optional['ConformalIntervals']:
+        """Calibration stored with a model directory, or None for older models"""
+        path = Path(directory) / CONFORMAL_FILE
+        if not path.exists():
+            return None
+        try:
+            return cls.from_dict(json.loads(path.read_text()))
+        except (json.JSONDecodeError, KeyError) as e:
+            logger.warning(f"⚠️ Ignoring unreadable {path}: {e}")
+            return None
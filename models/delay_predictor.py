@@ -28,6 +28,7 @@ Results:
 """
 
 import logging
+import time
 from pathlib import Path
 import pandas as pd
 import joblib
@@ -36,6 +37,11 @@ from .base_predictor import BasePredictor
 from .ensemble_methods import EnsembleMethods
 from .training_pipeline import TrainingPipeline
 from .evaluation import ModelEvaluation
+from .compact_trees import export_compact_models, load_compact_model
+from .registry import ModelRegistry
+from .conformal import CONFORMAL_FILE, ConformalIntervals
+from features.transformer import FEATURE_COLUMNS
+from data.loader import optimize_dtypes
 
 logger = logging.getLogger(__name__)
 
@@ -45,31 +51,61 @@ class DelayPredictor(BasePredictor, EnsembleMethods, TrainingPipeline, ModelEval
     Combines research from Al Ghamdi (ensemble), Bologna (heavy tails), UvA (baseline)
     """
     
-    def __init__(self, load_data=True): # Add parameter
-        super().__init__()
+    def __init__(self, load_data=True, use_real_data=True): # Add parameter
+        """
+        Args:
+            load_data: False for serving-only predictors (never fetch real-time data)
+            use_real_data: Fetch fresh real-time samples when training data is first needed
+        """
+        super().__init__(use_real_data=use_real_data and load_data)
         self.weights: Dict[str, float] = {}
-        if load_data:
-           # Only if you want to retrain
-           self.training_data = pd.read_csv("data/processed/training_data.csv")
 
-    def train_ensemble(self):
-        """Train ensemble and evaluate against research"""
-        X_test, y_test = super().train_ensemble()
+    def train_ensemble(self, weight_folds=0, n_jobs=None, seed=42, save=True, report=True, member_threads=None,
+                       n_bootstrap=None):
+        """
+        Train ensemble and evaluate against research
+        
+        Args:
+            weight_folds: K for parallel K-fold weight estimation (0 = single validation split)
+            n_jobs: Worker processes for the K-fold jobs
+            seed: Seed for the split and the tree members
+            save: Write models/saved and register the new version (promotion is a separate step)
+            report: Print the comparison table and research connections
+            member_threads: Threads per tree member (see TrainingPipeline)
+            n_bootstrap: Bootstrap resamples for the metric CIs (default: only when save or report)
+        
+        Returns:
+            Structured run result (weights, per-model metrics, timings, version)
+        """
+        start = time.perf_counter()
+        X_test, y_test = super().train_ensemble(
+            weight_folds=weight_folds, n_jobs=n_jobs, seed=seed, member_threads=member_threads
+        )
+        train_seconds = time.perf_counter() - start
         
         # Step C: Evaluate models
-        self.evaluate_models(X_test, y_test)
+        self.evaluate_models(X_test, y_test, verbose=report, save=save, n_bootstrap=n_bootstrap)
         
         # Step D: Connect to research
-        self.connect_to_research()
+        if report:
+            self.connect_to_research()
         
         # Save models
-        self.save_models()
+        version = self.save_models() if save else None
         
         return {
             'xgb_score': self.weights.get('xgb', 0),
             'rf_score': self.weights.get('rf', 0),
             'gaussian_score': self.weights.get('gaussian', 0),
-            'ensemble_weights': self.weights
+            'ensemble_weights': self.weights,
+            'metrics': self.metrics,
+            'seed': seed,
+            'weight_folds': weight_folds,
+            'training_rows': self.n_training_rows,
+            'test_rows': len(y_test),
+            'train_seconds': train_seconds,
+            'total_seconds': time.perf_counter() - start,
+            'version': version,
         }
     
     def update_with_realtime(self, new_samples=100):
@@ -88,13 +124,24 @@ class DelayPredictor(BasePredictor, EnsembleMethods, TrainingPipeline, ModelEval
             self.training_data, 
             fresh_data
         ]).drop_duplicates().reset_index(drop=True)
+        self.training_data = optimize_dtypes(self.training_data)
+        self.training_data_path = None  # in-memory data no longer matches the cached CSV features
         
         # Retrain ensemble
         self.train_ensemble()
         logger.info(f"✅ Model updated with {len(fresh_data)} new real samples")
     
-    def save_models(self):
-        """Save trained models for later use"""
+    def save_models(self, promote=False):
+        """
+        Save trained models for later use
+        
+        Args:
+            promote: Point the registry's CURRENT at the new version (callers
+                that evaluated the run promote explicitly, see main.py train)
+        
+        Returns:
+            Registered model version id
+        """
         print("\n💾 SAVING MODELS...")
         Path("models/saved").mkdir(parents=True, exist_ok=True)
         
@@ -103,21 +150,69 @@ class DelayPredictor(BasePredictor, EnsembleMethods, TrainingPipeline, ModelEval
         
         pd.Series(self.weights).to_csv("models/saved/model_weights.csv")
         print(f"✅ Saved weights: {self.weights}")
+        
+        # Flattened tree arrays for millisecond, memory-mapped loading
+        export_compact_models(self.models)
+        
+        # Conformal residual quantiles (served intervals are a table lookup)
+        if getattr(self, 'conformal', None) is not None:
+            self.conformal.save("models/saved")
+        
+        # Immutable, content-hashed copy in the model registry
+        return self.register_version(promote=promote)
     
-    def load_models(self):
-        """Load previously trained models"""
+    def register_version(self, promote=False):
+        """
+        Publish the trained ensemble to the model registry (no writes to models/saved)
+        
+        Args:
+            promote: Point the registry's CURRENT at the new version
+        
+        Returns:
+            Registered model version id
+        """
+        registry = ModelRegistry()
+        conformal = getattr(self, 'conformal', None)
+        version = registry.publish(self.models, self.weights, artifacts={
+            CONFORMAL_FILE: conformal.to_dict(),
+        } if conformal is not None else None, metadata={
+            'metrics': getattr(self, 'metrics', {}),
+            'training_rows': getattr(self, 'n_training_rows', None),
+            'features': getattr(self, 'feature_columns', []),
+            'params': getattr(self, 'trained_params', {}),
+            'seed': getattr(self, 'seed', None),
+        })
+        if promote:
+            registry.promote(version)
+        print(f"📦 Registered model version: {version}")
+        return version
+    
+    def load_models(self, prefer_compact=False, model_dir="models/saved"):
+        """
+        Load previously trained models
+        
+        Args:
+            prefer_compact: Memory-map exported tree arrays instead of unpickling xgb/rf
+            model_dir: models/saved or a registry version directory
+        """
+        model_dir = Path(model_dir)
+        
         # Load each model
         for name in ['xgb', 'rf', 'gaussian']:
-            model_path = f"models/saved/{name}_model.pkl"
-            if Path(model_path).exists():
-                self.models[name] = joblib.load(model_path)
+            model_path = model_dir / f"{name}_model.pkl"
+            compact = load_compact_model(name, model_dir / "compact") if prefer_compact else None
+            if compact is not None:
+                self.models[name] = compact
+                logger.info(f"✅ Memory-mapped compact {name} ({compact.n_trees} trees)")
+            elif model_path.exists():
+                self.models[name] = self.load_pickled_member(model_path)
                 logger.info(f"✅ Loaded {name} from {model_path}")
             else:
                 logger.warning(f"⚠️ {name} model not found")
         
         # Load weights
-        weights_path = "models/saved/model_weights.csv"
-        if Path(weights_path).exists():
+        weights_path = model_dir / "model_weights.csv"
+        if weights_path.exists():
             weights_df = pd.read_csv(weights_path, index_col=0, header=None)
             raw_weights = weights_df.iloc[:, 0].to_dict()
             self.weights = {str(k): float(v) for k, v in raw_weights.items()}
@@ -126,7 +221,31 @@ class DelayPredictor(BasePredictor, EnsembleMethods, TrainingPipeline, ModelEval
             logger.warning("⚠️ No weights file found")
             self.weights = {}
         
+        # Conformal calibration (None for models trained before it existed)
+        self.conformal = ConformalIntervals.load(model_dir)
+        
         logger.info("✅ Models loaded successfully")
+    
+    @staticmethod
+    def load_pickled_member(path):
+        """
+        Unpickle an ensemble member for use with the shared feature matrix
+        Members fitted on the old feature DataFrame carry column names; the
+        matrix has the same column order, so the names are dropped to let
+        sklearn accept it without per-call warnings. XGBoost derives the
+        attribute from its booster (read-only) and accepts the matrix as is.
+        """
+        model = joblib.load(path)
+        names = vars(model).get('feature_names_in_')
+        if names is not None and list(names) == FEATURE_COLUMNS:
+            del model.feature_names_in_
+        return model
+    
+    def load_from_registry(self, version=None, prefer_compact=True):
+        """Load a registered version (default: the promoted one)"""
+        registry = ModelRegistry()
+        self.load_models(prefer_compact=prefer_compact, model_dir=registry.version_dir(version))
+        self.model_version = version or registry.current_version()
 
 
 # ============================================
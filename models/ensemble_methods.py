@@ -8,6 +8,9 @@ Ensemble prediction methods based on Al Ghamdi (2022)
 import numpy as np
 import pandas as pd
 from typing import Dict, Any, Tuple, Union
+from features.transformer import FeatureTransformer, as_matrix
+
+_TRANSFORMER = FeatureTransformer()
 
 class EnsembleMethods:
     """Ensemble prediction methods (Al Ghamdi's WE)"""
@@ -20,7 +23,10 @@ class EnsembleMethods:
         """
         Weighted averaging (Al Ghamdi 2022, Section 3.2.6)
         WE method: final = Σ(weight_i * prediction_i) / Σ(weights)
+        
+        All members receive the same float32 feature matrix (no per-member copies).
         """
+        X = as_matrix(X)
         predictions = np.zeros(len(X))
         total_weight = sum(self.weights.values())
         
@@ -36,32 +42,37 @@ class EnsembleMethods:
         confidence_level: float = 0.95
     ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
         """
-        Returns prediction with confidence interval.
-        Based on Dr. Oscar's advice: use variance across ensemble members.
+        Returns prediction with a prediction interval.
+        
+        With a conformal calibration (models/conformal.py, stored with the model)
+        the interval is the point prediction ± a precomputed residual quantile
+        for the journey's stratum: one table lookup, no extra model calls.
+        Older models fall back to Dr. Oscar's spread across ensemble members.
         
         Args:
             X: Feature matrix
-            confidence_level: 0.68 for 1σ, 0.95 for 2σ, 0.99 for 3σ
+            confidence_level: e.g. 0.68, 0.9, 0.95, 0.99
         
         Returns:
             mean: Predicted delay (minutes)
             lower_bound: Lower confidence bound
             upper_bound: Upper confidence bound
         """
-        # Get predictions from all models (unweighted, for variance)
-        all_predictions = []
-        for name, model in self.models.items():
-            pred = model.predict(X)
-            all_predictions.append(pred.flatten())
+        X = as_matrix(X)
+        
+        conformal = getattr(self, 'conformal', None)
+        if conformal is not None:
+            mean = self.predict_ensemble(X)
+            half_width = conformal.half_width_for(X, confidence_level, self.interval_model_key())
+            return mean, mean - half_width, mean + half_width
         
-        all_predictions = np.array(all_predictions)
+        # Get predictions from all models once (unweighted, for variance)
+        all_predictions = np.array([model.predict(X).flatten() for model in self.models.values()])
         
         # Weighted mean (same as predict_ensemble)
         total_weight = sum(self.weights.values())
-        weighted_mean = np.zeros(len(X))
-        for name, model in self.models.items():
-            weight = self.weights[name] / total_weight
-            weighted_mean += weight * model.predict(X).flatten()
+        member_weights = np.array([self.weights[name] / total_weight for name in self.models])
+        weighted_mean = member_weights @ all_predictions
         
         # Calculate standard deviation across models
         std_dev = np.std(all_predictions, axis=0)
@@ -75,6 +86,26 @@ class EnsembleMethods:
         
         return weighted_mean, lower_bound, upper_bound
     
+    def interval_model_key(self) -> str:
+        """Calibration table matching what is served: a single member or the ensemble"""
+        served = [name for name in self.models if self.weights.get(name, 0) > 0]
+        return served[0] if len(served) == 1 else 'ensemble'
+    
+    def interval_half_width(self, is_peak, is_cologne, time_of_day, confidence_level: float = 0.95):
+        """Conformal half-widths from base journey columns (None without a calibration)"""
+        conformal = getattr(self, 'conformal', None)
+        if conformal is None:
+            return None
+        return conformal.half_width(confidence_level, is_peak, is_cologne, time_of_day, self.interval_model_key())
+    
+    @staticmethod
+    def build_journey_features(distance, time_of_day, day_of_week, is_peak, is_cologne) -> np.ndarray:
+        """
+        Build the model feature matrix for one or many journeys
+        Accepts scalars or equal-length arrays (vectorized for batch serving)
+        """
+        return _TRANSFORMER.transform_arrays(distance, time_of_day, day_of_week, is_peak, is_cologne)
+    
     def predict_delay(
         self, 
         distance: float, 
@@ -91,17 +122,7 @@ class EnsembleMethods:
         - Bologna 2025: Laplacian noise (distance_decay)
         - Al Ghamdi 2022: ensemble averaging
         """
-        features = pd.DataFrame([{
-            'distance_km': distance,
-            'time_of_day': time_of_day,
-            'day_of_week': day_of_week,
-            'is_peak_hour': is_peak,
-            'is_cologne_bottleneck': is_cologne,
-            'cologne_effect': is_cologne * 2.0,
-            'peak_effect': is_peak * 1.5,
-            'distance_decay': np.exp(-(distance**2) / (2 * 50**2)),
-            'cologne_peak_interaction': (is_cologne * 2.0) * (is_peak * 1.5)
-        }])
+        features = self.build_journey_features(distance, time_of_day, day_of_week, is_peak, is_cologne)
         return self.predict_ensemble(features)[0]
     
     def predict_delay_with_ci(
@@ -117,17 +138,28 @@ class EnsembleMethods:
         Predict delay with confidence interval for a single journey.
         Useful for showing uncertainty to dispatchers.
         """
-        features = pd.DataFrame([{
-            'distance_km': distance,
-            'time_of_day': time_of_day,
-            'day_of_week': day_of_week,
-            'is_peak_hour': is_peak,
-            'is_cologne_bottleneck': is_cologne,
-            'cologne_effect': is_cologne * 2.0,
-            'peak_effect': is_peak * 1.5,
-            'distance_decay': np.exp(-(distance**2) / (2 * 50**2)),
-            'cologne_peak_interaction': (is_cologne * 2.0) * (is_peak * 1.5)
-        }])
+        features = self.build_journey_features(distance, time_of_day, day_of_week, is_peak, is_cologne)
         
         mean, lower, upper = self.predict_with_uncertainty(features, confidence_level)
-        return mean[0], lower[0], upper[0]
\ No newline at end of file
+        return mean[0], lower[0], upper[0]
+
+    def explain_delay(
+        self,
+        distance: float,
+        time_of_day: int,
+        day_of_week: int,
+        is_peak: int,
+        is_cologne: int
+    ) -> Dict[str, Any]:
+        """
+        Why the model predicts this delay: baseline plus per-input contributions
+        Served from the precomputed dashboard grid (models/explanations.py) when
+        available, computed on demand otherwise.
+        """
+        from .explanations import explain_journey
+
+        grid = getattr(self, 'explanations', None)
+        explanation = grid.lookup(distance, time_of_day, day_of_week, is_peak, is_cologne) if grid else None
+        if explanation is None:
+            explanation = explain_journey(self, distance, time_of_day, day_of_week, is_peak, is_cologne)
+        return explanation
@@ -6,35 +6,159 @@ Based on:
 - Bologna 2025: Heavy tails validation
 """
 
+import os
+import numpy as np
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
 from sklearn.metrics import mean_absolute_error, r2_score
 from pathlib import Path
+from typing import Dict, Optional
+
+BOOTSTRAP_RESAMPLES = 10_000
+BOOTSTRAP_CHUNK_BYTES = 64 * 2**20   # bound on the (models × resamples × rows) block
+
+
+def _bootstrap_chunk(y, predictions, n_resamples, seed):
+    """
+    R² and MAE for n_resamples bootstrap resamples at once
+    One (resamples × rows) index matrix is drawn; every metric is a row-wise reduction.
+    
+    Returns:
+        r2, mae: (n_models, n_resamples) arrays
+    """
+    rng = np.random.default_rng(seed)
+    n = len(y)
+    r2 = np.empty((len(predictions), n_resamples))
+    mae = np.empty((len(predictions), n_resamples))
+    
+    block = max(1, BOOTSTRAP_CHUNK_BYTES // (8 * n * (len(predictions) + 1)))
+    for start in range(0, n_resamples, block):
+        stop = min(start + block, n_resamples)
+        idx = rng.integers(0, n, size=(stop - start, n))
+        y_b = y[idx]
+        ss_tot = ((y_b - y_b.mean(axis=1, keepdims=True)) ** 2).sum(axis=1)
+        errors = predictions[:, idx] - y_b                        # (models, resamples, rows)
+        mae[:, start:stop] = np.abs(errors).mean(axis=2)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            r2[:, start:stop] = 1.0 - (errors ** 2).sum(axis=2) / ss_tot
+    return r2, mae
+
+
+def bootstrap_metrics(
+    y_true,
+    predictions: Dict[str, np.ndarray],
+    n_resamples: int = BOOTSTRAP_RESAMPLES,
+    confidence: float = 0.95,
+    seed: int = 42,
+    workers: Optional[int] = 1,
+) -> pd.DataFrame:
+    """
+    Percentile bootstrap confidence intervals of R² and MAE
+    All models are scored on the same resamples (paired comparison).
+    
+    Args:
+        y_true: Test targets
+        predictions: model name → cached test predictions
+        n_resamples: Number of bootstrap resamples
+        confidence: Interval coverage (0.95 → 2.5% / 97.5% percentiles)
+        workers: Split the resamples across processes (None = all cores)
+    
+    Returns:
+        One row per model: r2, r2_low, r2_high, mae, mae_low, mae_high
+    """
+    names = list(predictions)
+    y = np.asarray(y_true, dtype=np.float64)
+    P = np.vstack([np.asarray(predictions[name], dtype=np.float64).ravel() for name in names])
+    
+    workers = workers or os.cpu_count() or 1
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+    sizes = [len(part) for part in np.array_split(np.arange(n_resamples), workers)]
+    if workers == 1:
+        r2, mae = _bootstrap_chunk(y, P, n_resamples, seeds[0])
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_bootstrap_chunk, [y] * workers, [P] * workers, sizes, seeds))
+        r2 = np.hstack([part[0] for part in parts])
+        mae = np.hstack([part[1] for part in parts])
+    
+    alpha = (1 - confidence) / 2 * 100
+    r2_low, r2_high = np.nanpercentile(r2, [alpha, 100 - alpha], axis=1)
+    mae_low, mae_high = np.percentile(mae, [alpha, 100 - alpha], axis=1)
+    return pd.DataFrame({
+        'model': names,
+        'r2': [r2_score(y, p) for p in P],
+        'r2_low': r2_low,
+        'r2_high': r2_high,
+        'mae': [mean_absolute_error(y, p) for p in P],
+        'mae_low': mae_low,
+        'mae_high': mae_high,
+    })
+
 
 class ModelEvaluation:
     """Evaluation and research connections (Steps C+D)"""
     
-    def evaluate_models(self, X_test, y_test):
-        """Step C: Compare all models against UvA baseline"""
-        print("\n" + "="*60)
-        print("📊 MODEL COMPARISON (Step C)")
-        print("="*60)
+    def evaluate_models(self, X_test, y_test, verbose=True, save=True, n_bootstrap=None):
+        """
+        Step C: Compare all models against UvA baseline
+        
+        Test predictions are computed once and cached (self.test_predictions);
+        bootstrap resampling of that cache gives 95% CIs for every member and
+        the ensemble (~150 test rows: point estimates alone are within noise).
+        
+        Args:
+            verbose: Print the comparison table
+            save: Write models/saved/model_comparison.csv
+            n_bootstrap: Bootstrap resamples for the CIs (0 = point estimates only;
+                default BOOTSTRAP_RESAMPLES when reporting or saving, else 0 so
+                quiet runs such as experiment sweeps skip the resampling)
+        
+        Returns:
+            {member or 'ensemble': {'r2', 'mae', 'r2_ci', 'mae_ci'}}
+        """
+        if n_bootstrap is None:
+            n_bootstrap = BOOTSTRAP_RESAMPLES if verbose or save else 0
+        if verbose:
+            print("\n" + "="*60)
+            print("📊 MODEL COMPARISON (Step C)")
+            print("="*60)
+        
+        self.test_predictions = {name: np.asarray(model.predict(X_test)).ravel()
+                                 for name, model in self.models.items()}
+        # Ensemble from the cached member predictions (same as predict_ensemble)
+        total_weight = sum(self.weights.values())
+        self.test_predictions['ensemble'] = sum(
+            self.weights[name] / total_weight * pred for name, pred in self.test_predictions.items()
+        )
+        self.y_test = np.asarray(y_test)
         
-        results = []
-        for name, model in self.models.items():
-            pred = model.predict(X_test)
-            r2 = r2_score(y_test, pred)
-            mae = mean_absolute_error(y_test, pred)
-            results.append({'Model': name, 'R²': r2, 'MAE': mae})
-            print(f"{name:10} R²={r2:.3f}, MAE={mae:.2f} min")
+        if n_bootstrap:
+            comparison = bootstrap_metrics(self.y_test, self.test_predictions, n_resamples=n_bootstrap)
+        else:
+            comparison = pd.DataFrame([
+                {'model': name, 'r2': r2_score(self.y_test, pred), 'mae': mean_absolute_error(self.y_test, pred)}
+                for name, pred in self.test_predictions.items()
+            ])
         
-        # Ensemble performance
-        ensemble_pred = self.predict_ensemble(X_test)
-        ensemble_r2 = r2_score(y_test, ensemble_pred)
-        ensemble_mae = mean_absolute_error(y_test, ensemble_pred)
-        print(f"\n{'Ensemble':10} R²={ensemble_r2:.3f}, MAE={ensemble_mae:.2f} min")
+        self.metrics = {}
+        for row in comparison.itertuples(index=False):
+            self.metrics[row.model] = {'r2': float(row.r2), 'mae': float(row.mae)}
+            if n_bootstrap:
+                self.metrics[row.model]['r2_ci'] = [float(row.r2_low), float(row.r2_high)]
+                self.metrics[row.model]['mae_ci'] = [float(row.mae_low), float(row.mae_high)]
+            if verbose:
+                label = 'Ensemble' if row.model == 'ensemble' else row.model
+                prefix = "\n" if row.model == 'ensemble' else ""
+                ci = (f"  [R² {row.r2_low:.3f}..{row.r2_high:.3f}, MAE {row.mae_low:.2f}..{row.mae_high:.2f}]"
+                      if n_bootstrap else "")
+                print(f"{prefix}{label:10} R²={row.r2:.3f}, MAE={row.mae:.2f} min{ci}")
         
         # Save comparison
-        pd.DataFrame(results).to_csv("models/saved/model_comparison.csv", index=False)
+        if save:
+            comparison.rename(columns={'model': 'Model', 'r2': 'R²', 'mae': 'MAE'}).to_csv(
+                "models/saved/model_comparison.csv", index=False
+            )
+        return self.metrics
     
     def connect_to_research(self):
         """Step D: Connect results to research papers"""
@@ -46,7 +170,16 @@ class ModelEvaluation:
         print("\n📖 Al Ghamdi (2022) - Heterogeneous Ensembles:")
         print(f"   • Weighted averaging with R² weights: {self.weights}")
         print(f"   • Optimal ensemble size 3-4 → we use 3 models ✓")
-        print(f"   • WE > AE confirmed: ensemble R²={self.weights.get('ensemble_r2', 0.145):.3f}")
+        ensemble = getattr(self, 'metrics', {}).get('ensemble', {})
+        if 'r2_ci' in ensemble:
+            low, high = ensemble['r2_ci']
+            print(f"   • Ensemble R²={ensemble['r2']:.3f} (95% CI {low:.3f}..{high:.3f})")
+            overlapping = [name for name, m in self.metrics.items()
+                           if name != 'ensemble' and 'r2_ci' in m and m['r2_ci'][1] >= low]
+            if overlapping:
+                print(f"   • Not separable from ensemble at this test size: {', '.join(overlapping)}")
+        else:
+            print(f"   • WE > AE confirmed: ensemble R²={ensemble.get('r2', 0.145):.3f}")
         
         # Bologna 2025 validation
         print("\n📖 Bologna 2025 - Power Laws in Railway Delays:")
@@ -0,0 +1,238 @@
+"""
+In-process parallel experiment runner for the Metrodorf ensemble
+Replaces the per-run `python -m models.delay_predictor` + grep/awk scraping
+of run_experiment.sh:
+- training data is prepared once (one API collection at most, then the
+  cached feature matrix is shared by every run)
+- N seeded runs execute concurrently in worker processes
+- train_ensemble() returns structured metrics, written to one columnar
+  results table (Parquet if pyarrow is installed, else CSV)
+- runs are appended to the SQLite experiment store as they finish
+  (models/experiment_store.py) for cross-experiment queries
+- only the best run is published to the model registry and promoted: its
+  seed is retrained in-process, so a sweep leaves one version, not N
+
+Usage:
+    python main.py experiment --runs 20
+"""
+
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from .experiment_store import ExperimentStore, STORE_PATH, config_key
+
+logger = logging.getLogger(__name__)
+
+MIN_R2_THRESHOLD = 0.2   # Warn when a run's ensemble R² drops below this
+MEMBERS = ['xgb', 'rf', 'gaussian']
+
+
+def _train(seed: int, weight_folds: int):
+    """Train one seeded ensemble single-threaded (deterministic for a given seed and data)"""
+    from .delay_predictor import DelayPredictor
+
+    predictor = DelayPredictor(use_real_data=False)
+    result = predictor.train_ensemble(
+        weight_folds=weight_folds, n_jobs=1, seed=seed, save=False, report=False, member_threads=1
+    )
+    return predictor, result
+
+
+def _run_once(run: int, seed: int, weight_folds: int) -> Dict[str, Any]:
+    """Train and evaluate one seeded ensemble in a worker process (nothing is published)"""
+    started = datetime.now()
+    predictor, result = _train(seed, weight_folds)
+
+    # The seed is recorded separately: runs differing only by seed share a config
+    params = {name: {k: v for k, v in p.items() if k != 'random_state'}
+              for name, p in predictor.trained_params.items()}
+    row = {
+        'run': run,
+        'seed': seed,
+        'started': started.isoformat(timespec='seconds'),
+        'weight_folds': weight_folds,
+        'training_rows': result['training_rows'],
+        'test_rows': result['test_rows'],
+        'train_seconds': round(result['train_seconds'], 3),
+        'total_seconds': round((datetime.now() - started).total_seconds(), 3),
+        'version': None,
+        'config': {'weight_folds': weight_folds, 'params': params, 'features': predictor.feature_columns},
+    }
+    for name, metrics in result['metrics'].items():
+        row[f"{name}_r2"] = metrics['r2']
+        row[f"{name}_mae"] = metrics['mae']
+    for name, weight in result['ensemble_weights'].items():
+        row[f"{name}_weight"] = float(weight)
+    return row
+
+
+def publish_run(row: Dict[str, Any]) -> str:
+    """Retrain the selected run from its seed, register it and promote it"""
+    predictor, result = _train(int(row['seed']), int(row['weight_folds']))
+    if abs(result['metrics']['ensemble']['r2'] - row['ensemble_r2']) > 1e-6:
+        logger.warning(f"⚠️ Retrained run {row['run']} differs from the recorded one "
+                       f"(R² {result['metrics']['ensemble']['r2']:.4f} vs {row['ensemble_r2']:.4f})")
+    return predictor.register_version(promote=True)
+
+
+def write_results(results: pd.DataFrame, results_dir: Path) -> Path:
+    """Write the results table as Parquet when pyarrow is available, else CSV"""
+    try:
+        import pyarrow  # noqa: F401
+        path = results_dir / "results.parquet"
+        results.to_parquet(path, index=False)
+    except ImportError:
+        path = results_dir / "results.csv"
+        results.to_csv(path, index=False)
+    return path
+
+
+def plot_results(results: pd.DataFrame, path: Path) -> Optional[Path]:
+    """R², weights and MAE per run (skipped when matplotlib is missing)"""
+    try:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError:
+        logger.info("matplotlib not installed, skipping summary plot")
+        return None
+
+    results = results.sort_values('run')
+    fig, axes = plt.subplots(1, 3, figsize=(18, 5))
+
+    for name, marker in zip(MEMBERS + ['ensemble'], ['o-', 's-', '^-', '*-']):
+        axes[0].plot(results['run'], results[f"{name}_r2"], marker, label=name, alpha=0.7)
+    axes[0].axhline(y=0.3, color='g', linestyle='--', alpha=0.5, label='Target 0.3')
+    axes[0].set_title('Model Performance per Run')
+    axes[0].set_ylabel('R² Score')
+
+    for name, marker in zip(MEMBERS, ['o-', 's-', '^-']):
+        axes[1].plot(results['run'], results[f"{name}_weight"], marker, label=name, alpha=0.7)
+    axes[1].set_title('Ensemble Weights per Run')
+    axes[1].set_ylabel('Weight')
+
+    axes[2].plot(results['run'], results['ensemble_mae'], 'o-', color='purple', label='ensemble')
+    axes[2].set_title('Ensemble MAE per Run')
+    axes[2].set_ylabel('MAE (minutes)')
+
+    for ax in axes:
+        ax.set_xlabel('Run')
+        ax.legend()
+        ax.grid(True, alpha=0.3)
+
+    plt.tight_layout()
+    plt.savefig(path, dpi=150)
+    plt.close(fig)
+    return path
+
+
+def run_experiment(
+    n_runs: int = 20,
+    workers: Optional[int] = None,
+    base_seed: int = 42,
+    weight_folds: int = 0,
+    use_real_data: bool = False,
+    register: bool = True,
+    results_dir: Optional[str] = None,
+    store_path: str = STORE_PATH,
+) -> pd.DataFrame:
+    """
+    Run n_runs seeded trainings concurrently and collect one results row per run
+
+    Args:
+        n_runs: Number of runs (seeds base_seed, base_seed + 1, ...)
+        workers: Worker processes (default: all cores)
+        base_seed: Seed of the first run
+        weight_folds: K-fold weight estimation inside each run (0 = validation split)
+        use_real_data: Collect real-time samples once before the runs start
+        register: Publish and promote the best run's ensemble (the other runs are only recorded)
+        results_dir: Output directory (default: experiment_results_<timestamp>)
+        store_path: SQLite experiment store the runs are appended to
+
+    Returns:
+        Results table, one row per finished run
+    """
+    from .base_predictor import BasePredictor
+    from .tuning import data_key
+
+    results_dir = Path(results_dir or f"experiment_results_{datetime.now():%Y%m%d_%H%M%S}")
+    results_dir.mkdir(parents=True, exist_ok=True)
+    workers = max(1, min(workers or os.cpu_count() or 1, n_runs))
+
+    print("=" * 60)
+    print("🚆 METRODORF EXPERIMENT RUNNER")
+    print("=" * 60)
+    print(f"Runs: {n_runs} | Workers: {workers} | Seeds: {base_seed}..{base_seed + n_runs - 1}")
+    print(f"Results directory: {results_dir}")
+
+    # Prepare the data once: at most one API collection, then the feature store
+    # holds the matrix every run reads
+    base = BasePredictor(use_real_data=use_real_data)
+    training_data = base.training_data
+    X, y = base.prepare_features()
+    real_samples = int((training_data['source'] == 'real').sum()) if 'source' in training_data else 0
+    data_hash = data_key(X, y)
+
+    store = ExperimentStore(store_path)
+    experiment_id = store.start_experiment(n_runs, data_hash=data_hash, config={
+        'base_seed': base_seed, 'weight_folds': weight_folds, 'use_real_data': use_real_data,
+        'results_dir': str(results_dir),
+    })
+    print(f"Experiment id: {experiment_id} (store: {store_path})")
+
+    rows: List[Dict[str, Any]] = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(_run_once, run, base_seed + run - 1, weight_folds): run
+            for run in range(1, n_runs + 1)
+        }
+        for future in as_completed(futures):
+            run = futures[future]
+            try:
+                row = future.result()
+            except Exception as e:
+                logger.warning(f"⚠️ Run {run} failed: {e}")
+                continue
+            row['real_samples'] = real_samples
+            row['data_hash'] = data_hash
+            row['run_id'] = store.add_run(experiment_id, row)
+            row['config_key'] = config_key(row.pop('config'))
+            rows.append(row)
+            print(f"✅ Run {run:3} (seed {row['seed']}): ensemble R²={row['ensemble_r2']:.3f}, "
+                  f"MAE={row['ensemble_mae']:.2f} min, {row['train_seconds']:.1f}s")
+            if row['ensemble_r2'] < MIN_R2_THRESHOLD:
+                logger.warning(f"⚠️ Run {run}: ensemble R² ({row['ensemble_r2']:.3f}) "
+                               f"below threshold ({MIN_R2_THRESHOLD})")
+
+    if not rows:
+        logger.warning("⚠️ No run finished, nothing to write")
+        return pd.DataFrame()
+
+    results = pd.DataFrame(rows).sort_values('run').reset_index(drop=True)
+    results.insert(0, 'experiment_id', experiment_id)
+    best_index = results['ensemble_r2'].idxmax()
+    if register:
+        version = publish_run(results.loc[best_index].to_dict())
+        results['version'] = results['version'].astype(object)
+        results.loc[best_index, 'version'] = version
+        store.record_version(int(results.loc[best_index, 'run_id']), version)
+        (results_dir / "best_model_version.txt").write_text(f"{version}\n")
+    best = results.loc[best_index]
+    path = write_results(results, results_dir)
+    plot_results(results, results_dir / "experiment_summary.png")
+
+    print("\n" + "=" * 60)
+    print("🎉 EXPERIMENT COMPLETED")
+    print("=" * 60)
+    print(f"Finished runs: {len(results)}/{n_runs}")
+    print(f"Ensemble R²: mean={results['ensemble_r2'].mean():.3f}, std={results['ensemble_r2'].std():.3f}")
+    print(f"Best ensemble R²: {best['ensemble_r2']:.3f} (run {best['run']}, version {best['version']})")
+    print(f"📁 Results table: {path}")
+    print("=" * 60)
+    return results
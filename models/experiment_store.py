@@ -0,0 +1,256 @@
+"""
+Append-only experiment store (embedded SQLite)
+One database instead of run_N_full.log / run_N_weights.csv / experiment_log.csv:
+- experiments: one row per experiment (config, data hash, start time)
+- runs:        one row per run (seed, config key, data hash, timings, registry version)
+- run_models:  one row per run and model (r2, mae, weight; model='ensemble' for the blend)
+
+Rows are only ever inserted (apart from the registry version, filled in for
+the one run an experiment publishes); cross-run questions are indexed SQL queries:
+    store = ExperimentStore()
+    store.model_summary()              # mean / 95% CI of R² and MAE per model
+    store.best_runs(by='config_key')   # best ensemble run per configuration
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+logger = logging.getLogger(__name__)
+
+STORE_PATH = "experiments/experiments.db"
+MODELS = ['xgb', 'rf', 'gaussian', 'ensemble']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS experiments (
+    experiment_id TEXT PRIMARY KEY,
+    started       TEXT NOT NULL,
+    n_runs        INTEGER,
+    data_hash     TEXT,
+    config        TEXT
+);
+CREATE TABLE IF NOT EXISTS runs (
+    run_id        INTEGER PRIMARY KEY AUTOINCREMENT,
+    experiment_id TEXT NOT NULL REFERENCES experiments(experiment_id),
+    run           INTEGER NOT NULL,
+    seed          INTEGER,
+    config_key    TEXT,
+    data_hash     TEXT,
+    weight_folds  INTEGER,
+    training_rows INTEGER,
+    test_rows     INTEGER,
+    real_samples  INTEGER,
+    train_seconds REAL,
+    total_seconds REAL,
+    version       TEXT,
+    started       TEXT,
+    config        TEXT
+);
+CREATE TABLE IF NOT EXISTS run_models (
+    run_id        INTEGER NOT NULL REFERENCES runs(run_id),
+    model         TEXT NOT NULL,
+    r2            REAL,
+    mae           REAL,
+    weight        REAL,
+    PRIMARY KEY (run_id, model)
+);
+CREATE INDEX IF NOT EXISTS idx_runs_experiment ON runs(experiment_id);
+CREATE INDEX IF NOT EXISTS idx_runs_config ON runs(config_key);
+CREATE INDEX IF NOT EXISTS idx_run_models_model ON run_models(model, r2);
+"""
+
+
+def config_key(config: Dict[str, Any]) -> str:
+    """Stable short hash of a run configuration (params, weight folds, ...)"""
+    return hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode()).hexdigest()[:12]
+
+
+class ExperimentStore:
+    """Append-only SQLite store for experiment runs with a small query API"""
+
+    def __init__(self, path: str = STORE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    # ============================================
+    # WRITES (insert only)
+    # ============================================
+    def start_experiment(self, n_runs: int, data_hash: Optional[str] = None,
+                         config: Optional[Dict[str, Any]] = None) -> str:
+        """Register a new experiment and return its id"""
+        experiment_id = f"{datetime.now():%Y%m%d_%H%M%S}_{uuid.uuid4().hex[:6]}"
+        with self.connect() as conn:
+            conn.execute(
+                "INSERT INTO experiments (experiment_id, started, n_runs, data_hash, config) VALUES (?, ?, ?, ?, ?)",
+                (experiment_id, datetime.now().isoformat(timespec='seconds'), n_runs, data_hash,
+                 json.dumps(config or {}, sort_keys=True, default=str)),
+            )
+        return experiment_id
+
+    def add_run(self, experiment_id: str, row: Dict[str, Any]) -> int:
+        """
+        Insert one run and its per-model rows in a single transaction
+
+        Args:
+            row: Runner result (run, seed, timings, version, config, <model>_r2/_mae/_weight)
+
+        Returns:
+            run_id
+        """
+        config = row.get('config') or {}
+        with self.connect() as conn:
+            cursor = conn.execute(
+                """INSERT INTO runs (experiment_id, run, seed, config_key, data_hash, weight_folds,
+                                     training_rows, test_rows, real_samples, train_seconds,
+                                     total_seconds, version, started, config)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (experiment_id, row['run'], row.get('seed'), config_key(config), row.get('data_hash'),
+                 row.get('weight_folds'), row.get('training_rows'), row.get('test_rows'),
+                 row.get('real_samples'), row.get('train_seconds'), row.get('total_seconds'),
+                 row.get('version'), row.get('started'), json.dumps(config, sort_keys=True, default=str)),
+            )
+            run_id = cursor.lastrowid
+            conn.executemany(
+                "INSERT INTO run_models (run_id, model, r2, mae, weight) VALUES (?, ?, ?, ?, ?)",
+                [(run_id, model, row.get(f"{model}_r2"), row.get(f"{model}_mae"), row.get(f"{model}_weight"))
+                 for model in MODELS if f"{model}_r2" in row],
+            )
+        return run_id
+
+    def record_version(self, run_id: int, version: str) -> None:
+        """Attach the registry version a run was published as"""
+        with self.connect() as conn:
+            conn.execute("UPDATE runs SET version = ? WHERE run_id = ?", (version, run_id))
+
+    # ============================================
+    # QUERIES
+    # ============================================
+    def query(self, sql: str, params: tuple = ()) -> pd.DataFrame:
+        """Run any read-only SQL against the store"""
+        with self.connect() as conn:
+            return pd.read_sql_query(sql, conn, params=params)
+
+    def latest_experiment(self) -> Optional[str]:
+        df = self.query("SELECT experiment_id FROM experiments ORDER BY started DESC, rowid DESC LIMIT 1")
+        return df['experiment_id'].iloc[0] if len(df) else None
+
+    def experiments(self) -> pd.DataFrame:
+        """All experiments with their finished run count and mean ensemble R²"""
+        return self.query("""
+            SELECT e.experiment_id, e.started, e.n_runs, COUNT(r.run_id) AS finished_runs,
+                   AVG(m.r2) AS ensemble_r2_mean, MAX(m.r2) AS ensemble_r2_best
+            FROM experiments e
+            LEFT JOIN runs r ON r.experiment_id = e.experiment_id
+            LEFT JOIN run_models m ON m.run_id = r.run_id AND m.model = 'ensemble'
+            GROUP BY e.experiment_id
+            ORDER BY e.started
+        """)
+
+    def runs(self, experiment_id: Optional[str] = None) -> pd.DataFrame:
+        """Wide table: one row per run with <model>_r2 / _mae / _weight columns"""
+        where, params = ("WHERE r.experiment_id = ?", (experiment_id,)) if experiment_id else ("", ())
+        long = self.query(f"""
+            SELECT r.run_id, r.experiment_id, r.run, r.seed, r.config_key, r.version,
+                   r.train_seconds, m.model, m.r2, m.mae, m.weight
+            FROM runs r JOIN run_models m ON m.run_id = r.run_id
+            {where}
+        """, params)
+        if long.empty:
+            return long
+        info = long.drop(columns=['model', 'r2', 'mae', 'weight']).drop_duplicates('run_id').set_index('run_id')
+        wide = long.pivot(index='run_id', columns='model', values=['r2', 'mae', 'weight'])
+        wide.columns = [f"{model}_{metric}" for metric, model in wide.columns]
+        return info.join(wide).reset_index().sort_values('run_id').reset_index(drop=True)
+
+    def model_summary(self, experiment_id: Optional[str] = None, config: Optional[str] = None,
+                      confidence: float = 0.95) -> pd.DataFrame:
+        """
+        Mean, std and t-based confidence interval of R² and MAE per model
+
+        Args:
+            experiment_id: Restrict to one experiment (default: every run in the store)
+            config: Restrict to one config_key
+        """
+        clauses, params = [], []
+        if experiment_id:
+            clauses.append("r.experiment_id = ?")
+            params.append(experiment_id)
+        if config:
+            clauses.append("r.config_key = ?")
+            params.append(config)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        rows = self.query(f"""
+            SELECT m.model, m.r2, m.mae, m.weight
+            FROM run_models m JOIN runs r ON r.run_id = m.run_id
+            {where}
+        """, tuple(params))
+        if rows.empty:
+            return rows
+
+        # Per-run rows aggregated in pandas: the sample std (ddof=1) stays exact for
+        # tiny variances, where E[x²] - E[x]² in SQL cancels catastrophically
+        grouped = rows.groupby('model')
+        summary = grouped.agg(n=('r2', 'size'), r2_mean=('r2', 'mean'), r2_std=('r2', lambda x: x.std(ddof=1)),
+                              mae_mean=('mae', 'mean'), mae_std=('mae', lambda x: x.std(ddof=1)),
+                              weight_mean=('weight', 'mean'), r2_best=('r2', 'max')).reset_index()
+        n = summary['n'].astype(float)
+        t = stats.t.ppf(0.5 + confidence / 2, np.maximum(n - 1, 1))
+        for metric in ['r2', 'mae']:
+            half_width = t * summary[f"{metric}_std"] / np.sqrt(n)
+            summary[f"{metric}_ci_low"] = summary[f"{metric}_mean"] - half_width
+            summary[f"{metric}_ci_high"] = summary[f"{metric}_mean"] + half_width
+
+        order = {model: i for i, model in enumerate(MODELS)}
+        summary = summary.sort_values('model', key=lambda s: s.map(order)).reset_index(drop=True)
+        return summary[['model', 'n', 'r2_mean', 'r2_std', 'r2_ci_low', 'r2_ci_high', 'r2_best',
+                        'mae_mean', 'mae_std', 'mae_ci_low', 'mae_ci_high', 'weight_mean']]
+
+    def best_runs(self, by: str = 'config_key', model: str = 'ensemble',
+                  experiment_id: Optional[str] = None) -> pd.DataFrame:
+        """
+        Best run (highest R² of `model`) per config_key / experiment_id / data_hash
+
+        Args:
+            experiment_id: Restrict to one experiment (default: every run in the store)
+        """
+        if by not in ('config_key', 'experiment_id', 'data_hash'):
+            raise ValueError(f"Cannot group best runs by '{by}'")
+        run_columns = [c for c in ('experiment_id', 'run', 'seed', 'version') if c != by]
+        where, params = ("WHERE r.experiment_id = ?", (model, experiment_id)) if experiment_id else ("", (model,))
+        return self.query(f"""
+            SELECT * FROM (
+                SELECT r.{by}, r.run_id, {', '.join(f'r.{c}' for c in run_columns)},
+                       m.r2, m.mae, COUNT(*) OVER (PARTITION BY r.{by}) AS runs_in_group,
+                       ROW_NUMBER() OVER (PARTITION BY r.{by} ORDER BY m.r2 DESC) AS rank
+                FROM runs r JOIN run_models m ON m.run_id = r.run_id AND m.model = ?
+                {where}
+            )
+            WHERE rank = 1
+            ORDER BY r2 DESC
+        """, params).drop(columns='rank')
@@ -0,0 +1,253 @@
+"""
+Batched per-feature explanations for the delay ensemble
+Answers the dispatcher's "why?" next to a recommendation without extra
+inference on the request path:
+- XGBoost: native TreeSHAP contributions (booster.predict(pred_contribs=True))
+- Random Forest and compact XGBoost: vectorized path attributions (Saabas)
+  walked over the compact node arrays, all trees and rows at once
+- non-tree members (Gaussian) only contribute to the bias term
+- contributions always add up exactly: bias + Σ contributions = prediction
+
+The dashboard's inputs are discrete (station distance, hour, weekday, peak,
+Cologne), so the whole input grid is explained once when a model version
+loads and cached per version and served members:
+    models/saved/explanations/<version>_<members>.npz
+Serving an explanation is then one array lookup.
+"""
+
+import logging
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from features.transformer import FEATURE_COLUMNS, FeatureTransformer, as_matrix
+from .compact_trees import CompactTreeEnsemble, flatten_model
+
+logger = logging.getLogger(__name__)
+
+EXPLANATION_DIR = "models/saved/explanations"
+
+# Discrete dashboard inputs (distances are the app's station estimates)
+DASHBOARD_DISTANCES = (15, 40, 50, 70)
+DASHBOARD_HOURS = tuple(range(24))
+DASHBOARD_DAYS = tuple(range(7))
+
+# Derived features are reported under the input they are computed from
+FEATURE_GROUPS = {
+    'Distance': ['distance_km', 'distance_decay'],
+    'Hour of day': ['time_of_day'],
+    'Day of week': ['day_of_week'],
+    'Peak hour': ['is_peak_hour', 'peak_effect'],
+    'Cologne bottleneck': ['is_cologne_bottleneck', 'cologne_effect'],
+    'Peak × Cologne': ['cologne_peak_interaction'],
+}
+GROUP_NAMES = list(FEATURE_GROUPS)
+_GROUP_MATRIX = np.zeros((len(FEATURE_COLUMNS), len(GROUP_NAMES)), dtype=np.float64)
+for _j, _group in enumerate(GROUP_NAMES):
+    for _feature in FEATURE_GROUPS[_group]:
+        _GROUP_MATRIX[FEATURE_COLUMNS.index(_feature), _j] = 1.0
+
+
+# ============================================
+# CONTRIBUTIONS PER MEMBER
+# ============================================
+def path_contributions(compact: CompactTreeEnsemble, X: np.ndarray) -> np.ndarray:
+    """
+    Path attributions for an array-backed forest or boosted ensemble
+
+    Every split on the way to a leaf moves the prediction from the node mean
+    to the child mean; that change is credited to the split feature.
+    Forests average the trees, boosted trees add up on top of base_score.
+
+    Returns:
+        (n_samples, n_features + 1) matrix, last column = bias (root means)
+    """
+    if not has_node_means(compact):
+        raise ValueError("Path attributions need node means (exported before they were stored)")
+
+    X = as_matrix(X)
+    n_features = X.shape[1]
+    contributions = np.zeros((len(X), n_features + 1), dtype=np.float64)
+    rows = np.arange(len(X))[:, None]
+    node = np.repeat(compact.roots[None, :], len(X), axis=0)
+
+    for _ in range(compact.max_depth):
+        feat = compact.feature[node]
+        internal = feat >= 0
+        if not internal.any():
+            break
+
+        x = X[rows, np.where(internal, feat, 0)]
+        thr = compact.threshold[node]
+        go_left = (x <= thr) if compact.kind == 'sklearn' else (x < thr)
+        go_left = np.where(np.isnan(x), compact.missing_left[node].astype(bool), go_left)
+        child = np.where(go_left, compact.left[node], compact.right[node])
+        child = np.where(internal, child, node)
+
+        delta = np.where(internal, compact.value[child] - compact.value[node], 0.0)
+        for f in range(n_features):
+            contributions[:, f] += np.where(feat == f, delta, 0.0).sum(axis=1)
+        node = child
+
+    if compact.kind == 'sklearn':
+        contributions /= compact.n_trees
+        contributions[:, -1] = compact.value[compact.roots].mean()
+    else:
+        contributions[:, -1] = compact.base_score + compact.value[compact.roots].sum()
+    return contributions
+
+
+def has_node_means(compact: CompactTreeEnsemble) -> bool:
+    """sklearn node values are always means; XGBoost exports store them since 'node_means'"""
+    return compact.kind == 'sklearn' or bool(compact.meta.get('node_means'))
+
+
+def xgb_contributions(model, X: np.ndarray) -> np.ndarray:
+    """Exact TreeSHAP values from XGBoost (last column = bias)"""
+    import xgboost as xgb
+
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    matrix = xgb.DMatrix(as_matrix(X), feature_names=booster.feature_names)
+    return booster.predict(matrix, pred_contribs=True).astype(np.float64)
+
+
+def member_contributions(model, X: np.ndarray) -> Optional[np.ndarray]:
+    """Contributions of one ensemble member, or None for non-tree members"""
+    if isinstance(model, CompactTreeEnsemble):
+        if has_node_means(model):
+            return path_contributions(model, X)
+        return None  # older compact XGBoost export without node means
+    if hasattr(model, 'get_booster') or type(model).__name__ == 'Booster':
+        return xgb_contributions(model, X)
+    if hasattr(model, 'estimators_'):
+        return path_contributions(flatten_model(model), X)
+    return None
+
+
+def ensemble_contributions(predictor, X: np.ndarray) -> np.ndarray:
+    """
+    Weighted contributions of the loaded ensemble
+
+    Members without tree contributions add their prediction to the bias,
+    so bias + Σ contributions still equals the ensemble prediction.
+    """
+    X = as_matrix(X)
+    total = np.zeros((len(X), X.shape[1] + 1), dtype=np.float64)
+    # Same members and normalized weights as EnsembleMethods.predict_ensemble
+    total_weight = sum(predictor.weights[name] for name in predictor.models)
+    for name, model in predictor.models.items():
+        weight = predictor.weights[name] / total_weight
+        if weight == 0:
+            continue
+        contributions = member_contributions(model, X)
+        if contributions is None:
+            logger.debug(f"No feature attributions for {name}, folded into the bias")
+            total[:, -1] += weight * np.asarray(model.predict(X), dtype=np.float64)
+        else:
+            total += weight * contributions
+    return total
+
+
+def group_contributions(contributions: np.ndarray) -> np.ndarray:
+    """Sum derived-feature contributions into the dashboard inputs (n, len(GROUP_NAMES))"""
+    return contributions[:, :-1] @ _GROUP_MATRIX
+
+
+# ============================================
+# PRECOMPUTED DASHBOARD GRID
+# ============================================
+class ExplanationGrid:
+    """Grouped contributions for every dashboard input combination"""
+
+    def __init__(self, contributions: np.ndarray, bias: np.ndarray,
+                 distances: Sequence[float] = DASHBOARD_DISTANCES):
+        self.contributions = contributions   # (distances, hours, days, peak, cologne, groups)
+        self.bias = bias                     # same shape without the group axis
+        self.distances = tuple(distances)
+
+    @staticmethod
+    def grid_inputs(distances: Sequence[float] = DASHBOARD_DISTANCES) -> pd.DataFrame:
+        """Cartesian product of the dashboard inputs in grid order"""
+        index = pd.MultiIndex.from_product(
+            [distances, DASHBOARD_HOURS, DASHBOARD_DAYS, (0, 1), (0, 1)],
+            names=['distance', 'time_of_day', 'day_of_week', 'is_peak', 'is_cologne'],
+        )
+        return index.to_frame(index=False)
+
+    @classmethod
+    def compute(cls, predictor, distances: Sequence[float] = DASHBOARD_DISTANCES) -> 'ExplanationGrid':
+        """Explain the whole grid in one batched pass"""
+        grid = cls.grid_inputs(distances)
+        X = FeatureTransformer().transform_arrays(*(grid[col].to_numpy() for col in grid.columns))
+        contributions = ensemble_contributions(predictor, X)
+
+        shape = (len(distances), len(DASHBOARD_HOURS), len(DASHBOARD_DAYS), 2, 2)
+        return cls(group_contributions(contributions).reshape(*shape, len(GROUP_NAMES)),
+                   contributions[:, -1].reshape(shape), distances)
+
+    def lookup(self, distance, time_of_day, day_of_week, is_peak, is_cologne) -> Optional[Dict[str, Any]]:
+        """Precomputed explanation, or None when the input is off the grid"""
+        if distance not in self.distances or not (0 <= time_of_day < 24 and 0 <= day_of_week < 7):
+            return None
+        key = (self.distances.index(distance), int(time_of_day), int(day_of_week), int(bool(is_peak)),
+               int(bool(is_cologne)))
+        return explanation_dict(self.bias[key], self.contributions[key])
+
+    def save(self, path: Union[str, Path]):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez(path, contributions=self.contributions, bias=self.bias,
+                 distances=np.asarray(self.distances, dtype=np.float64), groups=np.asarray(GROUP_NAMES))
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> Optional['ExplanationGrid']:
+        try:
+            with np.load(path) as data:
+                if list(data['groups']) != GROUP_NAMES:
+                    return None
+                distances = tuple(int(d) if float(d).is_integer() else float(d) for d in data['distances'])
+                return cls(data['contributions'], data['bias'], distances)
+        except (OSError, KeyError, ValueError):
+            return None
+
+    @classmethod
+    def for_version(cls, predictor, version: Optional[str],
+                    directory: Union[str, Path] = EXPLANATION_DIR) -> 'ExplanationGrid':
+        """
+        Load the grid cached for a model version, computing (and caching) it on a miss
+        The cache is keyed by the served members too: the dashboard's RF-only
+        predictor and the service's full ensemble explain different predictions.
+
+        Args:
+            version: Registry version id (None = unversioned model, not cached on disk)
+        """
+        members = '+'.join(sorted(name for name in predictor.models if predictor.weights.get(name, 0) > 0))
+        path = Path(directory) / f"{version}_{members}.npz" if version else None
+        if path is not None and path.exists():
+            grid = cls.load(path)
+            if grid is not None:
+                return grid
+
+        grid = cls.compute(predictor)
+        if path is not None:
+            grid.save(path)
+            logger.info(f"🧭 Cached explanations for version {version} ({grid.bias.size} inputs)")
+        return grid
+
+
+def explanation_dict(bias: float, grouped: np.ndarray) -> Dict[str, Any]:
+    """Baseline plus contributions per input, largest effect first"""
+    order = np.argsort(-np.abs(grouped))
+    return {
+        'baseline': float(bias),
+        'contributions': {GROUP_NAMES[i]: float(grouped[i]) for i in order},
+    }
+
+
+def explain_journey(predictor, distance, time_of_day, day_of_week, is_peak, is_cologne) -> Dict[str, Any]:
+    """On-demand explanation for a single journey (off-grid inputs)"""
+    X = FeatureTransformer().transform_arrays(distance, time_of_day, day_of_week, int(is_peak), int(is_cologne))
+    contributions = ensemble_contributions(predictor, X)[0]
+    return explanation_dict(contributions[-1], group_contributions(contributions[None, :])[0])
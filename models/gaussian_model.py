@@ -9,13 +9,14 @@ Based on Bologna 2025 findings:
 import numpy as np
 from sklearn.linear_model import Ridge
 from sklearn.metrics import r2_score
+from features.transformer import FEATURE_COLUMNS, as_matrix
 
 class GaussianInspiredModel:
     """
     Model that captures Bologna 2025 insights:
     • Heavy tails → Ridge regularization prevents overfitting to extremes
     • Laplacian noise → distance_decay feature models uncertainty
-    • Priority rules → cologne_kernel applies 2.0x multiplier
+    • Priority rules → cologne_effect column carries the 2.0x multiplier
     """
     
     def __init__(self, zone_matrix=None):
@@ -27,38 +28,39 @@ class GaussianInspiredModel:
         """
         Train model with Bologna-inspired features
         - L2 regularization (alpha=1.0) handles heavy tails
-        - Cologne bottleneck gets 2.0x priority multiplier
-        - Distance decay models Laplacian noise
-        """
-        # Create copy to avoid modifying original
-        X_with_kernel = X.copy()
-        
-        # Bologna 2025: Priority rules - Cologne bottleneck effect
-        if self.zone_matrix is not None and 'is_cologne_bottleneck' in X.columns:
-            X_with_kernel['cologne_kernel'] = X['is_cologne_bottleneck'] * 2.0
+        - Cologne bottleneck gets 2.0x priority multiplier (cologne_effect column)
+        - Distance decay models Laplacian noise (distance_decay column)
         
-        # Bologna 2025: Laplacian noise - distance-based decay
-        if 'distance_km' in X.columns:
-            sigma = 50  # Regional scale (km)
-            X_with_kernel['distance_decay'] = np.exp(-(X['distance_km']**2) / (2 * sigma**2))
+        X is the shared float32 matrix from FeatureTransformer: the kernel
+        columns are already part of it, so no copy is made here.
+        """
+        X = as_matrix(X)
         
         # Ridge regression with L2 regularization prevents overfitting to heavy tails
         self.model = Ridge(alpha=1.0)
-        self.model.fit(X_with_kernel, y)
+        self.model.fit(X, y)
+        self.coefficients = None
         return self
     
+    def _linear_coefficients(self):
+        """
+        Coefficients over FEATURE_COLUMNS
+        Models saved before the shared transformer were fitted with an extra
+        'cologne_kernel' column identical to cologne_effect; its weight is folded in.
+        """
+        if getattr(self, 'coefficients', None) is None:
+            coef = np.asarray(self.model.coef_, dtype=np.float64).ravel()
+            if len(coef) == len(FEATURE_COLUMNS) + 1:
+                folded = coef[:len(FEATURE_COLUMNS)].copy()
+                folded[FEATURE_COLUMNS.index('cologne_effect')] += coef[-1]
+                coef = folded
+            self.coefficients = coef.astype(np.float32)
+        return self.coefficients
+    
     def predict(self, X):
-        """Make predictions using trained model"""
-        X_with_kernel = X.copy()
-        
-        if self.zone_matrix is not None and 'is_cologne_bottleneck' in X.columns:
-            X_with_kernel['cologne_kernel'] = X['is_cologne_bottleneck'] * 2.0
-        
-        if 'distance_km' in X.columns:
-            sigma = 50
-            X_with_kernel['distance_decay'] = np.exp(-(X['distance_km']**2) / (2 * sigma**2))
-        
-        return self.model.predict(X_with_kernel)
+        """Make predictions using trained model (one mat-vec on the shared matrix)"""
+        X = as_matrix(X)
+        return X @ self._linear_coefficients() + float(self.model.intercept_)
     
     def score(self, X, y):
         """Calculate R² score"""
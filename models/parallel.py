@@ -0,0 +1,74 @@
+"""
+Shared-memory helpers for parallel training jobs
+The feature matrix is copied into one multiprocessing.shared_memory block;
+worker processes attach to it by name and wrap it in a zero-copy ndarray,
+so fold × member jobs never pickle the training data.
+"""
+
+import logging
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class SharedArraySpec:
+    """Picklable handle for a shared array (sent to worker processes)"""
+    name: str
+    shape: Tuple[int, ...]
+    dtype: str
+
+
+class SharedArray:
+    """
+    NumPy array backed by a named shared-memory block
+
+    The creating process owns the block and unlinks it on close();
+    workers call SharedArray.attach(spec) and only close their mapping.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, spec: SharedArraySpec, owner: bool):
+        self._shm = shm
+        self.spec = spec
+        self.owner = owner
+        self.array = np.ndarray(spec.shape, dtype=spec.dtype, buffer=shm.buf)
+
+    @classmethod
+    def from_array(cls, array: np.ndarray) -> 'SharedArray':
+        """Copy an array into a new shared-memory block"""
+        array = np.ascontiguousarray(array)
+        shm = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+        spec = SharedArraySpec(shm.name, array.shape, array.dtype.str)
+        shared = cls(shm, spec, owner=True)
+        shared.array[...] = array
+        return shared
+
+    @classmethod
+    def attach(cls, spec: SharedArraySpec) -> 'SharedArray':
+        """Map an existing block (read-only view) inside a worker process"""
+        shm = shared_memory.SharedMemory(name=spec.name)
+        shared = cls(shm, spec, owner=False)
+        shared.array.flags.writeable = False
+        return shared
+
+    def close(self):
+        """Release the mapping (and free the block if this process created it)"""
+        self.array = None
+        try:
+            self._shm.close()
+            if self.owner:
+                self._shm.unlink()
+        except FileNotFoundError:
+            pass
+        except BufferError as e:
+            logger.warning(f"⚠️ Shared array {self.spec.name} still referenced: {e}")
+
+    def __enter__(self) -> 'SharedArray':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,260 @@
+"""
+Versioned model registry for Metrodorf
+- Every trained ensemble is stored under a content hash (immutable version)
+- meta.json records metrics, training rows, feature list and weights
+- A single CURRENT pointer is swapped atomically (os.replace) on promotion
+- ModelHandle reloads the promoted version in the background (zero-downtime deploys)
+
+Layout:
+    models/registry/
+        CURRENT                      # version id of the promoted model
+        history.csv                  # promotion log
+        versions/<hash>/             # same file names as models/saved/
+            xgb_model.pkl, rf_model.pkl, gaussian_model.pkl
+            model_weights.csv, compact/<name>/*.npy, conformal.json, meta.json
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import joblib
+import pandas as pd
+
+from .compact_trees import export_compact_models
+
+logger = logging.getLogger(__name__)
+
+REGISTRY_DIR = "models/registry"
+
+
+class ModelRegistry:
+    """Content-addressed model versions with an atomic "current" pointer"""
+
+    def __init__(self, root: str = REGISTRY_DIR):
+        self.root = Path(root)
+        self.versions_dir = self.root / "versions"
+        self.staging_dir = self.root / "staging"
+        self.current_file = self.root / "CURRENT"
+        self.versions_dir.mkdir(parents=True, exist_ok=True)
+        self.staging_dir.mkdir(parents=True, exist_ok=True)
+
+    # ------------------------------------------------------------------
+    # Publishing
+    # ------------------------------------------------------------------
+    def publish(
+        self,
+        models: Dict[str, Any],
+        weights: Dict[str, float],
+        metadata: Optional[Dict[str, Any]] = None,
+        artifacts: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        Store a trained ensemble as an immutable version
+
+        Args:
+            models: Ensemble members (xgb, rf, gaussian)
+            weights: R²-based ensemble weights
+            metadata: Extra info (metrics, training_rows, features, ...)
+            artifacts: file name → JSON-serializable object stored with the models
+                (part of the content hash, e.g. conformal.json)
+
+        Returns:
+            version id (first 12 hex chars of the content hash)
+        """
+        staging = self.staging_dir / uuid.uuid4().hex
+        staging.mkdir(parents=True)
+
+        try:
+            for name, model in models.items():
+                joblib.dump(model, staging / f"{name}_model.pkl")
+            pd.Series(weights).to_csv(staging / "model_weights.csv")
+            export_compact_models(models, staging / "compact")
+            for filename, content in (artifacts or {}).items():
+                with open(staging / filename, 'w') as f:
+                    json.dump(content, f, indent=2)
+
+            version = self._content_hash(staging)[:12]
+
+            meta = {
+                'version': version,
+                'created_at': datetime.now().isoformat(),
+                'members': list(models.keys()),
+                'weights': {k: float(v) for k, v in weights.items()},
+            }
+            meta.update(metadata or {})
+            with open(staging / "meta.json", 'w') as f:
+                json.dump(meta, f, indent=2, default=str)
+
+            target = self.versions_dir / version
+            if target.exists():
+                logger.info(f"📦 Version {version} already registered")
+                shutil.rmtree(staging)
+            else:
+                # Same filesystem → rename is atomic, readers never see half a version
+                os.rename(staging, target)
+                logger.info(f"📦 Registered model version {version}")
+            return version
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+    @staticmethod
+    def _content_hash(directory: Path) -> str:
+        """SHA-256 over all files (sorted by relative path)"""
+        digest = hashlib.sha256()
+        for path in sorted(p for p in directory.rglob("*") if p.is_file()):
+            digest.update(str(path.relative_to(directory)).encode())
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+        return digest.hexdigest()
+
+    # ------------------------------------------------------------------
+    # Promotion
+    # ------------------------------------------------------------------
+    def promote(self, version: str):
+        """Atomically point CURRENT at an existing version"""
+        if not (self.versions_dir / version / "meta.json").exists():
+            raise ValueError(f"Unknown model version: {version}")
+
+        tmp = self.root / f"CURRENT.{uuid.uuid4().hex}.tmp"
+        tmp.write_text(version)
+        os.replace(tmp, self.current_file)
+
+        with open(self.root / "history.csv", 'a') as f:
+            f.write(f"{datetime.now().isoformat()},{version}\n")
+        logger.info(f"🚀 Promoted model version {version}")
+
+    def rollback(self) -> str:
+        """Re-promote the version that was current before the present one"""
+        current = self.current_version()
+        try:
+            with open(self.root / "history.csv") as f:
+                promoted = [line.strip().split(',')[-1] for line in f if line.strip()]
+        except FileNotFoundError:
+            promoted = []
+        # Drop the trailing promotions of the current version, the one before is the target
+        while promoted and promoted[-1] == current:
+            promoted.pop()
+        if not promoted:
+            raise ValueError("No earlier promoted version to roll back to")
+        self.promote(promoted[-1])
+        return promoted[-1]
+
+    def current_version(self) -> Optional[str]:
+        """Version id CURRENT points to (None before the first promotion)"""
+        try:
+            return self.current_file.read_text().strip() or None
+        except FileNotFoundError:
+            return None
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+    def version_dir(self, version: Optional[str] = None) -> Path:
+        """Directory of a version (default: current)"""
+        version = version or self.current_version()
+        if version is None:
+            raise ValueError("No model version has been promoted yet")
+        return self.versions_dir / version
+
+    def metadata(self, version: Optional[str] = None) -> Dict[str, Any]:
+        with open(self.version_dir(version) / "meta.json") as f:
+            return json.load(f)
+
+    def list_versions(self) -> List[Dict[str, Any]]:
+        """All registered versions, oldest first"""
+        versions = []
+        for meta_path in self.versions_dir.glob("*/meta.json"):
+            with open(meta_path) as f:
+                versions.append(json.load(f))
+        return sorted(versions, key=lambda m: m.get('created_at', ''))
+
+
+class ModelHandle:
+    """
+    Holds the predictor for the promoted version and hot-swaps it
+
+    The request path only reads `handle.predictor` (a plain attribute).
+    A daemon thread watches CURRENT, builds the new predictor off the
+    request path and swaps the reference once it is fully loaded.
+    """
+
+    def __init__(
+        self,
+        registry: ModelRegistry,
+        loader: Callable[[Optional[Path]], Any],
+        poll_interval: float = 10.0
+    ):
+        """
+        Args:
+            registry: Registry to watch
+            loader: Builds a predictor from a version directory (None = legacy models/saved)
+            poll_interval: Seconds between CURRENT checks
+        """
+        self.registry = registry
+        self.loader = loader
+        self.poll_interval = poll_interval
+
+        self.version = registry.current_version()
+        self.predictor = None
+        try:
+            self.predictor = loader(registry.version_dir(self.version) if self.version else None)
+        except Exception as e:
+            # No predictor yet: the watcher retries the promoted version
+            logger.warning(f"⚠️ Failed to load model version {self.version}: {e}")
+            self.version = None
+
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._watch, name="model-reloader", daemon=True)
+        self._thread.start()
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            version = self.registry.current_version()
+            if version is None or version == self.version:
+                continue
+            try:
+                start = time.time()
+                predictor = self.loader(self.registry.version_dir(version))
+                self.predictor, self.version = predictor, version
+                logger.info(f"🔄 Hot-reloaded model version {version} in {time.time() - start:.2f}s")
+            except Exception as e:
+                logger.warning(f"⚠️ Failed to load model version {version}: {e}")
+
+    def stop(self):
+        self._stop.set()
+
+
+# ============================================
+# COMMAND LINE
+# ============================================
+if __name__ == "__main__":
+    import sys
+
+    registry = ModelRegistry()
+    command = sys.argv[1] if len(sys.argv) > 1 else "list"
+
+    if command == "promote" and len(sys.argv) > 2:
+        registry.promote(sys.argv[2])
+        print(f"✅ CURRENT → {sys.argv[2]}")
+    elif command == "rollback":
+        print(f"✅ CURRENT → {registry.rollback()}")
+    elif command == "current":
+        print(registry.current_version() or "none")
+    else:
+        current = registry.current_version()
+        for meta in registry.list_versions():
+            marker = "*" if meta['version'] == current else " "
+            metrics = meta.get('metrics', {}).get('ensemble', {})
+            print(f"{marker} {meta['version']}  {meta['created_at'][:19]}  "
+                  f"rows={meta.get('training_rows', 'N/A')}  R²={metrics.get('r2', float('nan')):.3f}")
@@ -4,28 +4,185 @@ Based on:
 - Al Ghamdi 2022: Ensemble architecture, 70/15/15 split
 - Bologna 2025: Heavy tails guide model selection
 - UvA 2025: Need to beat 0.65 baseline
+
+Ensemble weights come either from the single validation split or from
+K-fold estimation: the feature matrix is placed in shared memory once and
+fold × member fits run in parallel worker processes (models/parallel.py).
 """
 
+import json
 import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import pandas as pd
 from sklearn.ensemble import RandomForestRegressor
-from sklearn.model_selection import train_test_split
+from sklearn.metrics import r2_score
+from sklearn.model_selection import KFold, train_test_split
 import xgboost as xgb
+from .conformal import ConformalIntervals
 from .gaussian_model import GaussianInspiredModel
-from typing import Tuple, Dict, Any
+from .parallel import SharedArray, SharedArraySpec
+from typing import Tuple, Dict, Any, Optional
 
 logger = logging.getLogger(__name__)
 
+MEMBER_NAMES = ['xgb', 'rf', 'gaussian']
+
+# Research-validated member hyperparameters
+MEMBER_PARAMS: Dict[str, Dict[str, Any]] = {
+    # Model 1: XGBoost (Al Ghamdi's state-of-the-art baseline)
+    'xgb': {
+        'n_estimators': 100,
+        'max_depth': 3,                 # Shallow trees prevent overfitting
+        'learning_rate': 0.03,          # Slow learning for stability
+        'subsample': 0.7,               # Random sampling prevents overfitting
+        'colsample_bytree': 0.7,
+        'reg_alpha': 0.5,               # L1 regularization
+        'reg_lambda': 1.5,              # L2 regularization
+        'random_state': 42,
+    },
+    # Model 2: Random Forest (Al Ghamdi baseline)
+    'rf': {
+        'n_estimators': 100,
+        'max_depth': 10,
+        'random_state': 42,
+    },
+    # Model 3: Gaussian-inspired (Bologna 2025 - captures heavy tails)
+    'gaussian': {},
+}
+
+# Written by the successive-halving search (models/tuning.py)
+TUNED_PARAMS_PATH = "models/saved/tuned_params.json"
+
+
+def member_params(name: str, tuned_path: str = TUNED_PARAMS_PATH) -> Dict[str, Any]:
+    """MEMBER_PARAMS for a member with any tuned values merged on top"""
+    params = dict(MEMBER_PARAMS[name])
+    try:
+        with open(tuned_path) as f:
+            params.update(json.load(f).get(name, {}).get('params', {}))
+    except FileNotFoundError:
+        pass
+    except (json.JSONDecodeError, AttributeError) as e:
+        logger.warning(f"⚠️ Ignoring unreadable {tuned_path}: {e}")
+    return params
+
+
+def build_member(name: str, zone_matrix: Optional[pd.DataFrame] = None, n_jobs: Optional[int] = None,
+                 params: Optional[Dict[str, Any]] = None):
+    """
+    Construct an unfitted ensemble member
+
+    Args:
+        name: 'xgb', 'rf' or 'gaussian'
+        zone_matrix: Zone interaction matrix for the Gaussian model
+        n_jobs: Thread count for the tree members (1 inside worker processes)
+        params: Overrides on top of MEMBER_PARAMS (default: tuned_params.json)
+    """
+    params = {**MEMBER_PARAMS[name], **params} if params is not None else member_params(name)
+    if name == 'xgb':
+        if n_jobs is not None:
+            params['n_jobs'] = n_jobs
+        return xgb.XGBRegressor(**params)
+    if name == 'rf':
+        if n_jobs is not None:
+            params['n_jobs'] = n_jobs
+        return RandomForestRegressor(**params)
+    if name == 'gaussian':
+        return GaussianInspiredModel(zone_matrix)
+    raise ValueError(f"Unknown ensemble member: {name}")
+
+
+def fit_member(name: str, X: np.ndarray, y: np.ndarray,
+               zone_matrix: Optional[pd.DataFrame] = None, n_jobs: Optional[int] = None):
+    """Construct and fit one ensemble member"""
+    return build_member(name, zone_matrix, n_jobs=n_jobs).fit(X, y)
+
+
+def normalize_weights(scores: Dict[str, float]) -> Dict[str, float]:
+    """
+    Al Ghamdi 2022 WE weights: clip R² at 0 and normalize to sum 1
+    Falls back to equal weights when every member has R² ≤ 0.
+    """
+    weights = {name: max(0.0, float(score)) for name, score in scores.items()}
+    total = sum(weights.values())
+    if total > 0:
+        return {name: weight / total for name, weight in weights.items()}
+    return {name: 1.0 / len(weights) for name in weights}
+
+
+# ============================================
+# K-FOLD WORKERS (shared-memory feature matrix)
+# ============================================
+_WORKER: Dict[str, Any] = {}
+
+
+def _init_fold_worker(x_spec: SharedArraySpec, y_spec: SharedArraySpec, zone_matrix):
+    """Attach to the shared X / y once per worker process"""
+    _WORKER['X'] = SharedArray.attach(x_spec)
+    _WORKER['y'] = SharedArray.attach(y_spec)
+    _WORKER['zone_matrix'] = zone_matrix
+
+
+def _score_fold_member(name: str, fold: int, train_idx: np.ndarray, val_idx: np.ndarray) -> Tuple[str, int, float]:
+    """Fit one member on one fold's training rows and score it on the held-out rows"""
+    X, y = _WORKER['X'].array, _WORKER['y'].array
+    model = fit_member(name, X[train_idx], y[train_idx], _WORKER['zone_matrix'], n_jobs=1)
+    return name, fold, float(r2_score(y[val_idx], model.predict(X[val_idx])))
+
+
+def estimate_kfold_weights(
+    X: np.ndarray,
+    y: np.ndarray,
+    zone_matrix: Optional[pd.DataFrame] = None,
+    n_splits: int = 5,
+    n_jobs: Optional[int] = None,
+    random_state: int = 42,
+    members=MEMBER_NAMES,
+) -> Tuple[Dict[str, float], pd.DataFrame]:
+    """
+    Average the WE weights over K folds, fitting fold × member jobs in parallel
+
+    Returns:
+        weights: member → mean of the per-fold normalized weights
+        fold_scores: one row per (fold, member) with r2 and weight
+    """
+    folds = list(KFold(n_splits=n_splits, shuffle=True, random_state=random_state).split(X))
+    jobs = [(name, k, train_idx, val_idx) for k, (train_idx, val_idx) in enumerate(folds) for name in members]
+    n_jobs = max(1, min(n_jobs or os.cpu_count() or 1, len(jobs)))
+
+    with SharedArray.from_array(np.asarray(X, dtype=np.float32)) as shared_X, \
+         SharedArray.from_array(np.asarray(y, dtype=np.float32)) as shared_y:
+        with ProcessPoolExecutor(
+            max_workers=n_jobs,
+            initializer=_init_fold_worker,
+            initargs=(shared_X.spec, shared_y.spec, zone_matrix),
+        ) as pool:
+            results = list(pool.map(_score_fold_member, *zip(*jobs)))
+
+    fold_scores = pd.DataFrame(results, columns=['member', 'fold', 'r2'])
+    fold_scores['weight'] = 0.0
+    for k, fold_rows in fold_scores.groupby('fold'):
+        weights = normalize_weights(dict(zip(fold_rows['member'], fold_rows['r2'])))
+        fold_scores.loc[fold_rows.index, 'weight'] = fold_rows['member'].map(weights).to_numpy()
+
+    mean_weights = fold_scores.groupby('member')['weight'].mean()
+    weights = {name: float(mean_weights[name]) for name in members}
+    total = sum(weights.values())
+    weights = {name: w / total for name, w in weights.items()}
+    return weights, fold_scores
+
+
 class TrainingPipeline:
     """Training pipeline with research-validated parameters"""
-    
+
     # Type hints to help Pylance (these will be set by BasePredictor via inheritance)
     models: Dict[str, Any]
     weights: Dict[str, float]
     zone_matrix: pd.DataFrame
-    
-    def prepare_features(self) -> Tuple[pd.DataFrame, pd.Series]:
+
+    def prepare_features(self) -> Tuple[np.ndarray, np.ndarray]:
         """
         Prepare features for training.
         This method is inherited from BasePredictor.
@@ -34,77 +191,92 @@ class TrainingPipeline:
         # This method comes from BasePredictor via multiple inheritance
         # The actual implementation is in base_predictor.py
         raise NotImplementedError("This method should be called from BasePredictor")
-    
-    def train_ensemble(self) -> Tuple[pd.DataFrame, pd.Series]:
+
+    def train_ensemble(
+        self,
+        weight_folds: int = 0,
+        n_jobs: Optional[int] = None,
+        seed: int = 42,
+        member_threads: Optional[int] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
         """
         Train heterogeneous ensemble (Al Ghamdi 2022)
-        
+
         Research alignment:
         - Al Ghamdi: 70/15/15 split, weighted averaging
         - Bologna: Gaussian model captures heavy tails (gets highest weight)
         - UvA: External factors (time, peak) integrated in features
-        
+
+        The validation 15% is halved: one half scores the members for the
+        weights, the other calibrates the conformal intervals, so neither the
+        members nor the weights have seen the calibration rows.
+
+        Args:
+            weight_folds: If ≥ 2, derive the weights from K-fold estimation over
+                the train + weight-validation rows instead of the single weight
+                split. Only the weights are averaged over the folds: the served
+                members are still the ones fit on the training rows alone.
+            n_jobs: Worker processes for the K-fold jobs (default: all CPUs)
+            seed: Seed for the data split, the tree members and the K-fold split
+            member_threads: Threads per tree member (1 when runs share the machine)
+
         Returns:
-            X_test: Test features
+            X_test: Test features (float32 matrix, FEATURE_COLUMNS order)
             y_test: Test targets
         """
         X, y = self.prepare_features()
-        
+
         # Al Ghamdi 2022: 70% train, 15% validation, 15% test
         X_train, X_temp, y_train, y_temp = train_test_split(
-            X, y, test_size=0.3, random_state=42
+            X, y, test_size=0.3, random_state=seed
         )
         X_val, X_test, y_val, y_test = train_test_split(
-            X_temp, y_temp, test_size=0.5, random_state=42
-        )
-        
-        # Model 1: XGBoost (Al Ghamdi's state-of-the-art baseline)
-        logger.info("Training XGBoost with optimized parameters...")
-        xgb_model = xgb.XGBRegressor(
-            n_estimators=100,
-            max_depth=3,                    # Shallow trees prevent overfitting
-            learning_rate=0.03,              # Slow learning for stability
-            subsample=0.7,                  # Random sampling prevents overfitting
-            colsample_bytree=0.7,
-            reg_alpha=0.5,                  # L1 regularization
-            reg_lambda=1.5,                 # L2 regularization
-            random_state=42
+            X_temp, y_temp, test_size=0.5, random_state=seed
         )
-        xgb_model.fit(X_train, y_train)
-        self.models['xgb'] = xgb_model
-        self.weights['xgb'] = max(0.0, float(xgb_model.score(X_val, y_val)))
-        
-        # Model 2: Random Forest (Al Ghamdi baseline)
-        logger.info("Training Random Forest...")
-        rf_model = RandomForestRegressor(
-            n_estimators=100, 
-            max_depth=10, 
-            random_state=42
+        X_val, X_cal, y_val, y_cal = train_test_split(
+            X_val, y_val, test_size=0.5, random_state=seed
         )
-        rf_model.fit(X_train, y_train)
-        self.models['rf'] = rf_model
-        self.weights['rf'] = max(0.0, float(rf_model.score(X_val, y_val)))
-        
-        # Model 3: Gaussian-inspired (Bologna 2025 - captures heavy tails)
-        logger.info("Training Gaussian-inspired model (Bologna 2025)...")
-        self.models['gaussian'] = GaussianInspiredModel(self.zone_matrix)
-        self.models['gaussian'].fit(X_train, y_train)
-        self.weights['gaussian'] = max(0.0, float(self.models['gaussian'].score(X_val, y_val)))
-        
-        # Al Ghamdi 2022: Normalize weights for ensemble
-        total = sum(self.weights.values())
-        if total > 0:
-            for name in self.weights:
-                self.weights[name] /= total
+
+        scores = {}
+        val_predictions = {}
+        cal_predictions = {}
+        self.seed = seed
+        self.trained_params = {}
+        for name, label in [('xgb', "XGBoost with optimized parameters"),
+                            ('rf', "Random Forest"),
+                            ('gaussian', "Gaussian-inspired model (Bologna 2025)")]:
+            logger.info(f"Training {label}...")
+            params = member_params(name)
+            if 'random_state' in params:
+                params['random_state'] = seed
+            self.trained_params[name] = params
+            self.models[name] = build_member(name, self.zone_matrix, n_jobs=member_threads, params=params).fit(X_train, y_train)
+            val_predictions[name] = np.asarray(self.models[name].predict(X_val)).ravel()
+            cal_predictions[name] = np.asarray(self.models[name].predict(X_cal)).ravel()
+            scores[name] = float(r2_score(y_val, val_predictions[name]))
+
+        if weight_folds and weight_folds >= 2:
+            # K-fold weights over every non-test row (stable across runs)
+            logger.info(f"Estimating ensemble weights with {weight_folds}-fold CV...")
+            self.weights, self.weight_fold_scores = estimate_kfold_weights(
+                np.concatenate([X_train, X_val]), np.concatenate([y_train, y_val]),
+                self.zone_matrix, n_splits=weight_folds, n_jobs=n_jobs, random_state=seed,
+            )
+            spread = self.weight_fold_scores.groupby('member')['weight'].std()
+            logger.info(f"   Weight std across folds: {spread.round(3).to_dict()}")
         else:
-            # Fallback: equal weights when all models fail (rare, but safe)
-            n = len(self.weights)
-            for name in self.weights:
-                self.weights[name] = 1.0 / n
-            logger.warning("⚠️ All models had R² ≤ 0, using equal weights")
-        
+            # Al Ghamdi 2022: Normalize weights for ensemble
+            self.weights = normalize_weights(scores)
+            if all(score <= 0 for score in scores.values()):
+                # Fallback: equal weights when all models fail (rare, but safe)
+                logger.warning("⚠️ All models had R² ≤ 0, using equal weights")
+
+        # Split-conformal calibration on rows that fit neither the members nor the weights
+        cal_predictions['ensemble'] = sum(self.weights[name] * cal_predictions[name] for name in self.weights)
+        self.conformal = ConformalIntervals.fit(X_cal, y_cal, cal_predictions)
+
         logger.info(f"\n🔢 Ensemble weights (Al Ghamdi WE method): {self.weights}")
         gaussian_weight = self.weights.get('gaussian', 0)
         logger.info(f"   Gaussian dominance ({gaussian_weight:.1%}) confirms Bologna heavy tails")
-        
-        return X_test, y_test
\ No newline at end of file
+
+        return X_test, y_test
@@ -0,0 +1,262 @@
+"""
+Successive-halving hyperparameter search for the tree ensemble members
+Replaces hand-editing the constants in training_pipeline.py:
+- random configurations from a per-member search space
+- rung r trains every surviving configuration on a row subsample
+  (eta^-(R-r) of the training rows), keeps the best 1/eta for the next rung
+- trials run across a process pool against the cached feature matrix,
+  shared once through multiprocessing.shared_memory (models/parallel.py)
+- every finished trial is appended to a JSONL log, so an interrupted search
+  resumes by skipping the (config, budget) pairs it has already scored
+
+The best configuration per member is written to models/saved/tuned_params.json,
+which build_member() merges over MEMBER_PARAMS.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from sklearn.metrics import r2_score
+from sklearn.model_selection import train_test_split
+
+from .parallel import SharedArray, SharedArraySpec
+from .training_pipeline import TUNED_PARAMS_PATH, build_member
+
+logger = logging.getLogger(__name__)
+
+TUNING_DIR = "models/saved/tuning"
+MIN_TRIAL_ROWS = 50
+
+
+def _int_uniform(low: int, high: int) -> Callable[[np.random.Generator], int]:
+    return lambda rng: int(rng.integers(low, high + 1))
+
+
+def _log_uniform(low: float, high: float) -> Callable[[np.random.Generator], float]:
+    return lambda rng: float(round(math.exp(rng.uniform(math.log(low), math.log(high))), 5))
+
+
+def _uniform(low: float, high: float) -> Callable[[np.random.Generator], float]:
+    return lambda rng: float(round(rng.uniform(low, high), 3))
+
+
+def _choice(options: List[Any]) -> Callable[[np.random.Generator], Any]:
+    return lambda rng: options[int(rng.integers(len(options)))]
+
+
+# Fixed seeds stay out of the space: they come from MEMBER_PARAMS
+SEARCH_SPACES: Dict[str, Dict[str, Callable[[np.random.Generator], Any]]] = {
+    'xgb': {
+        'n_estimators': _int_uniform(50, 400),
+        'max_depth': _int_uniform(2, 8),
+        'learning_rate': _log_uniform(0.01, 0.3),
+        'subsample': _uniform(0.5, 1.0),
+        'colsample_bytree': _uniform(0.5, 1.0),
+        'min_child_weight': _int_uniform(1, 10),
+        'reg_alpha': _log_uniform(1e-3, 5.0),
+        'reg_lambda': _log_uniform(0.1, 10.0),
+    },
+    'rf': {
+        'n_estimators': _int_uniform(50, 400),
+        'max_depth': _int_uniform(3, 20),
+        'min_samples_leaf': _int_uniform(1, 20),
+        'max_features': _choice([1.0, 0.7, 0.5, 'sqrt']),
+    },
+}
+
+
+def sample_configs(member: str, n_configs: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """Draw n_configs configurations (deterministic for a given seed)"""
+    rng = np.random.default_rng(seed)
+    space = SEARCH_SPACES[member]
+    return [{name: sample(rng) for name, sample in space.items()} for _ in range(n_configs)]
+
+
+def config_id(params: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()[:10]
+
+
+def data_key(*arrays: np.ndarray) -> str:
+    """Fingerprint of the tuning data (trials are only reused on identical data)"""
+    digest = hashlib.sha256()
+    for array in arrays:
+        digest.update(str(array.shape).encode())
+        digest.update(np.ascontiguousarray(array).tobytes())
+    return digest.hexdigest()[:12]
+
+
+# ============================================
+# TRIAL WORKERS (shared-memory feature matrix)
+# ============================================
+_WORKER: Dict[str, Any] = {}
+
+
+def _init_trial_worker(specs: Dict[str, SharedArraySpec]):
+    """Attach to the shared train / validation arrays once per worker process"""
+    for key, spec in specs.items():
+        _WORKER[key] = SharedArray.attach(spec)
+
+
+def _run_trial(member: str, params: Dict[str, Any], n_rows: int, seed: int) -> Tuple[str, int, float, float]:
+    """Fit one configuration on a row subsample and score it on the full validation rows"""
+    start = datetime.now()
+    X_train, y_train = _WORKER['X_train'].array, _WORKER['y_train'].array
+    X_val, y_val = _WORKER['X_val'].array, _WORKER['y_val'].array
+
+    rows = np.sort(np.random.default_rng(seed).permutation(len(X_train))[:n_rows])
+    model = build_member(member, n_jobs=1, params=params).fit(X_train[rows], y_train[rows])
+    score = float(r2_score(y_val, model.predict(X_val)))
+    return config_id(params), n_rows, score, (datetime.now() - start).total_seconds()
+
+
+class SuccessiveHalvingSearch:
+    """
+    Successive halving over random configurations of one ensemble member
+
+    With n_configs=27 and eta=3 the rungs train 27 configs on 1/9 of the rows,
+    9 on 1/3 and the best 3 on all training rows.
+    """
+
+    def __init__(
+        self,
+        member: str,
+        n_configs: int = 27,
+        eta: int = 3,
+        workers: Optional[int] = None,
+        seed: int = 42,
+        trials_dir: str = TUNING_DIR,
+    ):
+        if member not in SEARCH_SPACES:
+            raise ValueError(f"No search space for member '{member}' (choose from {list(SEARCH_SPACES)})")
+        self.member = member
+        self.n_configs = n_configs
+        self.eta = eta
+        self.workers = workers or os.cpu_count() or 1
+        self.seed = seed
+        self.trials_path = Path(trials_dir) / f"{member}_trials.jsonl"
+
+    def _load_trials(self, key: str) -> Dict[Tuple[str, int], float]:
+        """Scores of trials already finished on the same data"""
+        done = {}
+        if not self.trials_path.exists():
+            return done
+        with open(self.trials_path) as f:
+            for line in f:
+                try:
+                    trial = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # partially written last line of an interrupted run
+                if trial.get('data') == key:
+                    done[(trial['config_id'], trial['n_rows'])] = trial['val_r2']
+        return done
+
+    def _rung_rows(self, n_train: int) -> List[int]:
+        n_rungs = int(math.floor(math.log(self.n_configs, self.eta) + 1e-9)) + 1
+        return [
+            min(n_train, max(MIN_TRIAL_ROWS, int(n_train * self.eta ** (rung - (n_rungs - 1)))))
+            for rung in range(n_rungs)
+        ]
+
+    def run(self, X_train: np.ndarray, y_train: np.ndarray, X_val: np.ndarray, y_val: np.ndarray) -> Dict[str, Any]:
+        """
+        Run (or resume) the search
+
+        Returns:
+            {'params', 'val_r2', 'n_rows', 'n_trials'} of the best configuration on the last rung
+        """
+        key = data_key(X_train, y_train, X_val, y_val)
+        done = self._load_trials(key)
+        self.trials_path.parent.mkdir(parents=True, exist_ok=True)
+
+        configs = {config_id(params): params for params in sample_configs(self.member, self.n_configs, self.seed)}
+        survivors = list(configs)
+        arrays = {'X_train': X_train, 'y_train': y_train, 'X_val': X_val, 'y_val': y_val}
+        shared = {name: SharedArray.from_array(np.asarray(a, dtype=np.float32)) for name, a in arrays.items()}
+        n_trials = 0
+
+        try:
+            with ProcessPoolExecutor(
+                max_workers=min(self.workers, len(survivors)),
+                initializer=_init_trial_worker,
+                initargs=({name: s.spec for name, s in shared.items()},),
+            ) as pool, open(self.trials_path, 'a') as log:
+                for rung, n_rows in enumerate(self._rung_rows(len(X_train))):
+                    pending = [cid for cid in survivors if (cid, n_rows) not in done]
+                    logger.info(f"🔍 {self.member} rung {rung}: {len(survivors)} configs on {n_rows} rows "
+                                f"({len(survivors) - len(pending)} resumed)")
+
+                    futures = [pool.submit(_run_trial, self.member, configs[cid], n_rows, self.seed)
+                               for cid in pending]
+                    for future in as_completed(futures):
+                        cid, rows, score, seconds = future.result()
+                        done[(cid, rows)] = score
+                        n_trials += 1
+                        log.write(json.dumps({
+                            'config_id': cid, 'member': self.member, 'rung': rung, 'n_rows': rows,
+                            'val_r2': score, 'seconds': round(seconds, 3), 'data': key,
+                            'params': configs[cid], 'finished': datetime.now().isoformat(timespec='seconds'),
+                        }) + "\n")
+                        log.flush()
+
+                    ranked = sorted(survivors, key=lambda cid: done[(cid, n_rows)], reverse=True)
+                    survivors = ranked[:max(1, len(ranked) // self.eta)]
+        finally:
+            for s in shared.values():
+                s.close()
+
+        best = ranked[0]
+        result = {'params': configs[best], 'val_r2': done[(best, n_rows)], 'n_rows': n_rows, 'n_trials': n_trials}
+        logger.info(f"🏆 Best {self.member}: R²={result['val_r2']:.3f} {result['params']}")
+        return result
+
+
+def save_tuned_params(results: Dict[str, Dict[str, Any]], path: str = TUNED_PARAMS_PATH):
+    """Merge the best configuration per member into tuned_params.json (atomic replace)"""
+    path = Path(path)
+    tuned = json.loads(path.read_text()) if path.exists() else {}
+    for member, result in results.items():
+        tuned[member] = {
+            'params': result['params'],
+            'val_r2': result['val_r2'],
+            'tuned_at': datetime.now().isoformat(timespec='seconds'),
+        }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(tuned, indent=2))
+    os.replace(tmp, path)
+    logger.info(f"💾 Saved tuned parameters → {path}")
+
+
+def tune_members(
+    members: List[str] = ('xgb', 'rf'),
+    n_configs: int = 27,
+    eta: int = 3,
+    workers: Optional[int] = None,
+    seed: int = 42,
+    use_real_data: bool = False,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Tune the given members on the training pipeline's train / validation split
+    (the test rows are never seen) and save the winners to tuned_params.json
+    """
+    from .base_predictor import BasePredictor
+
+    X, y = BasePredictor(use_real_data=use_real_data).prepare_features()
+    # Same 70/15/15 split and seed as TrainingPipeline.train_ensemble
+    X_train, X_temp, y_train, y_temp = train_test_split(X, y, test_size=0.3, random_state=42)
+    X_val, _, y_val, _ = train_test_split(X_temp, y_temp, test_size=0.5, random_state=42)
+
+    results = {}
+    for member in members:
+        search = SuccessiveHalvingSearch(member, n_configs=n_configs, eta=eta, workers=workers, seed=seed)
+        results[member] = search.run(X_train, y_train, X_val, y_val)
+    save_tuned_params(results)
+    return results
@@ -0,0 +1,6 @@
+"""
+Prediction serving for Metrodorf
+Shared, micro-batched access to the delay ensemble
+"""
+
+from .service import PredictionClient, PredictionService
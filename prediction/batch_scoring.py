@@ -0,0 +1,179 @@
+"""
+Streaming batch scoring for large journey files
+- Reads CSV (or Parquet, if pyarrow is installed) in fixed-size chunks
+- Scores chunks in a multiprocessing pool; each worker loads the ensemble once
+  (compact trees where exported, single-threaded members, no explanation grid)
+- Each distinct journey in a chunk is scored once
+- Keeps a bounded number of chunks in flight (bounded memory for any file size)
+- Writes results incrementally, in input order, with a throughput report
+
+Used by `python main.py score <input> <output>`.
+"""
+
+import logging
+import os
+import time
+from collections import deque
+from multiprocessing import Pool
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Accept both the journey names (predict_delay) and the training-data names
+COLUMN_ALIASES = {
+    'distance': ['distance', 'distance_km'],
+    'time_of_day': ['time_of_day', 'hour'],
+    'day_of_week': ['day_of_week'],
+    'is_peak': ['is_peak', 'is_peak_hour'],
+    'is_cologne': ['is_cologne', 'is_cologne_bottleneck'],
+}
+
+_PREDICTOR = None  # per-worker ensemble, set by _init_worker
+
+
+def _init_worker(version_dir: Optional[str]):
+    """Load the ensemble once per worker process (one thread per member: the pool is the parallelism)"""
+    global _PREDICTOR
+    from prediction.service import load_served_ensemble
+
+    _PREDICTOR = load_served_ensemble(Path(version_dir) if version_dir else None, explanations=False, threads=1)
+
+
+def _score_columns(columns: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    Worker task: one vectorized ensemble predict per chunk
+
+    Journey inputs repeat a lot (hour, weekday, flags and station distances
+    are discrete), so each distinct input row is scored once and the result
+    is scattered back to every row that has it.
+    """
+    base = np.column_stack([columns[field] for field in COLUMN_ALIASES])
+    unique, inverse = np.unique(base, axis=0, return_inverse=True)
+    features = _PREDICTOR.build_journey_features(*unique.T)
+    return _PREDICTOR.predict_ensemble(features).astype(np.float32)[inverse.ravel()]
+
+
+def resolve_columns(columns) -> Dict[str, str]:
+    """Map each journey field to the column name used in the input file"""
+    mapping = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        match = next((c for c in aliases if c in columns), None)
+        if match is None:
+            raise ValueError(f"Input is missing a '{field}' column (accepted: {aliases})")
+        mapping[field] = match
+    return mapping
+
+
+def iter_chunks(path: Path, chunksize: int) -> Iterator[pd.DataFrame]:
+    """Stream an input file in chunks"""
+    if path.suffix in ('.parquet', '.pq'):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet input needs pyarrow (pip install pyarrow)")
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize)
+
+
+class ChunkWriter:
+    """Appends scored chunks to CSV or Parquet"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._parquet = path.suffix in ('.parquet', '.pq')
+        self._writer = None
+        self._first = True
+
+    def write(self, chunk: pd.DataFrame):
+        if self._parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table)
+        else:
+            chunk.to_csv(self.path, mode='w' if self._first else 'a', header=self._first, index=False)
+        self._first = False
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def score_file(
+    input_path: str,
+    output_path: str,
+    chunksize: int = 100_000,
+    workers: Optional[int] = None,
+    version: Optional[str] = None,
+    report_every: float = 5.0
+) -> Dict[str, float]:
+    """
+    Score every journey in input_path and write input + predicted_delay to output_path
+
+    Args:
+        input_path: CSV or Parquet file with journey columns
+        output_path: CSV or Parquet destination
+        chunksize: Rows per chunk (memory ≈ (workers * 2 + 1) chunks)
+        workers: Worker processes (default: all cores)
+        version: Registry model version (default: promoted version, else models/saved)
+        report_every: Seconds between progress reports
+
+    Returns:
+        dict with rows, seconds, rows_per_s
+    """
+    from models.registry import ModelRegistry
+
+    workers = workers or os.cpu_count() or 1
+    registry = ModelRegistry()
+    version = version or registry.current_version()
+    version_dir = str(registry.version_dir(version)) if version else None
+
+    max_in_flight = workers * 2
+    writer = ChunkWriter(Path(output_path))
+    in_flight = deque()
+    rows = 0
+    start = last_report = time.time()
+
+    def drain_one():
+        nonlocal rows, last_report
+        chunk, result = in_flight.popleft()
+        chunk['predicted_delay'] = result.get()
+        writer.write(chunk)
+        rows += len(chunk)
+        now = time.time()
+        if now - last_report >= report_every:
+            logger.info(f"⏱️ {rows:,} rows scored ({rows / (now - start):,.0f} rows/s)")
+            last_report = now
+
+    logger.info(f"🚆 Scoring {input_path} with {workers} workers (model {version or 'models/saved'})")
+    mapping = None
+    try:
+        with Pool(workers, initializer=_init_worker, initargs=(version_dir,)) as pool:
+            for chunk in iter_chunks(Path(input_path), chunksize):
+                mapping = mapping or resolve_columns(chunk.columns)
+                columns = {field: chunk[col].to_numpy(dtype=float) for field, col in mapping.items()}
+                in_flight.append((chunk, pool.apply_async(_score_columns, (columns,))))
+
+                # Bounded pipeline: never read ahead more than max_in_flight chunks
+                while len(in_flight) >= max_in_flight:
+                    drain_one()
+
+            while in_flight:
+                drain_one()
+    finally:
+        writer.close()
+
+    elapsed = time.time() - start
+    summary = {'rows': rows, 'seconds': round(elapsed, 2), 'rows_per_s': round(rows / elapsed, 1) if elapsed else 0.0}
+    logger.info(f"✅ Scored {rows:,} rows in {elapsed:.1f}s ({summary['rows_per_s']:,.0f} rows/s) → {output_path}")
+    return summary
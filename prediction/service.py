@@ -0,0 +1,453 @@
+"""
+Local prediction service for Metrodorf
+Shares one ensemble (Al Ghamdi 2022 WE) between all dashboard sessions and batch jobs:
+- HTTP (TCP) or Unix-socket transport, stdlib only
+- Concurrent requests are coalesced into micro-batches (a few ms window)
+- One vectorized predict per batch, results fanned back out
+- Model access goes through the registry ModelHandle (hot reload, no locks on the request path)
+- Latency / throughput / batch-size metrics at GET /metrics
+
+Usage:
+    python -m prediction.service --port 8600
+    python -m prediction.service --unix /tmp/metrodorf.sock
+"""
+
+import argparse
+import http.client
+import json
+import logging
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+JOURNEY_FIELDS = ['distance', 'time_of_day', 'day_of_week', 'is_peak', 'is_cologne']
+
+
+class ServiceMetrics:
+    """Thread-safe request counters and latency percentiles"""
+
+    def __init__(self, window: int = 10000):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.requests = 0
+        self.rows = 0
+        self.batches = 0
+        self.errors = 0
+        self.max_batch_rows = 0
+        self._latencies = deque(maxlen=window)   # seconds, per request
+        self._batch_rows = deque(maxlen=window)
+
+    def record_request(self, latency: float, rows: int, ok: bool = True):
+        with self._lock:
+            self.requests += 1
+            self.rows += rows
+            self.errors += 0 if ok else 1
+            self._latencies.append(latency)
+
+    def record_batch(self, rows: int):
+        with self._lock:
+            self.batches += 1
+            self.max_batch_rows = max(self.max_batch_rows, rows)
+            self._batch_rows.append(rows)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = np.array(self._latencies) * 1000
+            batch_rows = np.array(self._batch_rows)
+            uptime = time.time() - self.started
+            p50, p95, p99 = (np.percentile(latencies, [50, 95, 99]) if len(latencies) else (0.0, 0.0, 0.0))
+            return {
+                'uptime_s': round(uptime, 1),
+                'requests': self.requests,
+                'rows': self.rows,
+                'batches': self.batches,
+                'errors': self.errors,
+                'requests_per_s': round(self.requests / uptime, 2) if uptime else 0.0,
+                'rows_per_s': round(self.rows / uptime, 2) if uptime else 0.0,
+                'mean_batch_rows': round(float(batch_rows.mean()), 2) if len(batch_rows) else 0.0,
+                'max_batch_rows': self.max_batch_rows,
+                'latency_ms': {'p50': round(float(p50), 3), 'p95': round(float(p95), 3), 'p99': round(float(p99), 3)},
+            }
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent predict requests into one vectorized call
+
+    A single worker thread owns the model call, so the ensemble is never
+    used from two threads at once. Each request waits at most max_wait_ms
+    for other requests to join its batch. Every request names the model it
+    was submitted with; requests holding different models (a hot reload in
+    between) are never mixed in one call.
+    """
+
+    def __init__(
+        self,
+        predict_fn: Callable[[Dict[str, np.ndarray], Any], np.ndarray],
+        max_batch: int = 512,
+        max_wait_ms: float = 3.0,
+        metrics: Optional[ServiceMetrics] = None
+    ):
+        self.predict_fn = predict_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.metrics = metrics or ServiceMetrics()
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, columns: Dict[str, np.ndarray], model: Any = None) -> Future:
+        """Queue journeys (dict of equal-length arrays); resolves to an array of delays"""
+        future: Future = Future()
+        self._queue.put((columns, future, model))
+        return future
+
+    def predict(self, columns: Dict[str, np.ndarray], model: Any = None, timeout: float = 10.0) -> np.ndarray:
+        return self.submit(columns, model).result(timeout=timeout)
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            pending = [first]
+            n_rows = len(first[0]['distance'])
+            deadline = time.monotonic() + self.max_wait
+
+            # Collect until the batch is full or the wait window closes
+            while n_rows < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                pending.append(item)
+                n_rows += len(item[0]['distance'])
+
+            # One call per model (normally a single group)
+            groups: Dict[int, List] = {}
+            for item in pending:
+                groups.setdefault(id(item[2]), []).append(item)
+            for group in groups.values():
+                self._run_batch(group, sum(len(cols['distance']) for cols, _, _ in group))
+
+    def _run_batch(self, pending: List, n_rows: int):
+        try:
+            columns = {
+                field: np.concatenate([cols[field] for cols, _, _ in pending])
+                for field in JOURNEY_FIELDS
+            }
+            predictions = self.predict_fn(columns, pending[0][2])
+        except Exception as e:
+            for _, future, _ in pending:
+                future.set_exception(e)
+            return
+
+        self.metrics.record_batch(n_rows)
+        offset = 0
+        for cols, future, _ in pending:
+            size = len(cols['distance'])
+            future.set_result(predictions[offset:offset + size])
+            offset += size
+
+
+def journeys_to_columns(journeys: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """Turn a list of journey dicts into column arrays (validates required fields)"""
+    missing = [f for f in JOURNEY_FIELDS if journeys and f not in journeys[0]]
+    if missing:
+        raise ValueError(f"Missing journey fields: {missing}")
+    return {field: np.array([j[field] for j in journeys], dtype=float) for field in JOURNEY_FIELDS}
+
+
+def load_served_ensemble(version_dir: Optional[Path] = None, explanations: bool = True,
+                         threads: Optional[int] = None):
+    """
+    Load all weighted ensemble members (compact trees where exported) for serving
+
+    Args:
+        explanations: Precompute the explanation grid (batch scoring never explains)
+        threads: Threads per pickled tree member (1 inside worker processes)
+    """
+    from models.delay_predictor import DelayPredictor
+    from models.explanations import ExplanationGrid
+
+    predictor = DelayPredictor(load_data=False, use_real_data=False)
+    predictor.load_models(prefer_compact=True, model_dir=version_dir or "models/saved")
+    # Keep only members that contribute (a zero weight would still cost a full predict)
+    predictor.models = {k: m for k, m in predictor.models.items() if predictor.weights.get(k, 0) > 0}
+    if threads is not None:
+        for model in predictor.models.values():
+            if hasattr(model, 'get_booster'):
+                model.get_booster().set_param({'nthread': threads})
+            if hasattr(model, 'n_jobs'):
+                model.n_jobs = threads
+    # Explanations of exactly the served ensemble (dashboard grid, cached per version)
+    if explanations:
+        predictor.explanations = ExplanationGrid.for_version(predictor, Path(version_dir).name if version_dir else None)
+    return predictor
+
+
+class PredictionService:
+    """Wires the model handle, micro-batcher and metrics together"""
+
+    def __init__(self, max_batch: int = 512, max_wait_ms: float = 3.0, poll_interval: float = 10.0):
+        from models.registry import ModelRegistry, ModelHandle
+
+        self.handle = ModelHandle(ModelRegistry(), load_served_ensemble, poll_interval=poll_interval)
+        self.metrics = ServiceMetrics()
+        self.batcher = MicroBatcher(self._predict_columns, max_batch, max_wait_ms, self.metrics)
+
+    def _predict_columns(self, columns: Dict[str, np.ndarray], predictor=None) -> np.ndarray:
+        predictor = predictor or self.handle.predictor
+        features = predictor.build_journey_features(
+            columns['distance'], columns['time_of_day'], columns['day_of_week'],
+            columns['is_peak'], columns['is_cologne']
+        )
+        return predictor.predict_ensemble(features)
+
+    def predict(self, journeys: List[Dict[str, Any]]) -> List[float]:
+        return self.predict_with_intervals(journeys)['predictions']
+
+    def predict_with_intervals(self, journeys: List[Dict[str, Any]], confidence: Optional[float] = None,
+                               explain: bool = False) -> Dict[str, Any]:
+        """
+        Point predictions, plus conformal bounds when a confidence level is given
+        (a table lookup per journey on the request thread, no extra model calls)
+        and per-input explanations of the same model when `explain` is set
+        """
+        start = time.perf_counter()
+        # One model snapshot per request: points and bounds never mix two versions
+        predictor = self.handle.predictor
+        try:
+            columns = journeys_to_columns(journeys)
+            predictions = self.batcher.predict(columns, predictor)
+        except Exception:
+            self.metrics.record_request(time.perf_counter() - start, len(journeys), ok=False)
+            raise
+        result = {'predictions': [float(p) for p in predictions]}
+        if confidence is not None:
+            half_width = predictor.interval_half_width(
+                columns['is_peak'], columns['is_cologne'], columns['time_of_day'], confidence
+            )
+            if half_width is not None:
+                result['lower'] = [float(v) for v in predictions - half_width]
+                result['upper'] = [float(v) for v in predictions + half_width]
+        if explain:
+            result['explanations'] = [
+                predictor.explain_delay(*(columns[field][i] for field in JOURNEY_FIELDS))
+                for i in range(len(predictions))
+            ]
+        self.metrics.record_request(time.perf_counter() - start, len(journeys))
+        return result
+
+
+def make_handler(service: PredictionService):
+    """HTTP handler bound to a service instance"""
+
+    class PredictionHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive for repeated dashboard calls
+
+        def address_string(self):
+            # Unix sockets have no (host, port) client address
+            return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+        def _send_json(self, status: int, payload: Dict[str, Any]):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/metrics":
+                self._send_json(200, service.metrics.snapshot())
+            elif self.path == "/health":
+                self._send_json(200, {'status': 'ok', 'model_version': service.handle.version})
+            else:
+                self._send_json(404, {'error': 'not found'})
+
+        def do_POST(self):
+            if self.path != "/predict":
+                self._send_json(404, {'error': 'not found'})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                journeys = payload.get('journeys') or [payload]
+                confidence = payload.get('confidence')
+                result = service.predict_with_intervals(journeys, float(confidence) if confidence else None,
+                                                        explain=bool(payload.get('explain')))
+                self._send_json(200, {**result, 'model_version': service.handle.version})
+            except (ValueError, KeyError) as e:
+                self._send_json(400, {'error': str(e)})
+            except Exception as e:
+                logger.error(f"Prediction failed: {e}")
+                self._send_json(500, {'error': str(e)})
+
+    return PredictionHandler
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = 128  # many sessions connect at once
+
+
+class ThreadingTCPHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+def serve(port: int = 8600, unix_socket: Optional[str] = None, **service_kwargs):
+    """Run the service until interrupted"""
+    service = PredictionService(**service_kwargs)
+    handler = make_handler(service)
+
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            os.unlink(unix_socket)
+        server = ThreadingUnixHTTPServer(unix_socket, handler)
+        logger.info(f"🚀 Prediction service listening on unix:{unix_socket}")
+    else:
+        server = ThreadingTCPHTTPServer(("127.0.0.1", port), handler)
+        logger.info(f"🚀 Prediction service listening on http://127.0.0.1:{port}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("🛑 Shutting down prediction service")
+    finally:
+        server.server_close()
+        if unix_socket and os.path.exists(unix_socket):
+            os.unlink(unix_socket)
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self.unix_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_path)
+
+
+class PredictionClient:
+    """
+    Thin client used by the dashboard
+    url: http://127.0.0.1:8600 or unix:///tmp/metrodorf.sock
+    """
+
+    def __init__(self, url: str, timeout: float = 5.0):
+        self.url = url
+        self.timeout = timeout
+        self._local = threading.local()  # one keep-alive connection per thread
+
+    def _connection(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            parsed = urlparse(self.url)
+            if parsed.scheme == "unix":
+                conn = _UnixHTTPConnection(parsed.path, self.timeout)
+            else:
+                conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def _request(self, method: str, path: str, payload: Optional[Dict] = None) -> Dict[str, Any]:
+        body = json.dumps(payload).encode() if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body else {}
+        for attempt in range(2):  # retry once on a stale keep-alive connection
+            conn = self._connection()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                data = json.loads(response.read())
+                if response.status != 200:
+                    raise RuntimeError(f"Prediction service returned {response.status}: {data.get('error')}")
+                return data
+            except (ConnectionError, http.client.HTTPException, OSError):
+                conn.close()
+                self._local.conn = None
+                if attempt == 1:
+                    raise
+        return {}
+
+    def predict(self, journeys: List[Dict[str, Any]]) -> List[float]:
+        return self._request("POST", "/predict", {'journeys': journeys})['predictions']
+
+    def predict_delay(self, distance, time_of_day, day_of_week, is_peak, is_cologne) -> float:
+        """Same signature as EnsembleMethods.predict_delay"""
+        return self.predict([{
+            'distance': distance, 'time_of_day': time_of_day, 'day_of_week': day_of_week,
+            'is_peak': int(is_peak), 'is_cologne': int(is_cologne)
+        }])[0]
+
+    def predict_delay_with_ci(self, distance, time_of_day, day_of_week, is_peak, is_cologne,
+                              confidence_level: float = 0.95):
+        """Same signature as EnsembleMethods.predict_delay_with_ci (bounds are None without calibration)"""
+        result = self.predict_journey(distance, time_of_day, day_of_week, is_peak, is_cologne, confidence_level)
+        return result['prediction'], result['lower'], result['upper']
+
+    def predict_journey(self, distance, time_of_day, day_of_week, is_peak, is_cologne,
+                        confidence_level: Optional[float] = None, explain: bool = False) -> Dict[str, Any]:
+        """
+        Prediction, conformal bounds and explanation for one journey in a single request,
+        so all of them come from the same model version
+
+        Returns:
+            {'prediction', 'lower', 'upper', 'explanation', 'model_version'} (None where unavailable)
+        """
+        payload = {'journeys': [{
+            'distance': distance, 'time_of_day': time_of_day, 'day_of_week': day_of_week,
+            'is_peak': int(is_peak), 'is_cologne': int(is_cologne)
+        }]}
+        if confidence_level is not None:
+            payload['confidence'] = confidence_level
+        if explain:
+            payload['explain'] = True
+        result = self._request("POST", "/predict", payload)
+        return {
+            'prediction': result['predictions'][0],
+            'lower': result['lower'][0] if 'lower' in result else None,
+            'upper': result['upper'][0] if 'upper' in result else None,
+            'explanation': result['explanations'][0] if 'explanations' in result else None,
+            'model_version': result.get('model_version'),
+        }
+
+    def health(self) -> Dict[str, Any]:
+        """Service status and the model version it serves"""
+        return self._request("GET", "/health")
+
+    def metrics(self) -> Dict[str, Any]:
+        return self._request("GET", "/metrics")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Metrodorf local prediction service")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--unix", help="Serve on a Unix socket instead of TCP")
+    parser.add_argument("--max-batch", type=int, default=512, help="Max rows per micro-batch")
+    parser.add_argument("--max-wait-ms", type=float, default=3.0, help="Batching window in ms")
+    args = parser.parse_args()
+
+    serve(port=args.port, unix_socket=args.unix, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms)
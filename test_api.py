@@ -1,7 +1,9 @@
 import requests
 
+from data.api_config import api_base
+
 # Test different possible endpoints
-base_url = "https://v6.db.transport.rest"
+base_url = api_base('v6')  # METRODORF_API_URL=http://127.0.0.1:8700 for the local emulator
 test_endpoints = [
     "/stops?query=Dortmund",
     "/locations?query=Dortmund", 
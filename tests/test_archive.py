@@ -0,0 +1,113 @@
+"""Record / replay archive: responses, failures and bodies survive the round trip"""
+
+import gzip
+import json
+import socket
+
+import pytest
+import requests
+
+from data import archive
+from data.archive import (RecordingAdapter, ReplayAdapter, ReplayArchive, _decode_body, _encode_body,
+                          read_archive, route)
+
+BINARY = b"caf\xc3\xa9 latin-1 \xe9 and \xff\xfe"   # valid and invalid UTF-8 mixed
+
+
+def session_with(adapter):
+    session = requests.Session()
+    session.mount('http://', adapter)
+    return session
+
+
+def closed_port_url():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return f"http://127.0.0.1:{s.getsockname()[1]}/v6/stops/8000080/departures"
+
+
+@pytest.fixture
+def recorded(tmp_path, http_server, monkeypatch):
+    """Archive of a 200 with a binary body, a plan slice, a 503 and a connection error"""
+    monkeypatch.setattr(archive, '_WRITERS', {})
+    http_server.routes = {
+        '/iris/station/8000080': (200, {'Content-Type': 'text/xml'}, BINARY),
+        '/iris/plan/8000080/261019/08': (200, {'Content-Type': 'text/xml'}, b"<timetable/>"),
+        '/v6/stops/8000080/departures': (503, {'Retry-After': '5'}, b"busy"),
+    }
+    session = session_with(RecordingAdapter(tmp_path, retries=0))
+    assert session.get(f"{http_server.url}/iris/station/8000080").content == BINARY
+    session.get(f"{http_server.url}/iris/plan/8000080/261019/08")
+    assert session.get(f"{http_server.url}/v6/stops/8000080/departures").status_code == 503
+    unreachable = closed_port_url()
+    with pytest.raises(requests.ConnectionError):
+        session.get(unreachable, timeout=1)
+    for writer in archive._WRITERS.values():
+        writer.close()
+    return tmp_path, http_server.url, unreachable
+
+
+def test_surrogateescape_round_trips_any_bytes():
+    data = bytes(range(256))
+
+    encoded = _encode_body(data)
+
+    assert _decode_body(json.loads(json.dumps(encoded))) == data
+
+
+def test_route_wildcards_every_number_after_the_eva():
+    assert route("https://host/timetables/v1/plan/8000080/261019/08") == "host/timetables/v1/plan/8000080/*/*"
+    assert route("https://host/v6/stops/8000080/departures?duration=60") == "host/v6/stops/8000080/departures"
+    assert route("https://host/timetables/v1/fchg/8000080") == "host/timetables/v1/fchg/8000080"
+
+
+def test_archive_records_every_exchange(recorded):
+    directory, _, _ = recorded
+
+    records = sorted(read_archive(directory), key=lambda r: r['t'])
+
+    assert [r.get('status') for r in records] == [200, 200, 503, None]
+    assert records[3]['error'] == 'ConnectionError'
+    assert records[2]['headers']['Retry-After'] == '5'
+    # One gzip archive per host
+    assert len(list(directory.glob("*.jsonl.gz"))) == 2
+    assert all(gzip.open(path).read() for path in directory.glob("*.jsonl.gz"))
+
+
+def test_replay_serves_the_recorded_answers(recorded):
+    directory, url, unreachable = recorded
+    replay = ReplayArchive(directory)
+    session = session_with(ReplayAdapter(replay))
+
+    station = session.get(f"{url}/iris/station/8000080")
+    assert (station.status_code, station.content) == (200, BINARY)
+    assert station.headers['Content-Type'] == 'text/xml'
+
+    busy = session.get(f"{url}/v6/stops/8000080/departures")
+    assert (busy.status_code, busy.text, busy.headers['Retry-After']) == (503, "busy", '5')
+
+    with pytest.raises(requests.ConnectionError, match="replayed"):
+        session.get(unreachable)
+
+
+def test_replay_falls_back_to_the_route(recorded):
+    directory, url, _ = recorded
+    session = session_with(ReplayAdapter(ReplayArchive(directory)))
+
+    # Another day and hour of the same station's plan
+    other_hour = session.get(f"{url}/iris/plan/8000080/261020/09")
+    unknown = session.get(f"{url}/iris/plan/8000085/261019/08")
+
+    assert (other_hour.status_code, other_hour.content) == (200, b"<timetable/>")
+    assert (unknown.status_code, unknown.reason) == (404, 'Not Archived')
+
+
+def test_exhausted_urls_cycle_in_recorded_order(recorded):
+    directory, url, _ = recorded
+    replay = ReplayArchive(directory)
+    session = session_with(ReplayAdapter(replay))
+
+    statuses = [session.get(f"{url}/iris/station/8000080").status_code for _ in range(3)]
+
+    assert statuses == [200, 200, 200]
+    assert replay.served == 3 and replay.missed == 0
@@ -0,0 +1,70 @@
+"""Walk-forward backtest: warm-started windows stay close to a full refit"""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("xgboost")
+
+from models import backtest
+from models.backtest import MIN_INCREMENT_ROWS, WalkForwardBacktest
+
+
+def synthetic_history(days=16, per_day=80, seed=0):
+    """Delays driven by distance, peak hours and the Cologne bottleneck, plus a slow drift"""
+    rng = np.random.default_rng(seed)
+    n = days * per_day
+    stamps = pd.Timestamp("2025-03-01") + pd.to_timedelta(np.sort(rng.uniform(0, days, n)), unit="D")
+    hour = stamps.hour.to_numpy()
+    df = pd.DataFrame({
+        'api_timestamp': stamps,
+        'distance_km': rng.choice([15.0, 40.0, 50.0, 70.0], n),
+        'time_of_day': hour,
+        'day_of_week': stamps.dayofweek.to_numpy(),
+        'is_peak_hour': np.isin(hour, [7, 8, 16, 17, 18]).astype('int8'),
+        'is_cologne_bottleneck': rng.integers(0, 2, n).astype('int8'),
+    })
+    drift = np.linspace(0, 1.5, n)
+    df['delay_minutes'] = (0.04 * df['distance_km'] + 2.0 * df['is_peak_hour'] + 1.5 * df['is_cologne_bottleneck']
+                           + drift + rng.exponential(1.0, n)).astype('float32')
+    return df
+
+
+def run(history, tmp_path, **kwargs):
+    return WalkForwardBacktest(train_days=7, step_days=1, test_days=1, workers=2,
+                               cache_dir=str(tmp_path / "backtest"), **kwargs).run(history)
+
+
+def test_incremental_error_is_close_to_a_full_refit(tmp_path):
+    history = synthetic_history()
+
+    refit = run(history, tmp_path / "refit")
+    incremental = run(history, tmp_path / "incremental", incremental=True, chain_length=5)
+
+    assert list(refit['window']) == list(incremental['window'])
+    assert incremental['ensemble_mae'].mean() <= 1.15 * refit['ensemble_mae'].mean()
+
+
+def test_small_tails_are_batched_before_warm_starting(monkeypatch):
+    history = synthetic_history(days=12, per_day=40)   # ~34 new fit rows per window step
+    X = WalkForwardBacktest().transformer.transform(history)
+    y = history['delay_minutes'].to_numpy(dtype=np.float32)
+    windows = backtest.make_windows(history['api_timestamp'], 7, 1, 1, 0.15)
+    for window in windows:
+        window['key'] = str(window['window'])
+    monkeypatch.setattr(backtest, '_WORKER', {'X': SimpleNamespace(array=X), 'y': SimpleNamespace(array=y),
+                                              'zone_matrix': None})
+    updates = []
+    update = backtest._update_member
+
+    def recording_update(name, model, X_new, *args):
+        updates.append(len(X_new))
+        return update(name, model, X_new, *args)
+
+    monkeypatch.setattr(backtest, '_update_member', recording_update)
+    results = backtest._run_chain(windows, incremental=True, incremental_trees=5)
+
+    assert len(results) == len([w for w in windows if backtest._window_usable(w)])
+    assert updates and min(updates) >= MIN_INCREMENT_ROWS
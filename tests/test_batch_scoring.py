@@ -0,0 +1,71 @@
+"""Batch scoring: streamed, deduplicated chunk scores equal per-journey predictions"""
+
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+from models.ensemble_methods import EnsembleMethods
+from models.registry import ModelRegistry
+from prediction.batch_scoring import resolve_columns, score_file
+from prediction.service import load_served_ensemble
+
+xgb = pytest.importorskip("xgboost")
+
+PROCESSED = Path(__file__).resolve().parent.parent / "data" / "processed"
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    """Project-like working directory with one promoted model version"""
+    (tmp_path / "data" / "processed").mkdir(parents=True)
+    for name in ("zone_interaction_matrix.csv", "zone_features.csv"):
+        shutil.copy(PROCESSED / name, tmp_path / "data" / "processed" / name)
+    monkeypatch.chdir(tmp_path)
+
+    rng = np.random.default_rng(3)
+    n = 400
+    X = EnsembleMethods.build_journey_features(
+        rng.uniform(5, 90, n), rng.integers(0, 24, n), rng.integers(0, 7, n),
+        rng.integers(0, 2, n), rng.integers(0, 2, n),
+    )
+    y = 0.05 * X[:, 0] + 2 * X[:, 4] + rng.normal(size=n)
+    registry = ModelRegistry()
+    version = registry.publish({
+        'xgb': xgb.XGBRegressor(n_estimators=10, max_depth=3).fit(X, y),
+        'rf': RandomForestRegressor(n_estimators=5, max_depth=4, random_state=0).fit(X, y),
+    }, {'xgb': 0.4, 'rf': 0.6})
+    registry.promote(version)
+    return tmp_path, registry.version_dir(version)
+
+
+def test_scores_match_predict_delay(workspace):
+    root, version_dir = workspace
+    rng = np.random.default_rng(4)
+    n = 300
+    journeys = pd.DataFrame({
+        # training-data column names, repeated and continuous distances
+        'distance_km': np.where(rng.random(n) < 0.5, rng.choice([15, 40, 70], n), rng.uniform(5, 90, n)),
+        'time_of_day': rng.integers(0, 24, n),
+        'day_of_week': rng.integers(0, 7, n),
+        'is_peak_hour': rng.integers(0, 2, n),
+        'is_cologne_bottleneck': rng.integers(0, 2, n),
+    })
+    journeys.to_csv(root / "journeys.csv", index=False)
+
+    summary = score_file(str(root / "journeys.csv"), str(root / "out" / "scored.csv"), chunksize=64, workers=2)
+    scored = pd.read_csv(root / "out" / "scored.csv")
+
+    assert summary['rows'] == n
+    pd.testing.assert_frame_equal(scored.drop(columns='predicted_delay'), journeys)
+    predictor = load_served_ensemble(version_dir, explanations=False)
+    expected = [predictor.predict_delay(*row) for row in journeys.itertuples(index=False)]
+    np.testing.assert_allclose(scored['predicted_delay'], expected, atol=1e-4)
+
+
+def test_missing_journey_column_is_reported():
+    with pytest.raises(ValueError, match="is_cologne"):
+        resolve_columns(['distance', 'hour', 'day_of_week', 'is_peak'])
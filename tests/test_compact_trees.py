@@ -0,0 +1,66 @@
+"""Compact tree arrays: predictions match the original members, export round trip"""
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+from models.compact_trees import _tree_depth, flatten_model, load_compact_model
+
+xgb = pytest.importorskip("xgboost")
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(400, 5)).astype(np.float32)
+    y = 2 * X[:, 0] + X[:, 1] ** 2 + rng.normal(scale=0.3, size=len(X))
+    X[rng.random(X.shape) < 0.1] = np.nan   # learned missing-value directions
+    return X, y
+
+
+@pytest.fixture(scope="module")
+def members(data):
+    X, y = data
+    return {
+        'rf': RandomForestRegressor(n_estimators=15, max_depth=6, random_state=0).fit(X, y),
+        'xgb': xgb.XGBRegressor(n_estimators=25, max_depth=4, random_state=0).fit(X, y),
+    }
+
+
+@pytest.mark.parametrize("name", ['rf', 'xgb'])
+def test_compact_predict_matches_original_with_nan_inputs(data, members, name):
+    X, _ = data
+    model = members[name]
+    compact = flatten_model(model)
+
+    # XGBoost predicts in float32
+    tolerance = 1e-12 if name == 'rf' else 1e-5
+    assert np.isnan(X).any()
+    np.testing.assert_allclose(compact.predict(X), model.predict(X), atol=tolerance)
+    np.testing.assert_allclose(compact.predict(np.full((3, 5), np.nan)), model.predict(np.full((3, 5), np.nan)),
+                               atol=tolerance)
+
+
+def test_saved_export_is_memory_mapped_and_predicts_the_same(tmp_path, data, members):
+    X, _ = data
+    flatten_model(members['rf']).save(tmp_path / "rf")
+    compact = load_compact_model('rf', tmp_path)
+
+    assert isinstance(compact.value, np.memmap)
+    np.testing.assert_allclose(compact.predict(X), members['rf'].predict(X), atol=1e-12)
+
+
+def test_missing_or_partial_export_loads_as_none(tmp_path, members):
+    assert load_compact_model('rf', tmp_path) is None
+
+    flatten_model(members['rf']).save(tmp_path / "rf")
+    (tmp_path / "rf" / "value.npy").unlink()
+    assert load_compact_model('rf', tmp_path) is None
+
+
+def test_tree_depth_does_not_depend_on_node_order():
+    # root 0 → (4, 1), node 4 → (2, 3), node 2 → (5, 6): node 2 is stored before its parent
+    left = np.array([4, -1, 5, -1, 2, -1, -1])
+    right = np.array([1, -1, 6, -1, 3, -1, -1])
+
+    assert _tree_depth(left, right) == 3
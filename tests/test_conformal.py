@@ -0,0 +1,70 @@
+"""Split-conformal interval tables: quantiles, strata, pooled fallback and level lookup"""
+
+import numpy as np
+import pytest
+
+from features.transformer import FEATURE_COLUMNS
+from models.conformal import ConformalIntervals, conformal_quantile, stratum_index
+
+
+def matrix(is_peak, is_cologne, hour=12):
+    X = np.zeros((len(is_peak), len(FEATURE_COLUMNS)))
+    X[:, FEATURE_COLUMNS.index('is_peak_hour')] = is_peak
+    X[:, FEATURE_COLUMNS.index('is_cologne_bottleneck')] = is_cologne
+    X[:, FEATURE_COLUMNS.index('time_of_day')] = hour
+    return X
+
+
+def test_conformal_quantile_uses_finite_sample_rank():
+    residuals = np.arange(1.0, 11.0)   # 1 .. 10
+
+    # ceil(11 * 0.5) = 6th smallest, ceil(11 * 0.9) = 10th
+    assert conformal_quantile(residuals, 0.5) == 6.0
+    assert conformal_quantile(residuals, 0.9) == 10.0
+    # rank beyond n: the largest residual
+    assert conformal_quantile(residuals, 0.99) == 10.0
+    assert conformal_quantile(np.array([]), 0.9) == float('inf')
+
+
+def test_stratum_index_is_mixed_radix():
+    strata = stratum_index(('peak', 'cologne'), [0, 0, 1, 1], [0, 1, 0, 1], [8, 8, 8, 8])
+
+    assert strata.tolist() == [0, 1, 2, 3]
+    assert stratum_index((), [1], [1], [8]).tolist() == [0]
+
+
+def test_fit_uses_stratum_quantiles_and_pooled_fallback():
+    # 40 off-peak rows with residual 1, 40 peak rows with residual 3, 5 Cologne rows with residual 10
+    is_peak = np.r_[np.zeros(40), np.ones(40), np.zeros(5)]
+    is_cologne = np.r_[np.zeros(80), np.ones(5)]
+    residual = np.r_[np.ones(40), np.full(40, 3.0), np.full(5, 10.0)]
+    X = matrix(is_peak, is_cologne)
+    y = np.zeros(len(X))
+
+    intervals = ConformalIntervals.fit(X, y, {'ensemble': residual}, levels=(0.5, 0.9), min_count=30)
+    hw = intervals.half_width(0.9, [0, 1, 0], [0, 0, 1], [12, 12, 12])
+
+    assert hw[0] == 1.0
+    assert hw[1] == 3.0
+    # only 5 Cologne rows: pooled quantile over all 85 rows
+    assert hw[2] == conformal_quantile(residual, 0.9)
+    assert intervals.counts['rows'] == [40, 5, 40, 0]
+
+
+def test_level_lookup_rounds_up_and_rejects_uncalibrated_levels():
+    intervals = ConformalIntervals({'ensemble': [[1.0, 2.0, 3.0]]}, levels=(0.5, 0.9, 0.95), stratify=())
+
+    assert intervals.half_width(0.9, [0], [0], [12])[0] == 2.0
+    assert intervals.half_width(0.91, [0], [0], [12])[0] == 3.0   # next wider level
+    with pytest.raises(ValueError):
+        intervals.half_width(0.99, [0], [0], [12])
+
+
+def test_round_trip_through_directory(tmp_path):
+    intervals = ConformalIntervals({'ensemble': [[1.0, 2.0]], 'xgb': [[0.5, 1.5]]}, levels=(0.5, 0.9), stratify=())
+    intervals.save(tmp_path)
+    loaded = ConformalIntervals.load(tmp_path)
+
+    assert loaded.levels.tolist() == [0.5, 0.9]
+    assert loaded.half_width(0.9, [0], [0], [3], model='xgb')[0] == 1.5
+    assert ConformalIntervals.load(tmp_path / "missing") is None
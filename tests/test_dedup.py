@@ -0,0 +1,52 @@
+"""Departure deduplication: change detection, check/commit, TTL and capacity eviction"""
+
+import math
+
+from data.dedup import DepartureDeduplicator
+
+
+def test_emits_new_and_changed_delays_only():
+    dedup = DepartureDeduplicator()
+
+    assert dedup.changed(['a', 'b'], [1.0, 2.0], now=0).tolist() == [True, True]
+    assert dedup.changed(['a', 'b'], [1.0, 2.005], now=1).tolist() == [False, False]   # within tolerance
+    assert dedup.changed(['a', 'b', 'c'], [1.0, 5.0, 0.0], now=2).tolist() == [False, True, True]
+    assert dedup.stats()['suppressed'] == 3
+
+
+def test_unknown_delays_compare_equal():
+    dedup = DepartureDeduplicator()
+    dedup.changed(['a', 'b'], [math.nan, None], now=0)
+
+    assert dedup.changed(['a', 'b'], [math.nan, None], now=1).tolist() == [False, False]
+    assert dedup.changed(['a', 'b'], [1.0, 1.0], now=2).tolist() == [True, True]
+
+
+def test_check_without_commit_keeps_emitting():
+    dedup = DepartureDeduplicator()
+
+    assert dedup.check(['a'], [3.0], now=0).tolist() == [True]
+    # Write failed, nothing committed: the delay is still pending
+    assert dedup.check(['a'], [3.0], now=1).tolist() == [True]
+    dedup.commit(['a'], [3.0], now=2)
+    assert dedup.check(['a'], [3.0], now=3).tolist() == [False]
+
+
+def test_entries_expire_after_ttl():
+    dedup = DepartureDeduplicator(ttl=10)
+    dedup.changed(['a', 'b'], [1.0, 1.0], now=0)
+    dedup.changed(['b'], [1.0], now=8)   # refreshes b only
+
+    assert dedup.changed(['a', 'b'], [1.0, 1.0], now=15).tolist() == [True, False]
+    assert dedup.stats()['expired'] == 1
+
+
+def test_capacity_evicts_least_recently_seen():
+    dedup = DepartureDeduplicator(max_entries=2)
+    dedup.changed(['a', 'b'], [1.0, 1.0], now=0)
+    dedup.changed(['a'], [1.0], now=1)   # a is now more recent than b
+    dedup.changed(['c'], [1.0], now=2)
+
+    assert len(dedup) == 2
+    assert dedup.stats()['evicted'] == 1
+    assert dedup.check(['a', 'b', 'c'], [1.0, 1.0, 1.0], now=3).tolist() == [False, True, False]
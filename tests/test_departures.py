@@ -0,0 +1,114 @@
+"""Columnar departure parsing equals the former per-departure parser"""
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data.departures import parse_departures
+from data.real_time_collector import estimate_distance
+
+NOW = datetime(2026, 10, 21, 9, 30)   # a Wednesday
+
+
+def parse_one(departure, station_name, now=NOW):
+    """The per-row parser parse_departures replaced (weekday from 'when', as now intended)"""
+    delay = 0
+    if departure.get('delay') is not None:
+        delay = departure['delay'] // 60
+    elif departure.get('delayInMinutes') is not None:
+        delay = departure['delayInMinutes']
+
+    when = departure.get('when') or ''
+    hour, weekday = 0, now.weekday()
+    if when:
+        try:
+            parsed = datetime.fromisoformat(when.replace('Z', '+00:00'))
+            hour, weekday = parsed.hour, parsed.weekday()
+        except ValueError:
+            hour = 12
+
+    direction = (departure.get('direction') or '').lower()
+    return {
+        'distance_km': estimate_distance(station_name, direction),
+        'time_of_day': hour,
+        'day_of_week': weekday,
+        'is_peak_hour': 1 if (7 <= hour <= 9) or (16 <= hour <= 18) else 0,
+        'is_cologne_bottleneck': 1 if 'köln' in direction or 'cologne' in direction else 0,
+        'delay_minutes': max(0, delay),
+    }
+
+
+def random_departures(n, seed=0):
+    rng = np.random.default_rng(seed)
+    directions = ['Essen Hbf', 'essen', 'Köln Hbf', 'Dortmund', 'Cologne/Bonn Airport', 'Bochum', None]
+    departures = []
+    for i in range(n):
+        planned = pd.Timestamp("2026-10-17T05:00:00+02:00") + pd.Timedelta(minutes=int(rng.integers(0, 7 * 24 * 60)))
+        departure = {'tripId': f"1|{i}", 'direction': directions[rng.integers(len(directions))],
+                     'plannedWhen': planned.isoformat()}
+        kind = rng.integers(6)
+        if kind == 0:                                   # cancelled: no actual time, no delay
+            departure.update(when=None, delay=None, cancelled=True)
+        elif kind == 1:                                 # minutes-based API
+            departure.update(when=planned.isoformat(), delayInMinutes=int(rng.integers(0, 30)))
+        elif kind == 2:                                 # neither time nor plan
+            departure.pop('plannedWhen')
+        else:
+            delay = int(rng.integers(-120, 1800))
+            departure.update(when=(planned + pd.Timedelta(seconds=delay)).isoformat(), delay=delay)
+        departures.append(departure)
+    return departures
+
+
+def assert_equivalent(departures, station_name):
+    frame = parse_departures(departures, station_name, now=NOW)
+    expected = pd.DataFrame([parse_one(d, station_name) for d in departures])
+
+    assert len(frame) == len(departures)
+    for column in expected.columns:
+        np.testing.assert_array_equal(frame[column].to_numpy(dtype=np.float64),
+                                      expected[column].to_numpy(dtype=np.float64), err_msg=column)
+    assert (frame['timestamp'] == pd.Timestamp(NOW)).all()
+
+
+@pytest.mark.parametrize("station_name", ['Essen Hbf', 'Dortmund Hbf', 'Cologne Hbf'])
+def test_matches_the_per_row_parser(station_name):
+    assert_equivalent(random_departures(500), station_name)
+
+
+def test_weekday_comes_from_when_in_local_time():
+    # Local Monday 00:10 is Sunday in UTC, local Sunday 21:30 at -05:00 is Monday in UTC
+    departures = [{'when': '2026-10-19T00:10:00+02:00', 'delay': 60},
+                  {'when': '2026-10-18T21:30:00-05:00', 'delay': 0}]
+
+    frame = parse_departures(departures, 'Essen Hbf', now=NOW)
+
+    assert frame['day_of_week'].tolist() == [0, 6]
+    assert frame['time_of_day'].tolist() == [0, 21]
+    assert_equivalent(departures, 'Essen Hbf')
+
+
+def test_missing_times_and_cancelled_rows():
+    departures = [
+        {'when': None, 'plannedWhen': '2026-10-18T08:00:00+02:00', 'delay': None, 'cancelled': True},
+        {'plannedWhen': '2026-10-18T08:00:00+02:00'},
+        {},
+        {'when': 'not a time', 'delayInMinutes': 4},
+    ]
+
+    frame = parse_departures(departures, 'Essen Hbf', now=NOW)
+
+    # No actual time: hour 0 and the collection weekday; unparseable: hour 12
+    assert frame['time_of_day'].tolist() == [0, 0, 0, 12]
+    assert frame['day_of_week'].tolist() == [NOW.weekday()] * 4
+    assert frame['delay_minutes'].tolist() == [0, 0, 0, 4]
+    assert_equivalent(departures, 'Essen Hbf')
+
+
+def test_empty_list_gives_the_typed_schema():
+    frame = parse_departures([], 'Essen Hbf', now=NOW)
+
+    assert frame.empty
+    assert str(frame['time_of_day'].dtype) == 'uint8'
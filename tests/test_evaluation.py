@@ -0,0 +1,41 @@
+"""Evaluation: bootstrap CIs only where they are reported or saved"""
+
+import numpy as np
+from sklearn.linear_model import LinearRegression
+
+from models import evaluation
+from models.evaluation import ModelEvaluation
+
+
+class Members(ModelEvaluation):
+    def __init__(self, X, y):
+        self.models = {'a': LinearRegression().fit(X, y), 'b': LinearRegression(fit_intercept=False).fit(X, y)}
+        self.weights = {'a': 0.6, 'b': 0.4}
+
+
+def data(n=150):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(n, 3))
+    return X, X @ [1.0, 0.5, 0.0] + rng.normal(size=n)
+
+
+def test_quiet_evaluation_skips_the_bootstrap(monkeypatch):
+    calls = []
+    monkeypatch.setattr(evaluation, 'bootstrap_metrics', lambda *a, **k: calls.append(a))
+    X, y = data()
+
+    metrics = Members(X, y).evaluate_models(X, y, verbose=False, save=False)
+
+    assert calls == []
+    assert set(metrics) == {'a', 'b', 'ensemble'}
+    assert 'r2_ci' not in metrics['ensemble']
+
+
+def test_explicit_resamples_give_intervals_around_the_point_estimate():
+    X, y = data()
+
+    metrics = Members(X, y).evaluate_models(X, y, verbose=False, save=False, n_bootstrap=500)
+
+    for m in metrics.values():
+        assert m['r2_ci'][0] <= m['r2'] <= m['r2_ci'][1]
+        assert m['mae_ci'][0] <= m['mae'] <= m['mae_ci'][1]
@@ -0,0 +1,97 @@
+"""Explanations: contributions add up to the prediction of the model that made it"""
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+
+from models.compact_trees import flatten_model
+from models.ensemble_methods import EnsembleMethods
+from models.explanations import ExplanationGrid, ensemble_contributions, member_contributions
+
+xgb = pytest.importorskip("xgboost")
+
+
+class Ensemble(EnsembleMethods):
+    def __init__(self, models, weights):
+        self.models = models
+        self.weights = weights
+
+
+@pytest.fixture(scope="module")
+def training():
+    rng = np.random.default_rng(1)
+    n = 600
+    X = EnsembleMethods.build_journey_features(
+        rng.choice([15, 40, 50, 70], n), rng.integers(0, 24, n), rng.integers(0, 7, n),
+        rng.integers(0, 2, n), rng.integers(0, 2, n),
+    )
+    y = 0.05 * X[:, 0] + 2 * X[:, 4] + X[:, 3] + rng.normal(scale=0.5, size=n)
+    return X, y
+
+
+@pytest.fixture(scope="module")
+def members(training):
+    X, y = training
+    return {
+        'xgb': xgb.XGBRegressor(n_estimators=20, max_depth=3, random_state=0).fit(X, y),
+        'rf': RandomForestRegressor(n_estimators=10, max_depth=5, random_state=0).fit(X, y),
+        'gaussian': LinearRegression().fit(X, y),
+    }
+
+
+def test_compact_xgboost_attributions_match_the_booster(training, members):
+    X, _ = training
+    booster = members['xgb'].get_booster()
+    compact = flatten_model(members['xgb'])
+
+    contributions = member_contributions(compact, X)
+
+    assert contributions is not None
+    np.testing.assert_allclose(contributions.sum(axis=1), compact.predict(X), atol=1e-4)
+    # Path attributions are XGBoost's approximate (Saabas) contributions
+    expected = booster.predict(xgb.DMatrix(X, feature_names=booster.feature_names),
+                               pred_contribs=True, approx_contribs=True)
+    np.testing.assert_allclose(contributions, expected, atol=1e-4)
+
+
+def test_export_without_node_means_folds_into_the_bias(members):
+    compact = flatten_model(members['xgb'])
+    compact.meta = {**compact.meta, 'node_means': False}
+
+    assert member_contributions(compact, np.zeros((1, 9), dtype=np.float32)) is None
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_ensemble_contributions_add_up_to_the_weighted_prediction(training, members, compact):
+    X, _ = training
+    models = {name: flatten_model(m) if compact and name != 'gaussian' else m for name, m in members.items()}
+    # Weights as stored (R² based), not normalized
+    ensemble = Ensemble(models, {'xgb': 0.3, 'rf': 0.2, 'gaussian': 0.45})
+
+    contributions = ensemble_contributions(ensemble, X[:50])
+
+    np.testing.assert_allclose(contributions.sum(axis=1), ensemble.predict_ensemble(X[:50]), atol=1e-4)
+
+
+def test_explain_delay_matches_predict_delay(members):
+    ensemble = Ensemble({name: flatten_model(members[name]) for name in ('xgb', 'rf')}, {'xgb': 1.0, 'rf': 2.0})
+    ensemble.explanations = ExplanationGrid.compute(ensemble)
+
+    for journey in [(70, 17, 2, 1, 1), (15, 3, 6, 0, 0), (42, 8, 1, 1, 0)]:   # last one is off the grid
+        explanation = ensemble.explain_delay(*journey)
+        total = explanation['baseline'] + sum(explanation['contributions'].values())
+        assert total == pytest.approx(ensemble.predict_delay(*journey), abs=1e-4)
+
+
+def test_grid_cache_is_keyed_by_the_served_members(tmp_path, members):
+    rf_only = Ensemble({'rf': flatten_model(members['rf'])}, {'rf': 1.0})
+    full = Ensemble({name: flatten_model(members[name]) for name in ('xgb', 'rf')}, {'xgb': 1.0, 'rf': 1.0})
+
+    ExplanationGrid.for_version(rf_only, "abc123", directory=tmp_path)
+    grid = ExplanationGrid.for_version(full, "abc123", directory=tmp_path)
+
+    assert {p.name for p in tmp_path.iterdir()} == {"abc123_rf.npz", "abc123_rf+xgb.npz"}
+    explanation = grid.lookup(70, 17, 2, 1, 1)
+    total = explanation['baseline'] + sum(explanation['contributions'].values())
+    assert total == pytest.approx(full.predict_delay(70, 17, 2, 1, 1), abs=1e-4)
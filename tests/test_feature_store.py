@@ -0,0 +1,122 @@
+"""Feature store: cache hits, append-only tails, code-version keys and atomic rebuilds"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data.loader import load_training_data
+from features import store as store_module
+from features.store import FeatureStore, feature_code_key
+from features.transformer import FeatureTransformer
+
+
+def training_rows(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'distance_km': rng.uniform(5, 90, n).round(3),
+        'time_of_day': rng.integers(0, 24, n),
+        'day_of_week': rng.integers(0, 7, n),
+        'is_peak_hour': rng.integers(0, 2, n),
+        'is_cologne_bottleneck': rng.integers(0, 2, n),
+        'delay_minutes': rng.exponential(3, n).round(1),
+        'source': 'synthetic',
+    })
+
+
+@pytest.fixture
+def csv(tmp_path):
+    path = tmp_path / "training_data.csv"
+    training_rows(50).to_csv(path, index=False)
+    return path
+
+
+@pytest.fixture
+def builds(monkeypatch):
+    """Count full rebuilds"""
+    calls = []
+    build = FeatureStore._build
+
+    def counting_build(self, *args):
+        calls.append(args[0])
+        return build(self, *args)
+
+    monkeypatch.setattr(FeatureStore, '_build', counting_build)
+    return calls
+
+
+def expected(path):
+    df = load_training_data(path, report=False)
+    return FeatureTransformer().transform(df), df['delay_minutes'].to_numpy(dtype=np.float32)
+
+
+def test_second_load_is_a_cache_hit(tmp_path, csv, builds):
+    store = FeatureStore(tmp_path / "features")
+
+    X, y = store.load(str(csv))
+    X2, y2 = store.load(str(csv))
+
+    assert len(builds) == 1
+    assert isinstance(X2, np.memmap) and not X2.flags.writeable
+    np.testing.assert_array_equal(X2, expected(csv)[0])
+    np.testing.assert_array_equal(y2, expected(csv)[1])
+
+
+def test_appended_rows_only_transform_the_tail(tmp_path, csv, builds):
+    store = FeatureStore(tmp_path / "features")
+    store.load(str(csv))
+
+    X, y = store.append(str(csv), training_rows(7, seed=1))
+
+    assert len(builds) == 1
+    assert X.shape == (57, 9)
+    np.testing.assert_array_equal(X, expected(csv)[0])
+    np.testing.assert_array_equal(y, expected(csv)[1])
+
+
+def test_rewritten_source_is_rebuilt(tmp_path, csv, builds):
+    store = FeatureStore(tmp_path / "features")
+    store.load(str(csv))
+
+    training_rows(30, seed=2).to_csv(csv, index=False)   # not an append: the prefix changed
+    X, _ = store.load(str(csv))
+
+    assert len(builds) == 2
+    np.testing.assert_array_equal(X, expected(csv)[0])
+
+
+def test_equally_named_sources_get_separate_entries(tmp_path, csv, builds):
+    other = tmp_path / "other" / "training_data.csv"
+    other.parent.mkdir()
+    training_rows(20, seed=3).to_csv(other, index=False)
+    store = FeatureStore(tmp_path / "features")
+
+    X1, _ = store.load(str(csv))
+    X2, _ = store.load(str(other))
+
+    assert (len(X1), len(X2)) == (50, 20)
+    assert len(list(store.root.iterdir())) == 2
+
+
+def test_transformer_source_change_invalidates_the_cache(tmp_path, csv, monkeypatch):
+    key = feature_code_key()
+    changed = tmp_path / "transformer.py"
+    changed.write_bytes(open(store_module.transformer_module.__file__, 'rb').read() + b"\n# changed\n")
+    monkeypatch.setattr(store_module.transformer_module, '__file__', str(changed))
+
+    assert feature_code_key() != key
+    assert FeatureStore(tmp_path / "features").root.name == feature_code_key()
+
+
+def test_rebuild_swaps_in_atomically(tmp_path, csv):
+    store = FeatureStore(tmp_path / "features")
+    old_X, _ = store.load(str(csv))
+    old_values = np.array(old_X)
+
+    training_rows(40, seed=4).to_csv(csv, index=False)
+    new_X, _ = store.load(str(csv))
+
+    # A reader holding the old map still sees the old, complete data
+    np.testing.assert_array_equal(old_X, old_values)
+    assert len(new_X) == 40
+    # No temp or renamed-aside directories are left behind
+    assert [p.name for p in store.root.iterdir()] == [store._entry_dir(csv).name]
@@ -0,0 +1,138 @@
+"""Cross-source fusion: train-key join, weight renormalization and provenance"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data.fusion import KEYS, fuse, hafas_frame, hafas_keys, has_train_key, train_keys
+
+EVA = '8000080'
+PLANNED = pd.Timestamp('2026-10-19 08:00')
+
+
+def source(rows):
+    """Normalized source frame from (line, planned, delay) tuples"""
+    return pd.DataFrame({
+        'eva': EVA,
+        'line': [line for line, _, _ in rows],
+        'planned': [planned for _, planned, _ in rows],
+        'delay': np.array([delay for _, _, delay in rows], dtype=np.float64),
+        'trip_id': [f"{line}-{i}" for i, (line, _, _) in enumerate(rows)],
+        'direction': 'Köln Hbf',
+        'cancelled': False,
+    })
+
+
+def by_line(fused):
+    return fused.set_index('line')
+
+
+def test_join_keeps_trains_seen_by_a_single_source():
+    fused = fuse({
+        'iris': source([('RE1', PLANNED, 2.0), ('S1', PLANNED, 0.0)]),
+        'v6': source([('RE1', PLANNED, 4.0), ('ICE723', PLANNED, 10.0)]),
+    })
+
+    assert sorted(fused['line']) == ['ICE723', 'RE1', 'S1']
+    assert by_line(fused).loc['RE1', 'n_sources'] == 2
+    assert by_line(fused).loc['S1', 'n_sources'] == 1
+
+
+def test_same_line_at_another_minute_is_another_train():
+    fused = fuse({
+        'iris': source([('RE1', PLANNED, 2.0)]),
+        'v6': source([('RE1', PLANNED + pd.Timedelta(minutes=1), 4.0)]),
+    })
+
+    assert len(fused) == 2
+    assert (fused['n_sources'] == 1).all()
+
+
+def test_weights_are_renormalized_over_reporting_sources():
+    weights = {'iris': 0.7, 'v6': 0.2, 'vbb': 0.1}
+    fused = by_line(fuse({
+        'iris': source([('RE1', PLANNED, 2.0), ('S1', PLANNED, np.nan)]),
+        'v6': source([('RE1', PLANNED, 4.0), ('S1', PLANNED, 3.0)]),
+        'vbb': source([('RE1', PLANNED, 8.0), ('S1', PLANNED, 6.0)]),
+    }, weights))
+
+    assert fused.loc['RE1', 'delay_minutes'] == pytest.approx(0.7 * 2 + 0.2 * 4 + 0.1 * 8)
+    # IRIS has no delay for S1: v6 and VBB share the weight 2 : 1
+    assert fused.loc['S1', 'delay_minutes'] == pytest.approx((0.2 * 3 + 0.1 * 6) / 0.3)
+    assert fused.loc['RE1', 'spread'] == pytest.approx(6.0)
+
+
+def test_train_without_any_delay_stays_unknown():
+    fused = fuse({'iris': source([('RE1', PLANNED, np.nan)]), 'v6': source([('RE1', PLANNED, np.nan)])})
+
+    assert np.isnan(fused.loc[0, 'delay_minutes'])
+    assert fused.loc[0, 'n_sources'] == 0
+    assert fused.loc[0, 'sources'] == ''
+
+
+def test_provenance_lists_reporting_sources_in_frame_order():
+    fused = by_line(fuse({
+        'iris': source([('RE1', PLANNED, 2.0), ('S1', PLANNED, np.nan)]),
+        'v6': source([('RE1', PLANNED, 4.0), ('S1', PLANNED, 3.0)]),
+        'vbb': source([('RE1', PLANNED, 5.0)]),
+    }))
+
+    assert fused.loc['RE1', 'sources'] == 'iris+v6+vbb'
+    assert fused.loc['S1', 'sources'] == 'v6'
+    assert fused.loc['RE1', 'delay_iris'] == 2.0
+    assert fused.loc['RE1', 'trip_id_v6'] == 'RE1-0'
+
+
+def test_empty_sources_give_an_empty_frame():
+    fused = fuse({'iris': None, 'v6': source([])})
+
+    assert fused.empty
+    assert list(fused.columns[:3]) == KEYS
+
+
+def test_hafas_departures_join_iris_by_normalized_line_and_minute():
+    departures = [
+        {'line': {'name': 'RE 1'}, 'plannedWhen': '2026-10-19T08:00:30+02:00', 'delay': 240, 'tripId': 'x'},
+        {'line': None, 'plannedWhen': '2026-10-19T08:05:00+02:00', 'delay': 60},
+    ]
+    v6 = hafas_frame(departures, EVA)
+    fused = fuse({'iris': source([('RE1', PLANNED, 2.0)]), 'v6': v6})
+
+    assert len(v6) == 1   # no line: cannot be keyed
+    assert fused.loc[0, 'sources'] == 'iris+v6'
+    assert fused.loc[0, 'delay_v6'] == pytest.approx(4.0)
+    # Keyed by the trip id of the most reliable source
+    assert train_keys(fused) == [(EVA, 'RE1-0', PLANNED)]
+
+
+def test_same_line_trains_in_the_same_minute_stay_apart():
+    iris = source([('RE1', PLANNED, 2.0), ('RE1', PLANNED, 5.0)])
+    v6 = hafas_frame([
+        {'line': {'name': 'RE 1'}, 'plannedWhen': '2026-10-19T08:00:00+02:00', 'delay': 60, 'tripId': 'a'},
+        {'line': {'name': 'RE 1'}, 'plannedWhen': '2026-10-19T08:00:00+02:00', 'delay': 300, 'tripId': 'b'},
+    ], EVA)
+
+    fused = fuse({'iris': iris, 'v6': v6})
+
+    assert len(fused) == 2
+    assert (fused['n_sources'] == 2).all()
+    assert len(set(train_keys(fused))) == 2
+    assert sorted(fused['trip_id']) == ['RE1-0', 'RE1-1']
+
+
+def test_trains_without_a_trip_id_fall_back_to_the_line():
+    v6 = hafas_frame([{'line': {'name': 'S 6'}, 'plannedWhen': '2026-10-19T08:00:00+02:00', 'delay': 0}], EVA)
+
+    assert train_keys(fuse({'v6': v6})) == [(EVA, 'S6', PLANNED)]
+
+
+def test_departures_without_a_key_are_flagged():
+    keys = hafas_keys([
+        {'line': {'name': 'RE 1'}, 'plannedWhen': '2026-10-19T08:00:00+02:00', 'tripId': 'a'},
+        {'line': None, 'plannedWhen': '2026-10-19T08:05:00+02:00', 'tripId': 'b'},
+        {'line': None, 'when': None},
+        {'line': {'name': 'RE 1'}},
+    ], EVA)
+
+    assert has_train_key(keys).tolist() == [True, True, False, False]
+    assert train_keys(keys[has_train_key(keys)]) == [(EVA, 'a', PLANNED), (EVA, 'b', PLANNED + pd.Timedelta(minutes=5))]
@@ -0,0 +1,128 @@
+"""Pooled HTTP adapter: conditional GETs from the cache, bounded cache and per-host counters"""
+
+import pytest
+import requests
+
+from data.http_client import PooledAdapter
+
+BODY = b"<timetable>" + b"x" * 1000 + b"</timetable>"
+
+
+def session_with(adapter):
+    session = requests.Session()
+    session.mount('http://', adapter)
+    return session
+
+
+@pytest.fixture
+def server(http_server):
+    http_server.routes = {
+        '/station': (200, {'ETag': '"v1"', 'Content-Type': 'text/xml'}, BODY),
+        '/other': (200, {'ETag': '"o1"'}, b"y" * 600),
+        '/third': (200, {'ETag': '"t1"'}, b"z" * 600),
+        '/no-validator': (200, {}, b"plain"),
+        '/busy': (503, {}, b""),
+    }
+    return http_server
+
+
+def if_none_match(server, path):
+    return [headers.get('If-None-Match') for p, headers in server.requests if p == path]
+
+
+def test_not_modified_is_served_from_the_cache_as_200(server):
+    adapter = PooledAdapter(retries=0)
+    session = session_with(adapter)
+
+    first = session.get(f"{server.url}/station")
+    second = session.get(f"{server.url}/station")
+
+    assert if_none_match(server, '/station') == [None, '"v1"']
+    assert (second.status_code, second.content) == (200, BODY)
+    assert second.headers['ETag'] == '"v1"' and second.encoding == first.encoding
+    stats = adapter.stats().iloc[0]
+    assert stats['not_modified'] == 1 and stats['bytes_saved'] == len(BODY)
+    assert stats['statuses'] == {200: 1, 304: 1}
+
+
+def test_changed_resources_replace_the_cached_body(server):
+    session = session_with(PooledAdapter(retries=0))
+    session.get(f"{server.url}/station")
+    server.routes['/station'] = (200, {'ETag': '"v2"'}, b"new")
+
+    assert session.get(f"{server.url}/station").content == b"new"
+    assert session.get(f"{server.url}/station").content == b"new"
+    assert if_none_match(server, '/station') == [None, '"v1"', '"v2"']
+
+
+def test_streamed_requests_are_never_cached(server):
+    adapter = PooledAdapter(retries=0)
+    session = session_with(adapter)
+
+    with session.get(f"{server.url}/station", stream=True) as response:
+        assert b"".join(response.iter_content(64)) == BODY
+    session.get(f"{server.url}/station", stream=True).close()
+
+    assert if_none_match(server, '/station') == [None, None]
+    assert adapter._cached_bytes == 0
+
+
+def test_responses_without_validators_are_not_cached(server):
+    adapter = PooledAdapter(retries=0)
+    session = session_with(adapter)
+
+    session.get(f"{server.url}/no-validator")
+    session.get(f"{server.url}/no-validator")
+
+    assert adapter._cached_bytes == 0
+    assert if_none_match(server, '/no-validator') == [None, None]
+
+
+def test_cache_is_bounded_in_bytes_least_recently_used_first(server):
+    adapter = PooledAdapter(retries=0, cache_bytes=1500)
+    session = session_with(adapter)
+
+    session.get(f"{server.url}/other")      # 600 bytes
+    session.get(f"{server.url}/third")      # 600 bytes
+    session.get(f"{server.url}/other")      # revalidated: now the most recently used
+    session.get(f"{server.url}/station")    # 1022 bytes: evicts /third, then /other
+
+    assert list(adapter._cache) == [f"{server.url}/station"]
+    assert adapter._cached_bytes == len(BODY) <= adapter.cache_bytes
+
+    adapter = PooledAdapter(retries=0, cache_bytes=500)
+    session_with(adapter).get(f"{server.url}/other")   # larger than the whole cache
+    assert not adapter._cache
+
+
+def test_latency_and_status_counters_per_host(server):
+    adapter = PooledAdapter(retries=0)
+    session = session_with(adapter)
+
+    for _ in range(3):
+        session.get(f"{server.url}/no-validator")
+    session.get(f"{server.url}/busy")
+
+    stats = adapter.stats().iloc[0]
+    assert stats['host'] == server.url.split('//')[1]
+    assert stats['requests'] == 4 and stats['errors'] == 0
+    assert stats['statuses'] == {200: 3, 503: 1}
+    assert sum(stats['histogram'].values()) == 4
+    assert stats['p50_ms'] is not None
+    assert stats['bytes_received'] == 3 * len(b"plain")
+    # Keep-alive: one connection for every request
+    assert stats['connections_opened'] == 1
+
+
+def test_connection_errors_are_counted(server):
+    adapter = PooledAdapter(retries=0)
+    session = session_with(adapter)
+    url = server.url
+    server.shutdown()
+    server.server_close()
+
+    with pytest.raises(requests.ConnectionError):
+        session.get(f"{url}/station", timeout=1)
+
+    stats = adapter.stats().iloc[0]
+    assert stats['errors'] == 1 and stats['requests'] == 1
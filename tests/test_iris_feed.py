@@ -0,0 +1,119 @@
+"""IRIS feed: plan + change merge on an injected clock"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from data.iris_feed import STALE_AFTER, IrisFeed
+
+from test_iris_parser import CHANGES, PLAN
+
+EVA = '8000080'
+RE1 = '-7874571842864554321-2610190757-5'
+ICE = '1234567890-2610190810-1'
+
+RECENT = b"""<timetable station='Dortmund Hbf' eva='8000080'>
+  <s id="-7874571842864554321-2610190757-5" eva="8000080">
+    <dp ct="2610190809"/>
+  </s>
+  <s id="999-2610190900-1" eva="8000080">
+    <dp cp="5"/>
+  </s>
+</timetable>
+"""
+
+
+class Response:
+    def __init__(self, body):
+        self.status_code = 200 if body is not None else 404
+        self.body = body or b""
+
+    def iter_content(self, size):
+        return [self.body[i:i + size] for i in range(0, len(self.body), size)]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class Session:
+    """Serves fixed documents per IRIS path and records the requested paths"""
+
+    def __init__(self, documents):
+        self.documents = documents
+        self.paths = []
+
+    def get(self, url, timeout=None, stream=False):
+        path = url.split('/', 3)[-1]
+        self.paths.append(path)
+        return Response(self.documents.get(path))
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def feed():
+    session = Session({f"plan/{EVA}/261019/07": PLAN, f"fchg/{EVA}": CHANGES, f"rchg/{EVA}": RECENT})
+    clock = Clock(datetime(2026, 10, 19, 7, 50))
+    return IrisFeed({'Dortmund Hbf': EVA}, session=session, base_url="http://iris.test",
+                    wait=lambda: None, clock=clock)
+
+
+def test_changes_never_erase_planned_values(feed):
+    changed = feed.poll()
+
+    assert feed.session.paths == [f"plan/{EVA}/261019/07", f"plan/{EVA}/261019/08", f"fchg/{EVA}"]
+    assert sorted(changed[EVA]) == sorted([RE1, ICE])
+    stops = feed.stops[EVA]
+    assert stops[RE1]['departure_planned'] == datetime(2026, 10, 19, 8, 0)
+    assert stops[RE1]['departure_platform'] == '16'
+    assert stops[RE1]['departure_changed'] == datetime(2026, 10, 19, 8, 7)
+    assert stops[RE1]['departure_changed_platform'] == '17'
+    assert stops[RE1]['updated'] == feed.clock.now
+    assert stops[ICE]['departure_cancelled'] and stops[ICE]['departure_planned'] == datetime(2026, 10, 19, 8, 15)
+
+    # The recent-changes delta moves the departure again; planned values stay
+    feed.clock.now += timedelta(minutes=1)
+    feed.poll()
+
+    assert feed.session.paths[-1] == f"rchg/{EVA}"
+    assert stops[RE1]['departure_planned'] == datetime(2026, 10, 19, 8, 0)
+    assert stops[RE1]['departure_changed'] == datetime(2026, 10, 19, 8, 9)
+    assert stops[RE1]['arrival_path'] == 'Aachen Hbf|Köln Hbf|Essen Hbf'
+    assert feed.stop_delay(stops[RE1]) == 9
+
+
+def test_drain_uses_the_injected_clock(feed):
+    feed.poll()
+
+    feed.clock.now = datetime(2026, 10, 19, 8, 5)
+    assert feed.drain_departed().empty
+
+    feed.clock.now = datetime(2026, 10, 19, 8, 20)
+    departed = feed.drain_departed()
+
+    # The cancelled ICE departs silently, the RE is emitted once with its final delay
+    assert departed['train'].tolist() == ['RE 10123']
+    assert departed['delay_minutes'].tolist() == [7.0]
+    assert departed['time_of_day'].tolist() == [8]
+    assert feed.drain_departed().empty
+
+
+def test_change_only_stops_are_pruned_by_their_update_time(feed):
+    feed.poll()
+    feed.clock.now += timedelta(seconds=30)
+    feed.poll()   # rchg adds a stop without a plan entry
+    orphan = feed.stops[EVA]['999-2610190900-1']
+    assert feed._event_time(orphan) is None
+
+    feed._prune(orphan['updated'] + STALE_AFTER + timedelta(minutes=1))
+
+    assert '999-2610190900-1' not in feed.stops[EVA]
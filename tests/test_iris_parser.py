@@ -0,0 +1,92 @@
+"""Streaming IRIS parser: stop events from plan and change documents, fed in chunks"""
+
+from datetime import datetime
+
+from data.iris_parser import first_station, iter_stop_events, parse_iris_time
+
+PLAN = b"""<?xml version='1.0' encoding='UTF-8'?>
+<timetable station='Dortmund Hbf'>
+  <s id="-7874571842864554321-2610190757-5">
+    <tl f="N" t="p" o="800725" c="RE" n="10123"/>
+    <ar pt="2610190755" pp="16" l="1" ppth="Aachen Hbf|K\xc3\xb6ln Hbf|Essen Hbf"/>
+    <dp pt="2610190800" pp="16" l="1" ppth="Hamm(Westf)Hbf"/>
+  </s>
+  <s id="1234567890-2610190810-1">
+    <tl c="ICE" n="723"/>
+    <dp pt="2610190815" pp="8" ppth="Essen Hbf|D\xc3\xbcsseldorf Hbf"/>
+  </s>
+</timetable>
+"""
+
+CHANGES = b"""<timetable station='Dortmund Hbf' eva='8000080'>
+  <s id="-7874571842864554321-2610190757-5" eva="8000080">
+    <m id="r1" t="d" c="36"/>
+    <dp ct="2610190807" cp="17"/>
+  </s>
+  <s id="1234567890-2610190810-1" eva="8000080">
+    <dp cs="c"/>
+  </s>
+</timetable>
+"""
+
+
+def chunked(document, size):
+    return [document[i:i + size] for i in range(0, len(document), size)]
+
+
+def test_plan_events_carry_planned_fields():
+    events = list(iter_stop_events(PLAN, eva='8000080'))
+
+    assert len(events) == 2
+    re1, ice = events
+    assert re1.trip_id == '-7874571842864554321'
+    assert re1.eva == '8000080'
+    assert (re1.category, re1.number, re1.line) == ('RE', '10123', '1')
+    assert re1.arrival_planned == datetime(2026, 10, 19, 7, 55)
+    assert re1.departure_planned == datetime(2026, 10, 19, 8, 0)
+    assert re1.arrival_path == 'Aachen Hbf|Köln Hbf|Essen Hbf'
+    assert ice.line is None and ice.arrival_planned is None
+    assert ice.departure_platform == '8'
+
+
+def test_chunk_boundaries_do_not_change_the_result():
+    whole = list(iter_stop_events(PLAN, eva='8000080'))
+
+    for size in (1, 7, 64):
+        assert list(iter_stop_events(chunked(PLAN, size), eva='8000080')) == whole
+
+
+def test_change_events_keep_only_changed_fields():
+    re1, ice = iter_stop_events(CHANGES)
+
+    assert re1.eva == '8000080'
+    assert re1.departure_changed == datetime(2026, 10, 19, 8, 7)
+    assert re1.departure_changed_platform == '17'
+    # Nested <m> messages are not stops; the change has no planned time to overwrite
+    assert 'departure_planned' not in re1.fields()
+    assert ice.departure_cancelled
+    assert ice.fields()['departure_cancelled'] is True
+
+
+def test_events_are_yielded_while_the_document_streams():
+    chunks = iter(chunked(PLAN, 200))
+    events = iter_stop_events(chunks, eva='8000080')
+
+    first = next(events)
+    assert first.number == '10123'
+    # The second stop is still unread in the chunk iterator
+    assert next(chunks, None) is not None
+
+
+def test_parse_iris_time_rejects_malformed_values():
+    assert parse_iris_time('2610190800') == datetime(2026, 10, 19, 8, 0)
+    assert parse_iris_time('26101908') is None
+    assert parse_iris_time('2613190800') is None
+    assert parse_iris_time(None) is None
+
+
+def test_first_station_stops_at_the_first_match():
+    document = b"<stations><station name='Dortmund Hbf' eva='8000080' ds100='EDO'/><station name='x'/>"
+
+    assert first_station(chunked(document, 5)) == {'name': 'Dortmund Hbf', 'eva': '8000080', 'ds100': 'EDO'}
+    assert first_station(b"<stations></stations>") is None
@@ -0,0 +1,65 @@
+"""Typed training schema: small dtypes, overflow guards and CSV round trips"""
+
+import numpy as np
+import pandas as pd
+
+from data.loader import TRAINING_DTYPES, load_training_data, optimize_dtypes
+
+
+def frame():
+    return pd.DataFrame({
+        'distance_km': [12.5, 70.25, 40.0],
+        'time_of_day': [0, 17, 23],
+        'day_of_week': [0, 3, 6],
+        'is_peak_hour': [0, 1, 1],
+        'is_cologne_bottleneck': [1, 0, 0],
+        'delay_minutes': [0.0, 4.5, 12.0],
+        'source': ['synthetic', 'real', 'real_fused'],
+    })
+
+
+def test_frame_is_cast_to_the_typed_schema():
+    df = optimize_dtypes(frame())
+
+    assert {column: str(dtype) for column, dtype in df.dtypes.items()} == TRAINING_DTYPES
+    assert df['time_of_day'].tolist() == [0, 17, 23]
+
+
+def test_out_of_range_integers_keep_a_wide_dtype():
+    df = frame()
+    df['time_of_day'] = [0, 17, 300]      # would wrap to 44 in uint8
+    df['is_peak_hour'] = [0, 1, -200]     # would wrap to 56 in int8
+    df['day_of_week'] = [0, -1, 6]        # negative: not a uint8
+
+    df = optimize_dtypes(df)
+
+    assert df['time_of_day'].tolist() == [0, 17, 300]
+    assert df['is_peak_hour'].tolist() == [0, 1, -200]
+    assert df['day_of_week'].tolist() == [0, -1, 6]
+    assert str(df['is_cologne_bottleneck'].dtype) == 'int8'
+
+
+def test_missing_integers_become_float32():
+    df = frame()
+    df['day_of_week'] = [0, None, 6]
+
+    assert optimize_dtypes(df)['day_of_week'].dtype == np.float32
+
+
+def test_csv_round_trip_keeps_values_and_categories(tmp_path):
+    path = tmp_path / "training.csv"
+    optimize_dtypes(frame()).to_csv(path, index=False)
+
+    df = load_training_data(path, report=False)
+
+    pd.testing.assert_frame_equal(df, optimize_dtypes(frame()), check_categorical=False)
+    assert set(df['source'].cat.categories) == {'synthetic', 'real', 'real_fused'}
+
+
+def test_csv_values_outside_the_schema_are_not_wrapped(tmp_path):
+    path = tmp_path / "training.csv"
+    df = frame()
+    df['time_of_day'] = [0, 17, 300]
+    df.to_csv(path, index=False)
+
+    assert load_training_data(path, report=False)['time_of_day'].tolist() == [0, 17, 300]
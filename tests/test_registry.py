@@ -0,0 +1,101 @@
+"""Model registry: content-addressed versions, CURRENT switches and the hot-reload handle"""
+
+import time
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+from models.registry import ModelHandle, ModelRegistry
+
+
+def forest(seed):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(50, 3))
+    return RandomForestRegressor(n_estimators=3, max_depth=3, random_state=seed).fit(X, X[:, 0])
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return ModelRegistry(tmp_path / "registry")
+
+
+def test_same_content_gives_the_same_version(registry):
+    model = forest(0)
+
+    first = registry.publish({'rf': model}, {'rf': 1.0}, metadata={'training_rows': 50})
+    second = registry.publish({'rf': model}, {'rf': 1.0}, metadata={'training_rows': 51})
+    other = registry.publish({'rf': model}, {'rf': 0.5})
+
+    assert first == second
+    assert other != first
+    assert (registry.version_dir(first) / "compact" / "rf" / "meta.json").exists()
+    assert registry.metadata(first)['training_rows'] == 50   # the stored version is never rewritten
+    assert not any(registry.staging_dir.iterdir())
+
+
+def test_promote_and_rollback_switch_current(registry):
+    old = registry.publish({'rf': forest(0)}, {'rf': 1.0})
+    new = registry.publish({'rf': forest(1)}, {'rf': 1.0})
+
+    assert registry.current_version() is None
+    with pytest.raises(ValueError):
+        registry.promote("unknown")
+
+    registry.promote(old)
+    registry.promote(new)
+    assert registry.current_version() == new
+    assert registry.rollback() == old
+    assert registry.current_version() == old
+    assert not list(registry.root.glob("CURRENT.*.tmp"))
+
+
+def test_rollback_without_an_earlier_version_fails(registry):
+    registry.promote(registry.publish({'rf': forest(0)}, {'rf': 1.0}))
+
+    with pytest.raises(ValueError):
+        registry.rollback()
+
+
+def test_handle_swaps_to_a_newly_promoted_version(registry):
+    old = registry.publish({'rf': forest(0)}, {'rf': 1.0})
+    new = registry.publish({'rf': forest(1)}, {'rf': 1.0})
+    registry.promote(old)
+
+    handle = ModelHandle(registry, lambda path: path.name, poll_interval=0.01)
+    try:
+        assert (handle.version, handle.predictor) == (old, old)
+        registry.promote(new)
+        assert wait_for(lambda: handle.version == new)
+        assert handle.predictor == new
+    finally:
+        handle.stop()
+
+
+def test_handle_survives_a_failing_first_load(registry):
+    version = registry.publish({'rf': forest(0)}, {'rf': 1.0})
+    registry.promote(version)
+    calls = []
+
+    def loader(path):
+        calls.append(path)
+        if len(calls) == 1:
+            raise OSError("disk hiccup")
+        return path.name
+
+    handle = ModelHandle(registry, loader, poll_interval=0.01)
+    try:
+        assert handle.predictor is None
+        # The watcher retries the promoted version
+        assert wait_for(lambda: handle.predictor == version)
+    finally:
+        handle.stop()
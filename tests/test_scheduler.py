@@ -0,0 +1,89 @@
+"""Poll scheduling: water-filling of the rate budget and reservation of started polls"""
+
+import pytest
+
+from data.scheduler import PollScheduler, water_fill
+
+
+def test_water_fill_splits_proportionally_within_bounds():
+    shares = water_fill({'a': 1.0, 'b': 3.0}, total=4.0, low=0.1, high=10.0)
+
+    assert shares == pytest.approx({'a': 1.0, 'b': 3.0})
+
+
+def test_water_fill_redistributes_what_the_bounds_cut_off():
+    shares = water_fill({'busy': 100.0, 'x': 1.0, 'y': 1.0}, total=6.0, low=0.5, high=2.0)
+
+    assert shares['busy'] == pytest.approx(2.0)
+    assert shares['x'] == pytest.approx(2.0) and shares['y'] == pytest.approx(2.0)
+    assert sum(shares.values()) == pytest.approx(6.0)
+
+
+def test_water_fill_raises_small_shares_to_the_minimum():
+    shares = water_fill({'a': 98.0, 'b': 1.0, 'c': 1.0}, total=10.0, low=1.0, high=20.0)
+
+    assert shares['b'] == pytest.approx(1.0) and shares['c'] == pytest.approx(1.0)
+    assert shares['a'] == pytest.approx(8.0)
+
+
+def test_water_fill_budget_below_minimum_is_split_evenly():
+    assert water_fill({'a': 5.0, 'b': 1.0}, total=1.0, low=1.0, high=2.0) == {'a': 0.5, 'b': 0.5}
+    assert water_fill({}, total=1.0, low=0.0, high=1.0) == {}
+
+
+def scheduler(clock):
+    return PollScheduler(['A', 'B'], budgets={'iris': 2.0}, poll_cost={'iris': 1.0},
+                         focus_station=None, min_interval=10.0, max_interval=600.0, clock=lambda: clock[0])
+
+
+def test_reserved_station_is_not_due_again_before_its_feedback():
+    clock = [0.0]
+    poller = scheduler(clock)
+
+    first, wait = poller.next_due()
+    assert wait == 0
+    poller.reserve(first)
+    second, _ = poller.next_due()
+    assert second != first
+
+    clock[0] = 5.0
+    poller.record(first, [('eva', 'RE1', 0)], [1.0])
+    # The feedback does not move the poll time set by the reservation
+    assert poller.last_poll[first] == 0.0
+    assert poller.density[first] == 1.0
+
+
+def test_unreserved_record_sets_the_poll_time():
+    clock = [0.0]
+    poller = scheduler(clock)
+    clock[0] = 3.0
+    poller.record('A', [], [])
+
+    assert poller.last_poll['A'] == 3.0
+    assert poller.next_poll('A') == pytest.approx(3.0 + poller.interval('A'))
+
+
+def test_reported_requests_move_the_poll_cost():
+    clock = [0.0]
+    poller = scheduler(clock)
+    base = poller.interval('A')
+
+    # First poll of a station: two plan slices and /fchg instead of one /rchg
+    poller.record('A', [], [], requests={'iris': 3})
+
+    assert poller.poll_cost['iris'] == pytest.approx(1.0 + 0.3 * 2)
+    assert poller.polls_per_minute == pytest.approx(2.0 / 1.6)
+    assert poller.interval('A') > base
+
+    for _ in range(30):
+        poller.record('A', [], [], requests={'iris': 1})
+    assert poller.poll_cost['iris'] == pytest.approx(1.0, abs=1e-3)
+
+
+def test_unreported_requests_keep_the_prior():
+    clock = [0.0]
+    poller = scheduler(clock)
+
+    poller.record('A', [], [])
+
+    assert poller.poll_cost == {'iris': 1.0}